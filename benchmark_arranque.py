@@ -0,0 +1,69 @@
+"""
+Benchmark de Arranque en Frío
+Sistema de Gestión de Biblioteca UFT
+
+Mide, cada vez en un intérprete nuevo (como un worker recién levantado):
+  - el tiempo de importar la capa de datos y la app,
+  - el costo de los módulos pesados que ahora se cargan bajo demanda,
+  - el tiempo hasta la primera pantalla (ejecución completa del script con
+    el AppTest de Streamlit, vista Inicio).
+
+Uso:
+    python benchmark_arranque.py [--repeticiones 5]
+"""
+
+import sys
+import argparse
+import statistics
+import subprocess
+
+# Cada medición se ejecuta en un proceso aparte para que nada quede en caché
+MEDICIONES = {
+    'capa de datos (datos_biblioteca)': "import datos_biblioteca",
+    'app (import streamlit_semana6)': "import streamlit_semana6",
+    'carga anterior (streamlit+pandas+plotly)': "import streamlit, pandas, plotly.express",
+    'plotly.express (diferido)': "import plotly.express",
+    'primera pantalla (AppTest, Inicio)': (
+        "from streamlit.testing.v1 import AppTest\n"
+        "AppTest.from_file('streamlit_semana6.py', default_timeout=60).run()"
+    ),
+}
+
+PLANTILLA = """
+import time
+inicio = time.perf_counter()
+{codigo}
+print(time.perf_counter() - inicio)
+"""
+
+def medir(codigo, repeticiones):
+    """Segundos de cada repetición en un intérprete nuevo (None si falla)"""
+    tiempos = []
+    for _ in range(repeticiones):
+        proceso = subprocess.run([sys.executable, "-c", PLANTILLA.format(codigo=codigo)],
+                                 capture_output=True, text=True)
+        if proceso.returncode != 0:
+            ultima = proceso.stderr.strip().splitlines()[-1:] or ["error desconocido"]
+            return None, ultima[0]
+        tiempos.append(float(proceso.stdout.strip().splitlines()[-1]))
+    return tiempos, None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"  Arranque en frío ({args.repeticiones} repeticiones, intérprete nuevo cada vez)")
+    print("=" * 72)
+    print(f"  {'Medición':42} {'mediana':>10} {'mínimo':>10}")
+
+    for nombre, codigo in MEDICIONES.items():
+        tiempos, error = medir(codigo, args.repeticiones)
+        if tiempos is None:
+            print(f"  {nombre:42} no disponible: {error}")
+            continue
+        print(f"  {nombre:42} {statistics.median(tiempos) * 1000:8.0f} ms {min(tiempos) * 1000:8.0f} ms")
+
+if __name__ == "__main__":
+    main()
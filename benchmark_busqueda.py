@@ -0,0 +1,122 @@
+"""
+Benchmark de Búsqueda Aproximada
+Sistema de Gestión de Biblioteca UFT
+
+Crea una base temporal con el esquema de biblioteca.db.sql, le carga un
+catálogo sintético grande (los triggers llenan el índice de trigramas) y mide
+búsquedas con errores de tipeo sobre títulos y autores que sí existen:
+  - tiempo de carga e indexación y tamaño del índice,
+  - latencia de busqueda.buscar_similares (mediana y p95),
+  - cuántas veces el libro buscado aparece entre las sugerencias.
+
+Uso:
+    python benchmark_busqueda.py [--libros 500000] [--consultas 200]
+"""
+
+import os
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import statistics
+
+import busqueda
+
+# Sílabas consonante + vocal (+ coda): ~1.000 combinaciones, para que la
+# variedad de trigramas se parezca a la de títulos reales
+SILABAS = [ataque + vocal + coda
+           for ataque in ("", "b", "c", "ch", "d", "f", "g", "gu", "j", "l", "ll", "m", "n",
+                          "p", "qu", "r", "s", "t", "v", "z", "br", "cr", "pl", "tr")
+           for vocal in "aeiou"
+           for coda in ("", "n", "r", "s", "l", "z", "c", "m")]
+
+def palabra(azar):
+    return "".join(azar.choice(SILABAS) for _ in range(azar.randint(2, 4)))
+
+def generar_libros(cantidad, azar):
+    for i in range(cantidad):
+        titulo = " ".join(palabra(azar) for _ in range(azar.randint(2, 5))).capitalize()
+        autor = f"{palabra(azar).capitalize()} {palabra(azar).capitalize()}"
+        yield (f"978{i:010d}", titulo, "Editorial", 2000, "Ficción", autor, "Español", 200)
+
+def con_error(texto, azar):
+    """Introduce un error de tipeo: cambia, omite o duplica una letra"""
+    posiciones = [i for i, c in enumerate(texto) if c.isalpha()]
+    i = azar.choice(posiciones)
+    tipo = azar.choice(("cambio", "omision", "duplicado"))
+    if tipo == "cambio":
+        return texto[:i] + azar.choice("aeiourstnl") + texto[i + 1:]
+    if tipo == "omision":
+        return texto[:i] + texto[i + 1:]
+    return texto[:i] + texto[i] + texto[i:]
+
+def crear_base(ruta, libros, azar):
+    conn = sqlite3.connect(ruta)
+    with open("biblioteca.db.sql", "r", encoding="utf-8") as archivo:
+        conn.executescript(archivo.read())
+
+    inicio = time.perf_counter()
+    with conn:
+        conn.executemany(
+            """INSERT INTO LIBRO (isbn, titulo, editorial, anio, categoria, autor, idioma, num_paginas)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", generar_libros(libros, azar))
+        conn.execute("INSERT INTO LIBRO_TRIGRAMA (LIBRO_TRIGRAMA) VALUES ('optimize')")
+    return conn, time.perf_counter() - inicio
+
+def tamano_indice(conn):
+    """Bytes ocupados por las tablas internas de LIBRO_TRIGRAMA (requiere dbstat)"""
+    try:
+        return conn.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name LIKE 'LIBRO_TRIGRAMA%'").fetchone()[0]
+    except sqlite3.Error:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda aproximada")
+    parser.add_argument('--libros', type=int, default=500000)
+    parser.add_argument('--consultas', type=int, default=200)
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+    azar = random.Random(args.semilla)
+
+    print("=" * 72)
+    print(f"  Búsqueda aproximada sobre {args.libros:,} libros sintéticos")
+    print("=" * 72)
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        conn, segundos = crear_base(os.path.join(carpeta, "benchmark.db"), args.libros, azar)
+        print(f"  Carga + indexación:   {segundos:8.1f} s")
+        tamano = tamano_indice(conn)
+        if tamano is not None:
+            print(f"  Tamaño del índice:    {tamano / 1024 / 1024:8.1f} MB")
+
+        objetivos = conn.execute(
+            "SELECT isbn, titulo, autor FROM LIBRO ORDER BY random() LIMIT ?",
+            (args.consultas,)).fetchall()
+
+        tiempos, aciertos = [], 0
+        for isbn, titulo, autor in objetivos:
+            # La mitad de las consultas busca por título y la otra por autor
+            texto = con_error(azar.choice((titulo, autor)), azar)
+            inicio = time.perf_counter()
+            sugerencias = busqueda.buscar_similares(conn, texto)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            aciertos += any(s['isbn'] == isbn for s in sugerencias)
+
+        tiempos.sort()
+        p95 = tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))]
+        print(f"  Consultas:            {len(tiempos):8d}")
+        print(f"  Mediana:              {statistics.median(tiempos):8.1f} ms")
+        print(f"  p95:                  {p95:8.1f} ms")
+        print(f"  Libro encontrado:     {aciertos / len(tiempos):8.0%} (entre las 5 sugerencias)")
+
+        ejemplo = objetivos[0]
+        texto = con_error(ejemplo[1], azar)
+        print(f"\n  Ejemplo: '{texto}' -> '{ejemplo[1]}'")
+        for s in busqueda.buscar_similares(conn, texto):
+            print(f"     {s['similitud']:.2f}  {s['titulo']} ({s['autor']})")
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark del Tablero de Inicio
+Sistema de Gestión de Biblioteca UFT
+
+Compara el tiempo que tarda la pantalla de Inicio en tener todos sus datos:
+  - antes: el sidebar y el tablero consultan uno tras otro (las estadísticas
+    dos veces, una para cada uno),
+  - ahora: datos_biblioteca.cargar_tablero() ejecuta las consultas a la vez,
+    cada una en un hilo con su propia conexión, y las estadísticas una vez.
+
+Incluye armar los DataFrames que muestra la app si pandas está instalado.
+SQLite libera el GIL mientras ejecuta cada consulta, así que la mejora
+depende de los núcleos disponibles: con uno solo las consultas se turnan.
+Usa los datos sintéticos de verificar_planes.py (500.000 préstamos con
+--escala 1) en una base temporal.
+
+Uso:
+    python benchmark_dashboard.py [--escala 1] [--repeticiones 5]
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import statistics
+
+import verificar_planes
+
+def medir(funcion, repeticiones):
+    """Mediana de los ms totales y de los ms de cada consulta"""
+    totales, por_consulta = [], {}
+    funcion()    # primera vuelta: caché de páginas y conexiones del pool
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        tiempos = funcion()
+        totales.append((time.perf_counter() - inicio) * 1000)
+        for nombre, ms in tiempos.items():
+            por_consulta.setdefault(nombre, []).append(ms)
+    return statistics.median(totales), {nombre: statistics.median(ms) for nombre, ms in por_consulta.items()}
+
+def mostrar(titulo, total, por_consulta):
+    print(f"\n  {titulo:40} {total:9.0f} ms")
+    for nombre, ms in por_consulta.items():
+        print(f"     {nombre:37} {ms:9.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de carga del tablero de inicio")
+    parser.add_argument('--escala', type=float, default=1.0, help="volumen de datos (como verificar_planes.py)")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"  Tablero de inicio con datos sintéticos (escala {args.escala:g})")
+    print("=" * 72)
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        inicio = time.perf_counter()
+        conn = verificar_planes.crear_base(os.path.join(carpeta, "biblioteca.db"), args.escala)
+        conn.execute("ANALYZE")
+        prestamos = conn.execute("SELECT COUNT(*) FROM PRESTAMO").fetchone()[0]
+        conn.close()
+        print(f"  Base con {prestamos:,} préstamos creada en {time.perf_counter() - inicio:.0f} s")
+
+        # datos_biblioteca abre biblioteca.db de la carpeta actual (sin sedes.json)
+        os.chdir(carpeta)
+        import datos_biblioteca as datos_bd
+        try:
+            import pandas as pd
+        except ImportError:
+            pd = None
+
+        def a_dataframes(resultados):
+            if pd is not None:
+                for filas in resultados.values():
+                    if isinstance(filas, list):
+                        pd.DataFrame(filas)
+
+        def antes():
+            tiempos, resultados = {}, {}
+            for nombre, funcion in [('stats (sidebar)', datos_bd.cargar_stats_generales)] + \
+                                   list(datos_bd.CONSULTAS_TABLERO.items()):
+                t = time.perf_counter()
+                resultados[nombre] = funcion()
+                tiempos[nombre] = (time.perf_counter() - t) * 1000
+            a_dataframes(resultados)
+            return tiempos
+
+        def ahora():
+            resultados, tiempos = datos_bd.cargar_tablero()
+            a_dataframes(resultados)
+            return tiempos
+
+        total_antes, consultas_antes = medir(antes, args.repeticiones)
+        total_ahora, consultas_ahora = medir(ahora, args.repeticiones)
+
+        print(f"  DataFrames: {'sí (pandas)' if pd is not None else 'no (pandas no está instalado)'}")
+        # Con un solo núcleo los hilos se turnan y solo se ahorra la consulta repetida
+        print(f"  Núcleos:    {os.cpu_count()}")
+        mostrar("Antes (una consulta tras otra)", total_antes, consultas_antes)
+        mostrar("Ahora (cargar_tablero, en paralelo)", total_ahora, consultas_ahora)
+        print(f"\n  Mejora: {total_antes / total_ahora:.1f}x")
+
+        # Cerrar todas las conexiones antes de borrar la carpeta temporal
+        datos_bd._pool_lectura().shutdown()
+        datos_bd.conectar_bd().close()
+        os.chdir(os.path.dirname(verificar_planes.ARCHIVO_SQL))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark de Memoria del Catálogo
+Sistema de Gestión de Biblioteca UFT
+
+Compara la memoria que ocupa cada sesión de la app:
+  - antes: cada sesión arma el catálogo y el inventario completos
+    (obtener_catalogo + obtener_inventario, y sus DataFrames si pandas
+    está instalado),
+  - ahora: una instantánea compartida por proceso (catalogo_compartido) y
+    cada sesión solo arma las filas que muestra (a lo más 1.000 por tabla).
+
+Crea una base temporal con el esquema de biblioteca.db.sql y datos
+sintéticos. La memoria se mide con tracemalloc y los tiempos aparte, sin
+tracemalloc (que hace más lenta cada asignación).
+
+Uso:
+    python benchmark_memoria.py [--ejemplares 1000000] [--libros 200000]
+"""
+
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+import tracemalloc
+
+ARCHIVO_SQL = os.path.abspath("biblioteca.db.sql")
+SESIONES = (1, 10, 50)
+
+def crear_base(ruta, libros, ejemplares):
+    conn = sqlite3.connect(ruta)
+    with open(ARCHIVO_SQL, "r", encoding="utf-8") as archivo:
+        conn.executescript(archivo.read())
+    # Para cargar rápido: sin índice de trigramas ni registro de cambios
+    for (nombre,) in conn.execute("""SELECT name FROM sqlite_master WHERE type='trigger'
+                                     AND (name LIKE 'trg_cdc_%' OR name LIKE 'trg_libro_trigrama_%')""").fetchall():
+        conn.execute(f"DROP TRIGGER {nombre}")
+
+    categorias = ['Ficción', 'No Ficción', 'Referencia', 'Tesis']
+    estados = ['disponible'] * 6 + ['prestado'] * 3 + ['en_reparacion']
+    with conn:
+        conn.executemany(
+            """INSERT INTO LIBRO (isbn, titulo, editorial, anio, categoria, autor, idioma, num_paginas)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            ((f"978{i:010d}", f"Título de prueba número {i}", f"Editorial {i % 300}", 1950 + i % 75,
+              categorias[i % 4], f"Autor {i % 40000}", 'Español', 100 + i % 700) for i in range(libros)))
+        conn.executemany(
+            "INSERT INTO EJEMPLAR (isbn, codigo_barras, estado, ubicacion, condicion) VALUES (?, ?, ?, ?, 'bueno')",
+            ((f"978{i % libros:010d}", f"UFT{i:09d}", estados[i % len(estados)], f"Estantería {i % 2000}")
+             for i in range(ejemplares)))
+    conn.close()
+
+def medir_memoria(funcion):
+    """(resultado, bytes que siguen ocupados mientras se conserva el resultado)"""
+    tracemalloc.start()
+    resultado = funcion()
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, actual
+
+def medir_tiempo(funcion):
+    inicio = time.perf_counter()
+    funcion()
+    return time.perf_counter() - inicio
+
+def mb(bytes_):
+    if bytes_ < 1024 * 1024:
+        return f"{bytes_ / 1024:8.1f} KB"
+    return f"{bytes_ / 1024 / 1024:8.1f} MB"
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria del catálogo por sesión")
+    parser.add_argument('--ejemplares', type=int, default=1000000)
+    parser.add_argument('--libros', type=int, default=200000)
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"  Memoria con {args.libros:,} libros y {args.ejemplares:,} ejemplares")
+    print("=" * 72)
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        # datos_biblioteca abre biblioteca.db de la carpeta actual (sin sedes.json)
+        os.chdir(carpeta)
+        crear_base("biblioteca.db", args.libros, args.ejemplares)
+
+        import datos_biblioteca
+        import catalogo_compartido
+        try:
+            import pandas as pd
+        except ImportError:
+            pd = None
+
+        def sesion_antes():
+            catalogo = datos_biblioteca.obtener_catalogo()
+            inventario = datos_biblioteca.obtener_inventario()
+            if pd is not None:
+                return (pd.DataFrame(catalogo), pd.DataFrame(inventario))
+            return catalogo, inventario
+
+        # Memoria primero: una corrida previa dejaría tuplas en las listas
+        # libres de CPython y tracemalloc no vería esas asignaciones
+        antes, bytes_antes = medir_memoria(sesion_antes)
+        del antes
+        seg_antes = medir_tiempo(sesion_antes)
+
+        seg_carga = medir_tiempo(lambda: catalogo_compartido.InstantaneaCatalogo(datos_biblioteca.conectar_bd()))
+        instantanea, bytes_compartidos = medir_memoria(datos_biblioteca.catalogo_en_memoria)
+        _, bytes_listas = medir_memoria(lambda: (instantanea.isbns(), instantanea.ids_ejemplares()))
+        bytes_compartidos += bytes_listas
+
+        def sesion_ahora():
+            catalogo = datos_biblioteca.catalogo_en_memoria()
+            libros = [libro.fila() for libro in catalogo.buscar_libros(limite=1000)]
+            inventario = catalogo.filas_inventario(catalogo.buscar_ejemplares(limite=1000))
+            if pd is not None:
+                return (pd.DataFrame(libros), pd.DataFrame(inventario))
+            return libros, inventario
+
+        ahora, bytes_sesion = medir_memoria(sesion_ahora)
+        seg_ahora = medir_tiempo(sesion_ahora)
+
+        seg_busqueda = medir_tiempo(lambda: instantanea.buscar_ejemplares("número 1234", limite=1000))
+        seg_codigo = medir_tiempo(lambda: instantanea.ejemplar_por_codigo("UFT000123456"))
+
+        print(f"  Tablas por sesión: {'DataFrames (pandas)' if pd is not None else 'listas de tuplas (sin pandas)'}")
+        print(f"  Antes, por sesión:            {mb(bytes_antes)}  ({seg_antes:.2f} s)")
+        print(f"  Instantánea compartida:       {mb(bytes_compartidos)}  ({seg_carga:.2f} s, una vez por proceso)")
+        print(f"  Ahora, por sesión:            {mb(bytes_sesion)}  ({seg_ahora * 1000:.0f} ms)")
+        print(f"  Búsqueda de copias por texto: {seg_busqueda * 1000:8.0f} ms")
+        print(f"  Copia por código de barras:   {seg_codigo * 1000:8.3f} ms")
+        print(f"\n  {'Sesiones':>10} {'Antes':>14} {'Ahora':>14}")
+        for sesiones in SESIONES:
+            print(f"  {sesiones:>10} {mb(bytes_antes * sesiones):>14} {mb(bytes_compartidos + bytes_sesion * sesiones):>14}")
+
+        datos_biblioteca.conectar_bd().close()
+        os.chdir(os.path.dirname(ARCHIVO_SQL))
+
+if __name__ == "__main__":
+    main()
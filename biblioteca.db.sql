@@ -9,6 +9,13 @@ PRAGMA foreign_keys = OFF;
 PRAGMA encoding = "UTF-8";
 
 -- Limpieza de base de datos (eliminar tablas si existen)
+DROP TABLE IF EXISTS CONSUMIDOR_CAMBIO;
+DROP TABLE IF EXISTS REGISTRO_CAMBIO;
+DROP TABLE IF EXISTS LIBRO_TRIGRAMA_VOCAB;
+DROP TABLE IF EXISTS LIBRO_TRIGRAMA;
+DROP TABLE IF EXISTS LIBRO_TRIGRAMA_ID;
+DROP TABLE IF EXISTS NOTIFICACION;
+DROP TABLE IF EXISTS TRASLADO;
 DROP TABLE IF EXISTS MULTA;
 DROP TABLE IF EXISTS RESERVA;
 DROP TABLE IF EXISTS PRESTAMO;
@@ -22,20 +29,52 @@ DROP VIEW IF EXISTS v_prestamos_activos;
 DROP VIEW IF EXISTS v_multas_pendientes;
 DROP VIEW IF EXISTS v_kpi_ranking_libros;
 DROP VIEW IF EXISTS v_kpi_ranking_usuarios;
+DROP VIEW IF EXISTS v_disponibilidad_ejemplares;
+DROP VIEW IF EXISTS v_libro_normalizado;
 
 DROP INDEX IF EXISTS idx_libro_titulo;
 DROP INDEX IF EXISTS idx_libro_autor;
 DROP INDEX IF EXISTS idx_ejemplar_isbn;
+DROP INDEX IF EXISTS idx_ejemplar_ubicacion;
 DROP INDEX IF EXISTS idx_prestamo_usuario;
 DROP INDEX IF EXISTS idx_prestamo_ejemplar;
 DROP INDEX IF EXISTS idx_reserva_usuario;
 DROP INDEX IF EXISTS idx_reserva_isbn;
+DROP INDEX IF EXISTS idx_multa_estado;
+DROP INDEX IF EXISTS idx_prestamo_dia_prestamo;
+DROP INDEX IF EXISTS idx_prestamo_dia_vencimiento;
+DROP INDEX IF EXISTS idx_prestamo_dia_devolucion;
+DROP INDEX IF EXISTS idx_multa_dia_generacion;
 DROP INDEX IF EXISTS idx_prestamo_ejemplar_activo_o_vencido;
 DROP INDEX IF EXISTS idx_reserva_pendiente_unica;
+DROP INDEX IF EXISTS idx_traslado_pendiente_unico;
 
 DROP TRIGGER IF EXISTS trg_prestamo_devolucion;
 DROP TRIGGER IF EXISTS trg_prestamo_nuevo;
 DROP TRIGGER IF EXISTS trg_marcar_prestamos_vencidos;
+DROP TRIGGER IF EXISTS trg_libro_trigrama_insert;
+DROP TRIGGER IF EXISTS trg_libro_trigrama_update;
+DROP TRIGGER IF EXISTS trg_libro_trigrama_delete;
+DROP TRIGGER IF EXISTS trg_cdc_usuario_insert;
+DROP TRIGGER IF EXISTS trg_cdc_usuario_update;
+DROP TRIGGER IF EXISTS trg_cdc_usuario_delete;
+DROP TRIGGER IF EXISTS trg_cdc_usuario_cambio_clave;
+DROP TRIGGER IF EXISTS trg_cdc_libro_insert;
+DROP TRIGGER IF EXISTS trg_cdc_libro_update;
+DROP TRIGGER IF EXISTS trg_cdc_libro_delete;
+DROP TRIGGER IF EXISTS trg_cdc_libro_cambio_clave;
+DROP TRIGGER IF EXISTS trg_cdc_ejemplar_insert;
+DROP TRIGGER IF EXISTS trg_cdc_ejemplar_update;
+DROP TRIGGER IF EXISTS trg_cdc_ejemplar_delete;
+DROP TRIGGER IF EXISTS trg_cdc_prestamo_insert;
+DROP TRIGGER IF EXISTS trg_cdc_prestamo_update;
+DROP TRIGGER IF EXISTS trg_cdc_prestamo_delete;
+DROP TRIGGER IF EXISTS trg_cdc_multa_insert;
+DROP TRIGGER IF EXISTS trg_cdc_multa_update;
+DROP TRIGGER IF EXISTS trg_cdc_multa_delete;
+DROP TRIGGER IF EXISTS trg_cdc_reserva_insert;
+DROP TRIGGER IF EXISTS trg_cdc_reserva_update;
+DROP TRIGGER IF EXISTS trg_cdc_reserva_delete;
 
 -- Activar foreign keys
 PRAGMA foreign_keys = ON;
@@ -86,7 +125,7 @@ CREATE TABLE EJEMPLAR (
     id_ejemplar INTEGER PRIMARY KEY AUTOINCREMENT,
     isbn TEXT NOT NULL,
     codigo_barras TEXT NOT NULL UNIQUE,
-    estado TEXT NOT NULL CHECK (estado IN ('disponible', 'prestado', 'en_reparacion', 'perdido', 'baja')),
+    estado TEXT NOT NULL CHECK (estado IN ('disponible', 'prestado', 'en_reparacion', 'perdido', 'baja', 'en_traslado', 'trasladado')),
     ubicacion TEXT,
     condicion TEXT NOT NULL DEFAULT 'bueno' CHECK (condicion IN ('excelente', 'bueno', 'regular', 'malo')),
     FOREIGN KEY (isbn) REFERENCES LIBRO(isbn) 
@@ -102,6 +141,12 @@ CREATE TABLE PRESTAMO (
     fecha_vencimiento TEXT NOT NULL,
     fecha_devolucion TEXT,
     estado TEXT NOT NULL CHECK (estado IN ('activo', 'devuelto', 'vencido')) DEFAULT 'activo',
+    -- Las fechas como número de día (días desde 1970-01-01), calculadas al
+    -- escribir la fila: las vistas restan enteros en vez de llamar a
+    -- JULIANDAY en cada fila, y los filtros por fecha usan índices
+    dia_prestamo INTEGER GENERATED ALWAYS AS (CAST(JULIANDAY(fecha_prestamo) - 2440587.5 AS INTEGER)) STORED,
+    dia_vencimiento INTEGER GENERATED ALWAYS AS (CAST(JULIANDAY(fecha_vencimiento) - 2440587.5 AS INTEGER)) STORED,
+    dia_devolucion INTEGER GENERATED ALWAYS AS (CAST(JULIANDAY(fecha_devolucion) - 2440587.5 AS INTEGER)) STORED,
     FOREIGN KEY (rut_usuario) REFERENCES USUARIO(rut) 
         ON DELETE RESTRICT 
         ON UPDATE CASCADE,
@@ -132,11 +177,75 @@ CREATE TABLE MULTA (
     fecha_generacion TEXT NOT NULL DEFAULT (DATE('now')),
     fecha_pago TEXT,
     estado TEXT NOT NULL CHECK (estado IN ('pendiente', 'pagado', 'condonado')) DEFAULT 'pendiente',
+    -- Número de día, igual que en PRESTAMO
+    dia_generacion INTEGER GENERATED ALWAYS AS (CAST(JULIANDAY(fecha_generacion) - 2440587.5 AS INTEGER)) STORED,
     FOREIGN KEY (id_prestamo) REFERENCES PRESTAMO(id_prestamo) 
         ON DELETE CASCADE 
         ON UPDATE CASCADE
 );
 
+-- Traslados de copias entre sedes (cada sede guarda su copia del registro).
+-- Sin FK a EJEMPLAR: en la sede de destino la copia aún no existe al enviarla.
+CREATE TABLE TRASLADO (
+    id_traslado INTEGER PRIMARY KEY AUTOINCREMENT,
+    codigo_barras TEXT NOT NULL,
+    isbn TEXT NOT NULL,
+    sede_origen TEXT NOT NULL,
+    sede_destino TEXT NOT NULL,
+    estado TEXT NOT NULL CHECK (estado IN ('enviado', 'recibido', 'cancelado')) DEFAULT 'enviado',
+    fecha_envio TEXT NOT NULL DEFAULT (DATETIME('now')),
+    fecha_recepcion TEXT
+);
+
+-- Avisos por correo enviados (registro de idempotencia de notificaciones.py).
+-- clave = fecha del lote + rut: a lo más un aviso por usuario y día.
+CREATE TABLE NOTIFICACION (
+    id_notificacion INTEGER PRIMARY KEY AUTOINCREMENT,
+    clave TEXT NOT NULL UNIQUE,
+    rut_usuario TEXT NOT NULL,
+    correo TEXT NOT NULL,
+    num_avisos INTEGER NOT NULL DEFAULT 1,
+    estado TEXT NOT NULL CHECK (estado IN ('enviando', 'enviado', 'fallido')) DEFAULT 'enviando',
+    intentos INTEGER NOT NULL DEFAULT 0,
+    fecha_envio TEXT,
+    error TEXT,
+    FOREIGN KEY (rut_usuario) REFERENCES USUARIO(rut) 
+        ON DELETE CASCADE 
+        ON UPDATE CASCADE
+);
+
+-- Índice de trigramas para la búsqueda tolerante a errores de tipeo (busqueda.py).
+-- Guarda título y autor normalizados (minúsculas, sin tildes). LIBRO no tiene
+-- clave entera y VACUUM puede renumerar su rowid, por eso el rowid del índice
+-- sale de LIBRO_TRIGRAMA_ID, que sí es estable.
+CREATE TABLE LIBRO_TRIGRAMA_ID (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    isbn TEXT NOT NULL UNIQUE
+);
+
+CREATE VIRTUAL TABLE LIBRO_TRIGRAMA USING fts5(titulo, autor, tokenize = 'trigram');
+
+-- Frecuencia de cada trigrama (se usa para consultar primero los más raros)
+CREATE VIRTUAL TABLE LIBRO_TRIGRAMA_VOCAB USING fts5vocab(LIBRO_TRIGRAMA, 'row');
+
+-- Registro de cambios (CDC): una fila compacta por cada INSERT/UPDATE/DELETE
+-- en las tablas principales. AUTOINCREMENT garantiza que seq nunca se reutiliza,
+-- aunque se poden las filas ya confirmadas.
+CREATE TABLE REGISTRO_CAMBIO (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    tabla TEXT NOT NULL,
+    operacion TEXT NOT NULL CHECK (operacion IN ('INSERT', 'UPDATE', 'DELETE')),
+    clave TEXT NOT NULL,
+    fecha TEXT NOT NULL DEFAULT (DATETIME('now'))
+);
+
+-- Último seq confirmado por cada sistema que consume los cambios
+CREATE TABLE CONSUMIDOR_CAMBIO (
+    nombre TEXT PRIMARY KEY,
+    ultimo_seq INTEGER NOT NULL DEFAULT 0,
+    fecha_confirmacion TEXT
+);
+
 -- ============================================
 -- 2. TRIGGERS (Reglas de Negocio Automáticas)
 -- ============================================
@@ -167,13 +276,190 @@ END;
 CREATE TRIGGER trg_marcar_prestamos_vencidos
 AFTER UPDATE ON PRESTAMO
 FOR EACH ROW
-WHEN (NEW.estado = 'activo' AND DATE('now') > DATE(NEW.fecha_vencimiento))
+WHEN (NEW.estado = 'activo' AND CAST(JULIANDAY('now') - 2440587.5 AS INTEGER) > NEW.dia_vencimiento)
 BEGIN
     UPDATE PRESTAMO 
     SET estado = 'vencido' 
     WHERE id_prestamo = NEW.id_prestamo;
 END;
 
+-- Triggers que mantienen el índice de trigramas al día con LIBRO
+CREATE TRIGGER trg_libro_trigrama_insert
+AFTER INSERT ON LIBRO
+FOR EACH ROW
+BEGIN
+    INSERT INTO LIBRO_TRIGRAMA_ID (isbn) VALUES (NEW.isbn);
+    INSERT INTO LIBRO_TRIGRAMA (rowid, titulo, autor)
+    SELECT t.id, v.titulo, v.autor
+    FROM v_libro_normalizado v JOIN LIBRO_TRIGRAMA_ID t ON t.isbn = v.isbn
+    WHERE v.isbn = NEW.isbn;
+END;
+
+CREATE TRIGGER trg_libro_trigrama_update
+AFTER UPDATE OF isbn, titulo, autor ON LIBRO
+FOR EACH ROW
+BEGIN
+    UPDATE LIBRO_TRIGRAMA_ID SET isbn = NEW.isbn WHERE isbn = OLD.isbn;
+    UPDATE LIBRO_TRIGRAMA
+    SET titulo = (SELECT titulo FROM v_libro_normalizado WHERE isbn = NEW.isbn),
+        autor = (SELECT autor FROM v_libro_normalizado WHERE isbn = NEW.isbn)
+    WHERE rowid = (SELECT id FROM LIBRO_TRIGRAMA_ID WHERE isbn = NEW.isbn);
+END;
+
+CREATE TRIGGER trg_libro_trigrama_delete
+AFTER DELETE ON LIBRO
+FOR EACH ROW
+BEGIN
+    DELETE FROM LIBRO_TRIGRAMA WHERE rowid = (SELECT id FROM LIBRO_TRIGRAMA_ID WHERE isbn = OLD.isbn);
+    DELETE FROM LIBRO_TRIGRAMA_ID WHERE isbn = OLD.isbn;
+END;
+
+-- Triggers de captura de cambios (alimentan REGISTRO_CAMBIO)
+
+CREATE TRIGGER trg_cdc_usuario_insert
+AFTER INSERT ON USUARIO
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('USUARIO', 'INSERT', NEW.rut);
+END;
+
+CREATE TRIGGER trg_cdc_usuario_update
+AFTER UPDATE ON USUARIO
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('USUARIO', 'UPDATE', NEW.rut);
+END;
+
+CREATE TRIGGER trg_cdc_usuario_delete
+AFTER DELETE ON USUARIO
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('USUARIO', 'DELETE', OLD.rut);
+END;
+
+-- Si cambia la clave primaria, la clave antigua deja de existir
+CREATE TRIGGER trg_cdc_usuario_cambio_clave
+AFTER UPDATE OF rut ON USUARIO
+FOR EACH ROW
+WHEN OLD.rut IS NOT NEW.rut
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('USUARIO', 'DELETE', OLD.rut);
+END;
+
+CREATE TRIGGER trg_cdc_libro_insert
+AFTER INSERT ON LIBRO
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('LIBRO', 'INSERT', NEW.isbn);
+END;
+
+CREATE TRIGGER trg_cdc_libro_update
+AFTER UPDATE ON LIBRO
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('LIBRO', 'UPDATE', NEW.isbn);
+END;
+
+CREATE TRIGGER trg_cdc_libro_delete
+AFTER DELETE ON LIBRO
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('LIBRO', 'DELETE', OLD.isbn);
+END;
+
+-- Si cambia la clave primaria, la clave antigua deja de existir
+CREATE TRIGGER trg_cdc_libro_cambio_clave
+AFTER UPDATE OF isbn ON LIBRO
+FOR EACH ROW
+WHEN OLD.isbn IS NOT NEW.isbn
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('LIBRO', 'DELETE', OLD.isbn);
+END;
+
+CREATE TRIGGER trg_cdc_ejemplar_insert
+AFTER INSERT ON EJEMPLAR
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('EJEMPLAR', 'INSERT', NEW.id_ejemplar);
+END;
+
+CREATE TRIGGER trg_cdc_ejemplar_update
+AFTER UPDATE ON EJEMPLAR
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('EJEMPLAR', 'UPDATE', NEW.id_ejemplar);
+END;
+
+CREATE TRIGGER trg_cdc_ejemplar_delete
+AFTER DELETE ON EJEMPLAR
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('EJEMPLAR', 'DELETE', OLD.id_ejemplar);
+END;
+
+CREATE TRIGGER trg_cdc_prestamo_insert
+AFTER INSERT ON PRESTAMO
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('PRESTAMO', 'INSERT', NEW.id_prestamo);
+END;
+
+CREATE TRIGGER trg_cdc_prestamo_update
+AFTER UPDATE ON PRESTAMO
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('PRESTAMO', 'UPDATE', NEW.id_prestamo);
+END;
+
+CREATE TRIGGER trg_cdc_prestamo_delete
+AFTER DELETE ON PRESTAMO
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('PRESTAMO', 'DELETE', OLD.id_prestamo);
+END;
+
+CREATE TRIGGER trg_cdc_multa_insert
+AFTER INSERT ON MULTA
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('MULTA', 'INSERT', NEW.id_multa);
+END;
+
+CREATE TRIGGER trg_cdc_multa_update
+AFTER UPDATE ON MULTA
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('MULTA', 'UPDATE', NEW.id_multa);
+END;
+
+CREATE TRIGGER trg_cdc_multa_delete
+AFTER DELETE ON MULTA
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('MULTA', 'DELETE', OLD.id_multa);
+END;
+
+CREATE TRIGGER trg_cdc_reserva_insert
+AFTER INSERT ON RESERVA
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('RESERVA', 'INSERT', NEW.id_reserva);
+END;
+
+CREATE TRIGGER trg_cdc_reserva_update
+AFTER UPDATE ON RESERVA
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('RESERVA', 'UPDATE', NEW.id_reserva);
+END;
+
+CREATE TRIGGER trg_cdc_reserva_delete
+AFTER DELETE ON RESERVA
+FOR EACH ROW
+BEGIN
+    INSERT INTO REGISTRO_CAMBIO (tabla, operacion, clave) VALUES ('RESERVA', 'DELETE', OLD.id_reserva);
+END;
+
 -- ============================================
 -- 3. ÍNDICES (Optimizaciones)
 -- ============================================
@@ -183,11 +469,23 @@ CREATE INDEX idx_libro_autor ON LIBRO (autor);
 CREATE INDEX idx_libro_categoria ON LIBRO (categoria);
 CREATE INDEX idx_ejemplar_isbn ON EJEMPLAR (isbn);
 CREATE INDEX idx_ejemplar_estado ON EJEMPLAR (estado);
+CREATE INDEX idx_ejemplar_ubicacion ON EJEMPLAR (ubicacion);
 CREATE INDEX idx_prestamo_usuario ON PRESTAMO (rut_usuario);
 CREATE INDEX idx_prestamo_ejemplar ON PRESTAMO (id_ejemplar);
 CREATE INDEX idx_prestamo_estado ON PRESTAMO (estado);
 CREATE INDEX idx_reserva_usuario ON RESERVA (rut_usuario);
 CREATE INDEX idx_reserva_isbn ON RESERVA (isbn);
+CREATE INDEX idx_multa_estado ON MULTA (estado);
+CREATE INDEX idx_prestamo_dia_prestamo ON PRESTAMO (dia_prestamo);
+CREATE INDEX idx_prestamo_dia_devolucion ON PRESTAMO (dia_devolucion);
+CREATE INDEX idx_multa_dia_generacion ON MULTA (dia_generacion);
+
+-- Vencimientos solo de los préstamos abiertos: los devueltos ya vencieron
+-- todos, así que en un índice completo "vence antes de X" abarcaría casi
+-- todo el historial
+CREATE INDEX idx_prestamo_dia_vencimiento
+ON PRESTAMO (dia_vencimiento)
+WHERE estado IN ('activo', 'vencido');
 
 -- Índice único condicional: solo un préstamo activo/vencido por ejemplar
 CREATE UNIQUE INDEX idx_prestamo_ejemplar_activo_o_vencido
@@ -199,6 +497,11 @@ CREATE UNIQUE INDEX idx_reserva_pendiente_unica
 ON RESERVA (rut_usuario, isbn)
 WHERE estado = 'pendiente';
 
+-- Índice único condicional: una copia solo puede tener un traslado en curso
+CREATE UNIQUE INDEX idx_traslado_pendiente_unico
+ON TRASLADO (codigo_barras)
+WHERE estado = 'enviado';
+
 -- ============================================
 -- 4. VISTAS (Reportes y KPIs)
 -- ============================================
@@ -218,8 +521,8 @@ SELECT
     p.fecha_vencimiento,
     p.estado,
     CASE
-        WHEN p.estado = 'vencido' OR DATE('now') > DATE(p.fecha_vencimiento) 
-        THEN CAST(JULIANDAY('now') - JULIANDAY(p.fecha_vencimiento) AS INTEGER)
+        WHEN p.estado = 'vencido' OR CAST(JULIANDAY('now') - 2440587.5 AS INTEGER) > p.dia_vencimiento
+        THEN CAST(JULIANDAY('now') - 2440587.5 AS INTEGER) - p.dia_vencimiento
         ELSE 0
     END AS dias_de_atraso
 FROM PRESTAMO p
@@ -238,7 +541,7 @@ SELECT
     l.autor,
     m.monto,
     m.fecha_generacion,
-    CAST(JULIANDAY('now') - JULIANDAY(m.fecha_generacion) AS INTEGER) AS dias_pendientes
+    CAST(JULIANDAY('now') - 2440587.5 AS INTEGER) - m.dia_generacion AS dias_pendientes
 FROM MULTA m
 JOIN PRESTAMO p ON m.id_prestamo = p.id_prestamo
 JOIN USUARIO u ON p.rut_usuario = u.rut
@@ -289,11 +592,26 @@ SELECT
     COUNT(CASE WHEN e.estado = 'disponible' THEN 1 END) AS ejemplares_disponibles,
     COUNT(CASE WHEN e.estado = 'prestado' THEN 1 END) AS ejemplares_prestados,
     COUNT(CASE WHEN e.estado = 'en_reparacion' THEN 1 END) AS ejemplares_reparacion,
-    COUNT(CASE WHEN e.estado IN ('perdido', 'baja') THEN 1 END) AS ejemplares_fuera_servicio
+    COUNT(CASE WHEN e.estado IN ('perdido', 'baja', 'en_traslado', 'trasladado') THEN 1 END) AS ejemplares_fuera_servicio
 FROM LIBRO l
 LEFT JOIN EJEMPLAR e ON l.isbn = e.isbn
 GROUP BY l.isbn, l.titulo, l.autor, l.categoria;
 
+-- Título y autor en minúsculas y sin tildes, tal como los indexa LIBRO_TRIGRAMA
+-- (LOWER de SQLite solo convierte ASCII, por eso las vocales con tilde van aparte)
+CREATE VIEW v_libro_normalizado AS
+SELECT
+    isbn,
+    LOWER(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(
+          REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(titulo,
+          'á', 'a'), 'é', 'e'), 'í', 'i'), 'ó', 'o'), 'ú', 'u'), 'ü', 'u'), 'ñ', 'n'),
+          'Á', 'a'), 'É', 'e'), 'Í', 'i'), 'Ó', 'o'), 'Ú', 'u'), 'Ü', 'u'), 'Ñ', 'n')) AS titulo,
+    LOWER(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(
+          REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(COALESCE(autor, ''),
+          'á', 'a'), 'é', 'e'), 'í', 'i'), 'ó', 'o'), 'ú', 'u'), 'ü', 'u'), 'ñ', 'n'),
+          'Á', 'a'), 'É', 'e'), 'Í', 'i'), 'Ó', 'o'), 'Ú', 'u'), 'Ü', 'u'), 'Ñ', 'n')) AS autor
+FROM LIBRO;
+
 -- ============================================
 -- 5. DML (Carga de Datos de Prueba)
 -- ============================================
@@ -0,0 +1,124 @@
+"""
+Búsqueda Tolerante a Errores de Tipeo ("¿quisiste decir?")
+Sistema de Gestión de Biblioteca UFT
+
+Usa el índice FTS5 de trigramas LIBRO_TRIGRAMA (título y autor sin tildes,
+mantenido por triggers) para encontrar libros aunque el texto buscado tenga
+errores: "Garcia Marques", "Cervantez", "cien anos".
+
+El costo queda acotado aunque el catálogo tenga cientos de miles de títulos:
+  1. De los trigramas del texto buscado solo se consultan los más raros
+     (según LIBRO_TRIGRAMA_VOCAB), hasta un tope de documentos en total.
+  2. FTS5 devuelve a lo más `candidatos` filas ordenadas por relevancia.
+  3. Solo esos candidatos se puntúan en Python por similitud de trigramas.
+"""
+
+import re
+import unicodedata
+
+def normalizar(texto):
+    """Minúsculas, sin tildes ni puntuación (como v_libro_normalizado, que conserva la puntuación)"""
+    descompuesto = unicodedata.normalize('NFKD', texto or "")
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^\w\s]", " ", sin_tildes.lower()).split())
+
+def trigramas_palabra(palabra):
+    if len(palabra) < 3:
+        return {palabra}
+    return {palabra[i:i + 3] for i in range(len(palabra) - 2)}
+
+def trigramas(texto):
+    """Trigramas de cada palabra (sin cruzar espacios)"""
+    resultado = set()
+    for palabra in texto.split():
+        if len(palabra) >= 3:
+            resultado |= trigramas_palabra(palabra)
+    return resultado
+
+def similitud(palabras_buscadas, texto_candidato):
+    """
+    Promedio, sobre las palabras buscadas, de la mejor similitud de Jaccard
+    (por trigramas) con alguna palabra del candidato. Así "marques" se
+    compara con "marquez" y no con el título completo.
+    """
+    palabras_candidato = [trigramas_palabra(p) for p in texto_candidato.split()]
+    if not palabras_buscadas or not palabras_candidato:
+        return 0.0
+
+    total = 0.0
+    for buscada in palabras_buscadas:
+        mejor = 0.0
+        for candidata in palabras_candidato:
+            union = len(buscada | candidata)
+            if union:
+                mejor = max(mejor, len(buscada & candidata) / union)
+        total += mejor
+    return total / len(palabras_buscadas)
+
+def elegir_trigramas(frecuencias, max_trigramas=8, min_trigramas=4, max_documentos=20000):
+    """
+    Los trigramas más raros, hasta que sus listas de documentos sumen
+    `max_documentos` (siempre al menos `min_trigramas`, si existen).
+    El mínimo importa: los trigramas más raros suelen ser justamente los del
+    error de tipeo, que no aparecen en el libro buscado.
+    """
+    elegidos, documentos = [], 0
+    for term, doc in sorted(frecuencias, key=lambda f: f[1]):
+        if len(elegidos) >= max_trigramas:
+            break
+        if len(elegidos) >= min_trigramas and documentos + doc > max_documentos:
+            break
+        elegidos.append(term)
+        documentos += doc
+    return elegidos
+
+def buscar_similares(conn, texto, n=5, candidatos=200, max_trigramas=8, umbral=0.4):
+    """
+    Los n libros más parecidos a `texto` por título o autor, como dicts
+    (isbn, titulo, autor, similitud), de mayor a menor similitud.
+    """
+    buscado = normalizar(texto)
+    trigramas_buscados = trigramas(buscado)
+    if not trigramas_buscados:
+        return []
+
+    # 1. Los trigramas más raros que existen en el catálogo
+    marcadores = ", ".join("?" * len(trigramas_buscados))
+    frecuencias = conn.execute(
+        f"SELECT term, doc FROM LIBRO_TRIGRAMA_VOCAB WHERE term IN ({marcadores})",
+        list(trigramas_buscados)).fetchall()
+    if not frecuencias:
+        return []
+    raros = elegir_trigramas(frecuencias, max_trigramas)
+
+    # 2. Candidatos que contienen alguno de ellos (FTS5 ordena por bm25)
+    consulta = " OR ".join('"' + t.replace('"', '""') + '"' for t in raros)
+    filas = conn.execute(
+        """SELECT t.isbn, l.titulo, l.autor, f.titulo, f.autor
+           FROM (SELECT rowid, titulo, autor FROM LIBRO_TRIGRAMA
+                 WHERE LIBRO_TRIGRAMA MATCH ? ORDER BY rank LIMIT ?) f
+           JOIN LIBRO_TRIGRAMA_ID t ON t.id = f.rowid
+           JOIN LIBRO l ON l.isbn = t.isbn""", (consulta, candidatos)).fetchall()
+
+    # 3. Puntuación fina solo sobre los candidatos
+    palabras_buscadas = [trigramas_palabra(p) for p in buscado.split() if len(p) >= 3]
+    resultados = []
+    for isbn, titulo, autor, titulo_norm, autor_norm in filas:
+        puntaje = similitud(palabras_buscadas, normalizar(f"{titulo_norm} {autor_norm}"))
+        if puntaje >= umbral:
+            resultados.append({'isbn': isbn, 'titulo': titulo, 'autor': autor,
+                               'similitud': round(puntaje, 3)})
+
+    resultados.sort(key=lambda r: (-r['similitud'], len(r['titulo'])))
+    return resultados[:n]
+
+def reconstruir_indice(conn):
+    """Vuelve a llenar LIBRO_TRIGRAMA desde LIBRO (por ejemplo, tras una carga masiva sin triggers)"""
+    with conn:
+        conn.execute("DELETE FROM LIBRO_TRIGRAMA")
+        conn.execute("DELETE FROM LIBRO_TRIGRAMA_ID WHERE isbn NOT IN (SELECT isbn FROM LIBRO)")
+        conn.execute("INSERT OR IGNORE INTO LIBRO_TRIGRAMA_ID (isbn) SELECT isbn FROM LIBRO")
+        conn.execute("""INSERT INTO LIBRO_TRIGRAMA (rowid, titulo, autor)
+                        SELECT t.id, v.titulo, v.autor
+                        FROM v_libro_normalizado v JOIN LIBRO_TRIGRAMA_ID t ON t.isbn = v.isbn""")
+        conn.execute("INSERT INTO LIBRO_TRIGRAMA (LIBRO_TRIGRAMA) VALUES ('optimize')")
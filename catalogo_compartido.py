@@ -0,0 +1,256 @@
+"""
+Catálogo Compartido en Memoria
+Sistema de Gestión de Biblioteca UFT
+
+Una sola copia del catálogo (LIBRO) y del inventario (EJEMPLAR) por proceso,
+compartida por todas las sesiones de la app. Antes cada sesión armaba
+DataFrames completos con obtener_catalogo() y obtener_inventario() solo
+para llenar listas y buscar, y la memoria crecía con cada usuario conectado.
+
+  - Los registros usan __slots__ (sin __dict__ por objeto).
+  - Los textos que se repiten (categoría, idioma, editorial, estado,
+    ubicación, condición) se internan: todas las copias comparten el mismo
+    objeto str. El ISBN de cada ejemplar es el mismo objeto que el del libro.
+  - Índices por ISBN, por código de barras y por id_ejemplar.
+  - Se actualiza de forma incremental leyendo REGISTRO_CAMBIO (los triggers
+    trg_cdc_*) desde el último seq visto. Si el registro fue podado más allá
+    de ese punto, o la BD se restauró, se recarga completa.
+
+Las búsquedas recorren los diccionarios sin copiarlos y se detienen al
+llegar al límite. Para que otro hilo pueda actualizar la instantánea
+mientras tanto, los registros nunca se modifican (se reemplazan) y las
+altas y bajas se hacen sobre una copia del diccionario que luego reemplaza
+al anterior. Las funciones que devuelven varios registros entregan listas
+nuevas.
+"""
+
+import sys
+import threading
+from itertools import islice
+
+# Columnas con pocos valores distintos: se guarda un solo str por valor
+_internar = sys.intern
+
+class Libro:
+    __slots__ = ('isbn', 'titulo', 'autor', 'editorial', 'anio', 'categoria', 'idioma', 'num_paginas')
+
+    def __init__(self, isbn, titulo, autor, editorial, anio, categoria, idioma, num_paginas):
+        self.isbn = isbn
+        self.titulo = titulo
+        self.autor = autor
+        self.editorial = _internar(editorial) if editorial else editorial
+        self.anio = anio
+        self.categoria = _internar(categoria) if categoria else categoria
+        self.idioma = _internar(idioma) if idioma else idioma
+        self.num_paginas = num_paginas
+
+    def fila(self):
+        """Misma forma que datos_biblioteca.obtener_catalogo()"""
+        return (self.isbn, self.titulo, self.autor, self.editorial, self.anio,
+                self.categoria, self.idioma, self.num_paginas)
+
+class Ejemplar:
+    __slots__ = ('id_ejemplar', 'isbn', 'codigo_barras', 'estado', 'ubicacion', 'condicion')
+
+    def __init__(self, id_ejemplar, isbn, codigo_barras, estado, ubicacion, condicion):
+        self.id_ejemplar = id_ejemplar
+        self.isbn = isbn
+        self.codigo_barras = codigo_barras
+        self.estado = _internar(estado)
+        self.ubicacion = _internar(ubicacion) if ubicacion else ubicacion
+        self.condicion = _internar(condicion)
+
+COLUMNAS_LIBRO = "isbn, titulo, autor, editorial, anio, categoria, idioma, num_paginas"
+COLUMNAS_EJEMPLAR = "id_ejemplar, isbn, codigo_barras, estado, ubicacion, condicion"
+
+class InstantaneaCatalogo:
+    """Catálogo e inventario en memoria, al día hasta el seq `ultimo_seq` de REGISTRO_CAMBIO"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._bloqueo = threading.Lock()
+        self.recargas = 0
+        self.cambios_aplicados = 0
+        self._cargar()
+
+    # --- Carga y actualización ---
+
+    def _seq_actual(self):
+        """(MIN(seq), MAX(seq)) del registro de cambios; (None, None) si está vacío"""
+        return self.conn.execute("SELECT MIN(seq), MAX(seq) FROM REGISTRO_CAMBIO").fetchone()
+
+    def _cargar(self):
+        """Carga completa desde LIBRO y EJEMPLAR"""
+        # El seq se lee antes que los datos: un cambio que ocurra entre medio
+        # se volverá a aplicar en la siguiente actualización, nunca se pierde
+        ultimo_seq = self._seq_actual()[1] or 0
+
+        libros = {}
+        for fila in self.conn.execute(f"SELECT {COLUMNAS_LIBRO} FROM LIBRO"):
+            libros[fila[0]] = Libro(*fila)
+
+        ejemplares = {}
+        por_codigo = {}
+        for id_ej, isbn, codigo, estado, ubicacion, condicion in self.conn.execute(
+                f"SELECT {COLUMNAS_EJEMPLAR} FROM EJEMPLAR"):
+            libro = libros.get(isbn)
+            ejemplar = Ejemplar(id_ej, libro.isbn if libro else isbn, codigo, estado, ubicacion, condicion)
+            ejemplares[id_ej] = ejemplar
+            por_codigo[codigo] = ejemplar
+
+        self.libros = libros
+        self.ejemplares = ejemplares
+        self.por_codigo = por_codigo
+        self.ultimo_seq = ultimo_seq
+        self._isbns_ordenados = None
+        self._ids_ordenados = None
+        self.recargas += 1
+
+    def actualizar(self):
+        """
+        Aplica los cambios de LIBRO y EJEMPLAR registrados después de
+        ultimo_seq. Si otro hilo ya está actualizando, no espera: sigue con
+        los datos actuales. Devuelve la cantidad de cambios aplicados.
+        """
+        if not self._bloqueo.acquire(blocking=False):
+            return 0
+        try:
+            minimo, maximo = self._seq_actual()
+            if maximo is None or maximo == self.ultimo_seq:
+                return 0
+            if maximo < self.ultimo_seq or minimo > self.ultimo_seq + 1:
+                # BD restaurada o registro podado: ya no se sabe qué cambió
+                self._cargar()
+                return 0
+
+            cambios = self.conn.execute(
+                """SELECT tabla, clave FROM REGISTRO_CAMBIO
+                   WHERE seq > ? AND seq <= ? AND tabla IN ('LIBRO', 'EJEMPLAR')""",
+                (self.ultimo_seq, maximo)).fetchall()
+            claves_libro = {clave for tabla, clave in cambios if tabla == 'LIBRO'}
+            claves_ejemplar = {int(clave) for tabla, clave in cambios if tabla == 'EJEMPLAR'}
+
+            # Primero los libros, para que los ejemplares apunten al ISBN vigente
+            self._refrescar_libros(claves_libro)
+            self._refrescar_ejemplares(claves_ejemplar)
+
+            self.ultimo_seq = maximo
+            self.cambios_aplicados += len(cambios)
+            return len(cambios)
+        finally:
+            self._bloqueo.release()
+
+    def _filas_por_clave(self, tabla, columnas, pk, claves):
+        """Filas actuales de las claves dadas, en grupos que respetan el límite de parámetros"""
+        claves = list(claves)
+        for inicio in range(0, len(claves), 500):
+            grupo = claves[inicio:inicio + 500]
+            marcadores = ", ".join("?" * len(grupo))
+            yield from self.conn.execute(
+                f"SELECT {columnas} FROM {tabla} WHERE {pk} IN ({marcadores})", grupo)
+
+    def _refrescar_libros(self, claves):
+        # Sin importar el orden de INSERT/UPDATE/DELETE: lo que existe se
+        # reemplaza y lo que ya no está en la tabla se quita. Un registro
+        # nunca se modifica: otro hilo podría leerlo a medio cambiar.
+        filas = list(self._filas_por_clave('LIBRO', COLUMNAS_LIBRO, 'isbn', claves))
+        quitados = claves - {fila[0] for fila in filas}
+        # Altas y bajas cambian el tamaño del dict: se hacen sobre una copia
+        libros = self.libros
+        if any(fila[0] not in libros for fila in filas) or any(isbn in libros for isbn in quitados):
+            libros = dict(libros)
+        for fila in filas:
+            anterior = libros.get(fila[0])
+            # El mismo str de ISBN que ya comparten sus ejemplares
+            libros[fila[0]] = Libro(anterior.isbn if anterior else fila[0], *fila[1:])
+        for isbn in quitados:
+            libros.pop(isbn, None)
+        if libros is not self.libros:
+            self.libros = libros
+            self._isbns_ordenados = None
+
+    def _refrescar_ejemplares(self, claves):
+        filas = list(self._filas_por_clave('EJEMPLAR', COLUMNAS_EJEMPLAR, 'id_ejemplar', claves))
+        quitados = claves - {fila[0] for fila in filas}
+        ejemplares, por_codigo = self.ejemplares, self.por_codigo
+        if any(fila[0] not in ejemplares for fila in filas) or any(i in ejemplares for i in quitados):
+            ejemplares = dict(ejemplares)
+        if ejemplares is not self.ejemplares or any(
+                fila[0] in ejemplares and ejemplares[fila[0]].codigo_barras != fila[2] for fila in filas):
+            por_codigo = dict(por_codigo)
+
+        for id_ej, isbn, codigo, estado, ubicacion, condicion in filas:
+            libro = self.libros.get(isbn)
+            isbn = libro.isbn if libro else isbn
+            anterior = ejemplares.get(id_ej)
+            if (anterior is not None and anterior.codigo_barras != codigo
+                    and por_codigo.get(anterior.codigo_barras) is anterior):
+                del por_codigo[anterior.codigo_barras]
+            ejemplar = Ejemplar(id_ej, isbn, codigo, estado, ubicacion, condicion)
+            ejemplares[id_ej] = ejemplar
+            por_codigo[codigo] = ejemplar
+        for id_ej in quitados:
+            ejemplar = ejemplares.pop(id_ej, None)
+            if ejemplar is not None and por_codigo.get(ejemplar.codigo_barras) is ejemplar:
+                del por_codigo[ejemplar.codigo_barras]
+
+        if ejemplares is not self.ejemplares:
+            self.ejemplares = ejemplares
+            self._ids_ordenados = None
+        self.por_codigo = por_codigo
+
+    # --- Consultas ---
+
+    def libro(self, isbn):
+        return self.libros.get(isbn)
+
+    def ejemplar(self, id_ejemplar):
+        return self.ejemplares.get(id_ejemplar)
+
+    def ejemplar_por_codigo(self, codigo_barras):
+        return self.por_codigo.get(codigo_barras)
+
+    def titulo(self, ejemplar):
+        libro = self.libros.get(ejemplar.isbn)
+        return libro.titulo if libro else None
+
+    def isbns(self):
+        """ISBN ordenados (la lista se arma una vez y se comparte mientras no cambien los libros)"""
+        isbns = self._isbns_ordenados
+        if isbns is None:
+            isbns = self._isbns_ordenados = sorted(self.libros)
+        return isbns
+
+    def ids_ejemplares(self):
+        """id_ejemplar ordenados (compartidos igual que isbns())"""
+        ids = self._ids_ordenados
+        if ids is None:
+            ids = self._ids_ordenados = sorted(self.ejemplares)
+        return ids
+
+    def buscar_libros(self, texto=None, limite=None):
+        """Libros cuyo título, autor o ISBN contienen `texto` (sin distinguir mayúsculas)"""
+        libros = self.libros.values()
+        if texto:
+            buscado = texto.casefold()
+            libros = (l for l in libros
+                      if buscado in l.titulo.casefold() or buscado in (l.autor or "").casefold()
+                      or texto in l.isbn)
+        return list(islice(libros, limite or None))
+
+    def buscar_ejemplares(self, texto=None, estado=None, limite=None):
+        """Ejemplares por estado y por código de barras o título"""
+        ejemplares = self.ejemplares.values()
+        if estado:
+            ejemplares = (e for e in ejemplares if e.estado == estado)
+        if texto:
+            # El título se compara una vez por libro, no una vez por copia
+            buscado = texto.casefold()
+            isbns = {l.isbn for l in self.libros.values() if buscado in l.titulo.casefold()}
+            ejemplares = (e for e in ejemplares if e.isbn in isbns or texto in e.codigo_barras)
+        return list(islice(ejemplares, limite or None))
+
+    def filas_inventario(self, ejemplares):
+        """Misma forma que datos_biblioteca.obtener_inventario()"""
+        return [(e.id_ejemplar, e.isbn, self.titulo(e), e.codigo_barras, e.estado, e.ubicacion, e.condicion)
+                for e in ejemplares]
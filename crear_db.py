@@ -1,8 +1,11 @@
 import sqlite3
 import os
+import sys
 
 # Configuración de archivos
-nombre_db = 'biblioteca.db'
+# Opcionalmente se indica otro archivo, por ejemplo la BD de otra sede:
+#   python crear_db.py biblioteca_vina.db
+nombre_db = sys.argv[1] if len(sys.argv) > 1 else 'biblioteca.db'
 archivo_sql = 'biblioteca.db.sql'
 
 print(f"Iniciando proceso de creación para: {nombre_db}...")
@@ -0,0 +1,331 @@
+"""
+Capa de Datos
+Sistema de Gestión de Biblioteca UFT
+
+Todas las consultas SQL de la aplicación. Solo depende de sqlite3: se puede
+importar desde scripts (verificar_instalacion.py, benchmarks, tareas por
+consola) sin cargar Streamlit, pandas ni plotly, y sin efectos secundarios.
+Las funciones de lectura devuelven listas de tuplas; la app las convierte en
+DataFrames con los nombres de columna que muestra en pantalla.
+"""
+
+import sys
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import date, datetime
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import sedes
+import busqueda
+import catalogo_compartido
+
+def _error_por_defecto(mensaje):
+    print(mensaje, file=sys.stderr)
+
+# La app reemplaza esto por st.error para mostrar los errores en pantalla
+_notificar_error = _error_por_defecto
+
+def registrar_notificador(funcion):
+    """Define cómo se informan los errores de BD (por defecto, a stderr)"""
+    global _notificar_error
+    _notificar_error = funcion
+
+# Estado de cada hilo del pool de lectura (ver cargar_en_paralelo): su propia
+# conexión y la lista donde se guardan sus errores
+_hilo = threading.local()
+
+def _avisar(mensaje):
+    # st.error solo funciona en el hilo de la app: desde el pool el error se
+    # guarda y lo informa cargar_en_paralelo al terminar
+    errores = getattr(_hilo, 'errores', None)
+    if errores is not None:
+        errores.append(mensaje)
+    else:
+        _notificar_error(mensaje)
+
+# ---------------------------------------------------------
+# 1. CONEXIÓN A BASE DE DATOS
+# ---------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def conectar_bd():
+    """Abre (una sola vez por proceso) la conexión con el archivo SQLite de la sede local"""
+    try:
+        # check_same_thread=False es necesario para que no falle con Streamlit
+        return sqlite3.connect(sedes.ruta_sede(), check_same_thread=False)
+    except Exception as error:
+        _notificar_error(f"No se pudo conectar a la base de datos: {error}")
+        return None
+
+def ejecutar_sql(consulta, parametros=None, obtener_datos=True):
+    """Función para ejecutar cualquier query SQL"""
+    # En los hilos del pool de lectura, cada uno usa su propia conexión
+    conexion = getattr(_hilo, 'conexion', None) or conectar_bd()
+    if conexion is None:
+        return None
+
+    try:
+        cursor = conexion.cursor()
+        if parametros:
+            cursor.execute(consulta, parametros)
+        else:
+            cursor.execute(consulta)
+
+        if obtener_datos:
+            return cursor.fetchall()
+        else:
+            conexion.commit()
+            return True
+    except Exception as e:
+        _avisar(f"Error en la consulta SQL: {e}")
+        return None
+
+@lru_cache(maxsize=None)
+def _instantanea_catalogo():
+    return catalogo_compartido.InstantaneaCatalogo(conectar_bd())
+
+def catalogo_en_memoria():
+    """Catálogo e inventario en memoria, compartidos por todas las sesiones y al día con la BD"""
+    instantanea = _instantanea_catalogo()
+    instantanea.actualizar()
+    return instantanea
+
+# Día 0 de las columnas dia_* de PRESTAMO y MULTA
+_EPOCA = date(1970, 1, 1)
+
+def numero_dia(fecha):
+    """Días desde 1970-01-01 de un date/datetime o un texto 'YYYY-MM-DD' (como las columnas dia_*)"""
+    if isinstance(fecha, str):
+        fecha = date.fromisoformat(fecha[:10])
+    elif isinstance(fecha, datetime):
+        fecha = fecha.date()
+    return (fecha - _EPOCA).days
+
+# ---------------------------------------------------------
+# 2. FUNCIONES CRUD (Lógica del sistema)
+# ---------------------------------------------------------
+
+# --- USUARIOS ---
+def insertar_usuario(rut, nombre, correo, direccion, telefono, tipo):
+    sql = """INSERT INTO USUARIO (rut, nombre, correo, direccion, telefono, tipo_usuario)
+             VALUES (?, ?, ?, ?, ?, ?)"""
+    return ejecutar_sql(sql, (rut, nombre, correo, direccion, telefono, tipo), obtener_datos=False)
+
+def obtener_usuarios():
+    sql = "SELECT rut, nombre, correo, direccion, telefono, tipo_usuario FROM USUARIO"
+    return ejecutar_sql(sql)
+
+def modificar_usuario(rut, nombre, correo, direccion, telefono, tipo):
+    sql = """UPDATE USUARIO SET nombre=?, correo=?, direccion=?, telefono=?, tipo_usuario=?
+             WHERE rut=?"""
+    return ejecutar_sql(sql, (nombre, correo, direccion, telefono, tipo, rut), obtener_datos=False)
+
+def borrar_usuario(rut):
+    sql = "DELETE FROM USUARIO WHERE rut=?"
+    return ejecutar_sql(sql, (rut,), obtener_datos=False)
+
+# --- LIBROS ---
+def insertar_libro(isbn, titulo, editorial, anio, cat, autor, idioma, pags):
+    sql = """INSERT INTO LIBRO (isbn, titulo, editorial, anio, categoria, autor, idioma, num_paginas)
+             VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+    return ejecutar_sql(sql, (isbn, titulo, editorial, anio, cat, autor, idioma, pags), obtener_datos=False)
+
+def obtener_catalogo():
+    sql = "SELECT isbn, titulo, autor, editorial, anio, categoria, idioma, num_paginas FROM LIBRO"
+    return ejecutar_sql(sql)
+
+def modificar_libro(isbn, titulo, editorial, anio, cat, autor, idioma, pags):
+    sql = """UPDATE LIBRO SET titulo=?, editorial=?, anio=?, categoria=?, autor=?, idioma=?, num_paginas=?
+             WHERE isbn=?"""
+    return ejecutar_sql(sql, (titulo, editorial, anio, cat, autor, idioma, pags, isbn), obtener_datos=False)
+
+def borrar_libro(isbn):
+    sql = "DELETE FROM LIBRO WHERE isbn=?"
+    return ejecutar_sql(sql, (isbn,), obtener_datos=False)
+
+def sugerir_libros(texto, n=5):
+    """Libros con título o autor parecido a `texto` aunque tenga errores de tipeo"""
+    conexion = conectar_bd()
+    if conexion is None:
+        return []
+    try:
+        return busqueda.buscar_similares(conexion, texto, n)
+    except sqlite3.Error as e:
+        _notificar_error(f"Error en la búsqueda aproximada: {e}")
+        return []
+
+# --- EJEMPLARES ---
+def insertar_ejemplar(isbn, codigo, estado, ubicacion, condicion):
+    sql = """INSERT INTO EJEMPLAR (isbn, codigo_barras, estado, ubicacion, condicion)
+             VALUES (?, ?, ?, ?, ?)"""
+    return ejecutar_sql(sql, (isbn, codigo, estado, ubicacion, condicion), obtener_datos=False)
+
+def obtener_inventario():
+    sql = """SELECT e.id_ejemplar, e.isbn, l.titulo, e.codigo_barras, e.estado, e.ubicacion, e.condicion
+             FROM EJEMPLAR e JOIN LIBRO l ON e.isbn = l.isbn"""
+    return ejecutar_sql(sql)
+
+def obtener_copias_disponibles():
+    sql = """SELECT e.id_ejemplar, e.codigo_barras, l.titulo
+             FROM EJEMPLAR e JOIN LIBRO l ON e.isbn = l.isbn
+             WHERE e.estado='disponible'"""
+    return ejecutar_sql(sql)
+
+def modificar_ejemplar(id_ej, estado, ubicacion, condicion):
+    sql = "UPDATE EJEMPLAR SET estado=?, ubicacion=?, condicion=? WHERE id_ejemplar=?"
+    return ejecutar_sql(sql, (estado, ubicacion, condicion, id_ej), obtener_datos=False)
+
+def borrar_ejemplar(id_ej):
+    sql = "DELETE FROM EJEMPLAR WHERE id_ejemplar=?"
+    return ejecutar_sql(sql, (id_ej,), obtener_datos=False)
+
+# --- PRÉSTAMOS ---
+def registrar_prestamo(rut, id_ejemplar, vencimiento):
+    fecha_hoy = datetime.now().strftime('%Y-%m-%d')
+    sql = """INSERT INTO PRESTAMO (rut_usuario, id_ejemplar, fecha_prestamo, fecha_vencimiento, estado)
+             VALUES (?, ?, ?, ?, 'activo')"""
+    return ejecutar_sql(sql, (rut, id_ejemplar, fecha_hoy, vencimiento), obtener_datos=False)
+
+def obtener_historial_prestamos(desde=None, hasta=None):
+    """Del más reciente al más antiguo; desde/hasta (inclusive) filtran por fecha de préstamo"""
+    if desde is None and hasta is None:
+        # Historial completo: ordenar los números de día es más rápido que
+        # recorrer el índice y buscar cada préstamo por separado (de ahí el +)
+        sql = """SELECT p.id_prestamo, u.nombre, l.titulo, e.codigo_barras,
+                 p.fecha_prestamo, p.fecha_vencimiento, p.fecha_devolucion, p.estado
+                 FROM PRESTAMO p
+                 JOIN USUARIO u ON p.rut_usuario = u.rut
+                 JOIN EJEMPLAR e ON p.id_ejemplar = e.id_ejemplar
+                 JOIN LIBRO l ON e.isbn = l.isbn
+                 ORDER BY +p.dia_prestamo DESC"""
+        return ejecutar_sql(sql)
+
+    # Con rango, idx_prestamo_dia_prestamo entrega solo esas filas y ya ordenadas
+    sql = """SELECT p.id_prestamo, u.nombre, l.titulo, e.codigo_barras,
+             p.fecha_prestamo, p.fecha_vencimiento, p.fecha_devolucion, p.estado
+             FROM PRESTAMO p
+             JOIN USUARIO u ON p.rut_usuario = u.rut
+             JOIN EJEMPLAR e ON p.id_ejemplar = e.id_ejemplar
+             JOIN LIBRO l ON e.isbn = l.isbn
+             WHERE p.dia_prestamo BETWEEN ? AND ?
+             ORDER BY p.dia_prestamo DESC"""
+    return ejecutar_sql(sql, (numero_dia(desde or date.min), numero_dia(hasta or date.max)))
+
+def obtener_prestamos_por_devolver():
+    sql = """SELECT p.id_prestamo, u.nombre, l.titulo
+             FROM PRESTAMO p
+             JOIN USUARIO u ON p.rut_usuario=u.rut
+             JOIN EJEMPLAR e ON p.id_ejemplar=e.id_ejemplar
+             JOIN LIBRO l ON e.isbn=l.isbn
+             WHERE p.estado IN ('activo','vencido')"""
+    return ejecutar_sql(sql)
+
+def registrar_devolucion(id_prestamo):
+    fecha_hoy = datetime.now().strftime('%Y-%m-%d')
+    sql = "UPDATE PRESTAMO SET fecha_devolucion=?, estado='devuelto' WHERE id_prestamo=?"
+    return ejecutar_sql(sql, (fecha_hoy, id_prestamo), obtener_datos=False)
+
+def borrar_prestamo(id_prestamo):
+    sql = "DELETE FROM PRESTAMO WHERE id_prestamo=?"
+    return ejecutar_sql(sql, (id_prestamo,), obtener_datos=False)
+
+# --- ESTADÍSTICAS Y REPORTES ---
+def cargar_stats_generales():
+    datos = {}
+    datos['usuarios'] = ejecutar_sql("SELECT COUNT(*) FROM USUARIO")[0][0]
+    datos['libros'] = ejecutar_sql("SELECT COUNT(*) FROM LIBRO")[0][0]
+    datos['prestamos'] = ejecutar_sql("SELECT COUNT(*) FROM PRESTAMO WHERE estado IN ('activo', 'vencido')")[0][0]
+
+    # Manejo de nulos en la suma
+    total_multas = ejecutar_sql("SELECT SUM(monto) FROM MULTA WHERE estado='pendiente'")[0][0]
+    datos['deuda'] = total_multas if total_multas else 0
+
+    return datos
+
+def cargar_prestamos_activos_vista():
+    return ejecutar_sql("SELECT * FROM v_prestamos_activos")
+
+def cargar_multas_vista():
+    return ejecutar_sql("SELECT * FROM v_multas_pendientes")
+
+def cargar_ranking_libros():
+    return ejecutar_sql("SELECT * FROM v_kpi_ranking_libros LIMIT 10")
+
+def cargar_disponibilidad():
+    return ejecutar_sql("SELECT * FROM v_disponibilidad_ejemplares")
+
+def cargar_categorias():
+    return ejecutar_sql("SELECT categoria, COUNT(*) as num FROM LIBRO GROUP BY categoria")
+
+def cargar_ranking_usuarios():
+    sql = """SELECT u.nombre, u.tipo_usuario, COUNT(p.id_prestamo) as total
+             FROM USUARIO u JOIN PRESTAMO p ON u.rut = p.rut_usuario
+             GROUP BY u.rut ORDER BY total DESC LIMIT 10"""
+    return ejecutar_sql(sql)
+
+# ---------------------------------------------------------
+# 3. CARGA EN PARALELO (Tablero de inicio)
+# ---------------------------------------------------------
+
+# Consultas independientes del tablero; 'stats' también la usa el sidebar
+CONSULTAS_TABLERO = {
+    'stats': cargar_stats_generales,
+    'ranking_libros': cargar_ranking_libros,
+    'categorias': cargar_categorias,
+    'prestamos_activos': cargar_prestamos_activos_vista,
+}
+
+def _conectar_lectura():
+    """Conexión de solo lectura a la sede local: nunca bloquea las escrituras de la app"""
+    return sqlite3.connect(Path(sedes.ruta_sede()).resolve().as_uri() + "?mode=ro", uri=True)
+
+@lru_cache(maxsize=None)
+def _pool_lectura():
+    # Los hilos (y sus conexiones) se reutilizan entre una carga y otra
+    return ThreadPoolExecutor(max_workers=len(CONSULTAS_TABLERO), thread_name_prefix="lectura")
+
+def _cargar_en_hilo(funcion, errores):
+    """Ejecuta `funcion` con la conexión de lectura del hilo; devuelve (resultado, ms)"""
+    if getattr(_hilo, 'conexion', None) is None:
+        try:
+            _hilo.conexion = _conectar_lectura()
+        except Exception as error:
+            # Sin conexión propia, ejecutar_sql usa la compartida
+            errores.append(f"No se pudo abrir una conexión de lectura: {error}")
+    _hilo.errores = errores
+    inicio = time.perf_counter()
+    try:
+        return funcion(), (time.perf_counter() - inicio) * 1000
+    finally:
+        _hilo.errores = None
+
+def cargar_en_paralelo(consultas):
+    """
+    Ejecuta a la vez funciones de lectura sin parámetros ({nombre: función}),
+    cada una en un hilo con su propia conexión. Una función que aparece con
+    varios nombres se ejecuta una sola vez. Devuelve ({nombre: resultado},
+    {nombre: ms}); la latencia total es la de la consulta más lenta.
+    """
+    pool = _pool_lectura()
+    futuros, errores = {}, {}
+    for funcion in consultas.values():
+        if funcion not in futuros:
+            errores[funcion] = []
+            futuros[funcion] = pool.submit(_cargar_en_hilo, funcion, errores[funcion])
+    wait(futuros.values())
+
+    for funcion in futuros:
+        for mensaje in errores[funcion]:
+            _notificar_error(mensaje)
+
+    resultados, tiempos = {}, {}
+    for nombre, funcion in consultas.items():
+        resultados[nombre], tiempos[nombre] = futuros[funcion].result()
+    return resultados, tiempos
+
+def cargar_tablero():
+    """Datos del tablero de inicio (CONSULTAS_TABLERO) cargados en paralelo: (resultados, ms)"""
+    return cargar_en_paralelo(CONSULTAS_TABLERO)
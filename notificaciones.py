@@ -0,0 +1,375 @@
+"""
+Avisos por Correo: préstamos por vencer, atrasos y multas pendientes
+Sistema de Gestión de Biblioteca UFT
+
+Selecciona en una sola consulta a todos los usuarios con préstamos por
+vencer, préstamos atrasados o multas impagas (a partir de las vistas
+v_prestamos_activos y v_multas_pendientes), arma un solo correo por usuario
+y lo envía con un grupo de trabajadores asyncio. Cada trabajador reutiliza su
+conexión SMTP, todos comparten un límite de envíos por segundo y los errores
+transitorios se reintentan con espera creciente.
+
+La tabla NOTIFICACION funciona como registro de idempotencia: un aviso por
+usuario y día. Volver a ejecutar el envío el mismo día no repite correos.
+
+Para probar sin un servidor real hay un SMTP local que solo muestra lo que
+recibe:
+    python notificaciones.py servidor-prueba --puerto 1025
+    python notificaciones.py enviar --host localhost --puerto 1025
+"""
+
+import ssl
+import time
+import asyncio
+import sqlite3
+import smtplib
+import argparse
+from datetime import date
+from itertools import groupby
+from email.message import EmailMessage
+
+ERRORES_TRANSITORIOS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError)
+
+# ---------------------------------------------------------
+# 1. SELECCIÓN DE DESTINATARIOS
+# ---------------------------------------------------------
+
+def seleccionar_destinatarios(conn, dias_aviso=2):
+    """
+    Una sola pasada sobre las vistas: préstamos que vencen en los próximos
+    dias_aviso días, préstamos atrasados y multas pendientes, agrupados por
+    usuario. Devuelve una lista de dicts (rut, nombre, correo, items).
+    """
+    sql = """SELECT rut, nombre_usuario, correo,
+                    CASE WHEN dias_de_atraso > 0 THEN 'vencido' ELSE 'por_vencer' END AS tipo,
+                    titulo_libro, fecha_vencimiento AS fecha, dias_de_atraso AS valor
+             FROM v_prestamos_activos
+             WHERE id_prestamo IN (
+                 -- Atrasados o por vencer: vencimiento hasta hoy + dias_aviso
+                 -- (rango sobre idx_prestamo_dia_vencimiento, solo préstamos abiertos)
+                 SELECT id_prestamo FROM PRESTAMO
+                 WHERE estado IN ('activo', 'vencido')
+                   AND dia_vencimiento <= CAST(JULIANDAY('now', ?) - 2440587.5 AS INTEGER))
+             UNION ALL
+             SELECT rut, nombre_usuario, correo, 'multa', titulo_libro_asociado,
+                    fecha_generacion, monto
+             FROM v_multas_pendientes
+             ORDER BY rut"""
+    filas = conn.execute(sql, (f"+{int(dias_aviso)} days",)).fetchall()
+
+    destinatarios = []
+    for rut, grupo in groupby(filas, key=lambda fila: fila[0]):
+        grupo = list(grupo)
+        destinatarios.append({
+            'rut': rut,
+            'nombre': grupo[0][1],
+            'correo': grupo[0][2],
+            'items': [{'tipo': f[3], 'titulo': f[4], 'fecha': f[5], 'valor': f[6]} for f in grupo]
+        })
+    return destinatarios
+
+def armar_mensaje(destinatario, remitente):
+    """Un solo correo con todos los avisos del usuario"""
+    secciones = {'vencido': [], 'por_vencer': [], 'multa': []}
+    for item in destinatario['items']:
+        if item['tipo'] == 'vencido':
+            texto = f"- {item['titulo']}: venció el {item['fecha']} ({item['valor']} días de atraso)"
+        elif item['tipo'] == 'por_vencer':
+            texto = f"- {item['titulo']}: vence el {item['fecha']}"
+        else:
+            texto = f"- {item['titulo']}: multa de ${item['valor']:,.0f} generada el {item['fecha']}"
+        secciones[item['tipo']].append(texto)
+
+    cuerpo = [f"Estimado/a {destinatario['nombre']}:", ""]
+    titulos = {
+        'vencido': "Préstamos atrasados (devolver a la brevedad):",
+        'por_vencer': "Préstamos próximos a vencer:",
+        'multa': "Multas pendientes de pago:"
+    }
+    for tipo, lineas in secciones.items():
+        if lineas:
+            cuerpo += [titulos[tipo]] + lineas + [""]
+    cuerpo += ["Biblioteca UFT"]
+
+    mensaje = EmailMessage()
+    mensaje['From'] = remitente
+    mensaje['To'] = destinatario['correo']
+    mensaje['Subject'] = "Biblioteca UFT: avisos de préstamos y multas"
+    mensaje.set_content("\n".join(cuerpo))
+    return mensaje
+
+# ---------------------------------------------------------
+# 2. REGISTRO DE IDEMPOTENCIA (tabla NOTIFICACION)
+# ---------------------------------------------------------
+
+def clave_aviso(rut, fecha_lote):
+    return f"{fecha_lote}:{rut}"
+
+def reservar_envios(conn, destinatarios, fecha_lote, reintentar_interrumpidos=False):
+    """
+    Anota como 'enviando' a quienes aún no tienen aviso del día (o cuyo envío
+    anterior falló) y devuelve solo esos. Todo en una transacción.
+
+    Un 'enviando' que quedó de una ejecución interrumpida pudo haber salido o
+    no; por defecto se omite (nunca duplicar) salvo reintentar_interrumpidos.
+    """
+    reintentables = ('fallido', 'enviando') if reintentar_interrumpidos else ('fallido',)
+    ya_registrados = {
+        clave: estado for clave, estado in conn.execute(
+            "SELECT clave, estado FROM NOTIFICACION WHERE clave LIKE ?", (f"{fecha_lote}:%",))
+    }
+
+    pendientes = []
+    with conn:
+        for destinatario in destinatarios:
+            clave = clave_aviso(destinatario['rut'], fecha_lote)
+            estado = ya_registrados.get(clave)
+            if estado is None:
+                conn.execute("""INSERT INTO NOTIFICACION (clave, rut_usuario, correo, num_avisos)
+                                VALUES (?, ?, ?, ?)""",
+                             (clave, destinatario['rut'], destinatario['correo'], len(destinatario['items'])))
+            elif estado in reintentables:
+                conn.execute("UPDATE NOTIFICACION SET estado='enviando', error=NULL WHERE clave=?", (clave,))
+            else:
+                continue
+            destinatario['clave'] = clave
+            pendientes.append(destinatario)
+    return pendientes
+
+def marcar_resultado(conn, clave, intentos, error=None):
+    if error is None:
+        conn.execute("""UPDATE NOTIFICACION SET estado='enviado', intentos=?, fecha_envio=DATETIME('now')
+                        WHERE clave=?""", (intentos, clave))
+    else:
+        conn.execute("UPDATE NOTIFICACION SET estado='fallido', intentos=?, error=? WHERE clave=?",
+                     (intentos, str(error)[:500], clave))
+    conn.commit()
+
+# ---------------------------------------------------------
+# 3. ENVÍO CONCURRENTE (asyncio)
+# ---------------------------------------------------------
+
+class LimitadorTasa:
+    """Reparte los envíos de todos los trabajadores a un ritmo máximo por segundo"""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0.0
+        self.proximo = 0.0
+        self.candado = asyncio.Lock()
+
+    async def esperar(self):
+        async with self.candado:
+            ahora = time.monotonic()
+            if self.proximo > ahora:
+                await asyncio.sleep(self.proximo - ahora)
+            self.proximo = max(ahora, self.proximo) + self.intervalo
+
+def _abrir_smtp(config):
+    smtp = smtplib.SMTP(config['host'], config['puerto'], timeout=30)
+    if config.get('starttls'):
+        smtp.starttls(context=ssl.create_default_context())
+    if config.get('usuario'):
+        smtp.login(config['usuario'], config['clave'])
+    return smtp
+
+def _cerrar_smtp(smtp):
+    try:
+        smtp.quit()
+    except (smtplib.SMTPException, OSError):
+        smtp.close()
+
+async def _trabajador(cola, config, limitador, conn, resumen):
+    """Toma mensajes de la cola y los envía por una conexión SMTP propia y persistente"""
+    smtp = None
+    try:
+        while True:
+            destinatario = await cola.get()
+            if destinatario is None:
+                return
+
+            mensaje = armar_mensaje(destinatario, config['remitente'])
+            error = None
+            max_intentos = config['reintentos'] + 1
+            for intento in range(1, max_intentos + 1):
+                await limitador.esperar()
+                try:
+                    if smtp is None:
+                        smtp = await asyncio.to_thread(_abrir_smtp, config)
+                    await asyncio.to_thread(smtp.send_message, mensaje)
+                    error = None
+                    break
+                except smtplib.SMTPResponseException as e:
+                    error = e
+                    if e.smtp_code >= 500:
+                        break
+                    # 4xx: el servidor pide reintentar más tarde
+                except smtplib.SMTPRecipientsRefused as e:
+                    error = e
+                    break
+                except ERRORES_TRANSITORIOS as e:
+                    error = e
+                    if smtp is not None:
+                        await asyncio.to_thread(smtp.close)
+                        smtp = None
+                if intento < max_intentos:
+                    await asyncio.sleep(config['espera_base'] * 2 ** (intento - 1))
+
+            marcar_resultado(conn, destinatario['clave'], intento, error)
+            resumen['enviados' if error is None else 'fallidos'] += 1
+    finally:
+        if smtp is not None:
+            await asyncio.to_thread(_cerrar_smtp, smtp)
+
+async def despachar(conn, destinatarios, config):
+    """Envía los avisos con config['conexiones'] trabajadores en paralelo"""
+    cola = asyncio.Queue()
+    for destinatario in destinatarios:
+        cola.put_nowait(destinatario)
+    for _ in range(config['conexiones']):
+        cola.put_nowait(None)
+
+    limitador = LimitadorTasa(config['por_segundo'])
+    resumen = {'enviados': 0, 'fallidos': 0}
+    await asyncio.gather(*(_trabajador(cola, config, limitador, conn, resumen)
+                           for _ in range(config['conexiones'])))
+    return resumen
+
+def enviar_avisos(ruta_db, config, dias_aviso=2, simular=False, reintentar_interrumpidos=False):
+    """Selecciona, reserva y envía. Devuelve el resumen del lote"""
+    conn = sqlite3.connect(ruta_db)
+    try:
+        inicio = time.perf_counter()
+        destinatarios = seleccionar_destinatarios(conn, dias_aviso)
+        if simular:
+            return {'destinatarios': len(destinatarios), 'enviados': 0, 'fallidos': 0,
+                    'omitidos': 0, 'segundos': time.perf_counter() - inicio}
+
+        pendientes = reservar_envios(conn, destinatarios, date.today().isoformat(), reintentar_interrumpidos)
+        resumen = asyncio.run(despachar(conn, pendientes, config))
+        resumen['destinatarios'] = len(destinatarios)
+        resumen['omitidos'] = len(destinatarios) - len(pendientes)
+        resumen['segundos'] = time.perf_counter() - inicio
+        return resumen
+    finally:
+        conn.close()
+
+# ---------------------------------------------------------
+# 4. SERVIDOR SMTP LOCAL DE PRUEBA
+# ---------------------------------------------------------
+
+async def _sesion_smtp(lector, escritor, recibidos, mostrar, rechazos):
+    """
+    Diálogo SMTP mínimo: acepta todo y guarda el mensaje en memoria. Mientras
+    rechazos[0] > 0, responde 451 (reintentar más tarde) a un mensaje sin
+    guardarlo y descuenta uno.
+    """
+    escritor.write(b"220 biblioteca-prueba ESMTP\r\n")
+    en_datos, lineas = False, []
+    while True:
+        linea = await lector.readline()
+        if not linea:
+            break
+        if en_datos:
+            if linea == b".\r\n":
+                en_datos, lineas_mensaje, lineas = False, lineas, []
+                if rechazos[0] > 0:
+                    rechazos[0] -= 1
+                    escritor.write(b"451 Intente mas tarde\r\n")
+                    await escritor.drain()
+                    continue
+                mensaje = b"".join(lineas_mensaje).decode('utf-8', errors='replace')
+                recibidos.append(mensaje)
+                if mostrar:
+                    cabeceras = [l for l in mensaje.splitlines() if l.startswith(("To:", "Subject:"))]
+                    print(f"[{len(recibidos)}] " + " | ".join(cabeceras))
+                escritor.write(b"250 OK\r\n")
+                await escritor.drain()
+            else:
+                lineas.append(linea[1:] if linea.startswith(b"..") else linea)
+            continue
+
+        comando = linea[:4].upper()
+        if comando == b"DATA":
+            en_datos = True
+            escritor.write(b"354 Fin con <CRLF>.<CRLF>\r\n")
+        elif comando == b"QUIT":
+            escritor.write(b"221 Adios\r\n")
+            await escritor.drain()
+            break
+        elif comando in (b"EHLO", b"HELO", b"MAIL", b"RCPT", b"RSET", b"NOOP"):
+            escritor.write(b"250 OK\r\n")
+        else:
+            escritor.write(b"502 Comando no implementado\r\n")
+        await escritor.drain()
+    escritor.close()
+
+async def iniciar_servidor_prueba(host='localhost', puerto=1025, mostrar=True, rechazos=0):
+    """
+    Levanta el SMTP de prueba; devuelve (servidor, lista de mensajes recibidos).
+    Los primeros `rechazos` mensajes se responden con 451, para probar los
+    reintentos. Con puerto=0 el sistema elige un puerto libre.
+    """
+    recibidos = []
+    pendientes = [rechazos]
+    servidor = await asyncio.start_server(
+        lambda l, e: _sesion_smtp(l, e, recibidos, mostrar, pendientes), host, puerto)
+    return servidor, recibidos
+
+async def _servir_para_siempre(host, puerto, rechazos=0):
+    servidor, _ = await iniciar_servidor_prueba(host, puerto, rechazos=rechazos)
+    print(f"SMTP de prueba escuchando en {host}:{puerto} (Ctrl+C para salir)")
+    async with servidor:
+        await servidor.serve_forever()
+
+# ---------------------------------------------------------
+# 5. LÍNEA DE COMANDOS
+# ---------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Avisos por correo de la Biblioteca UFT")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_enviar = sub.add_parser('enviar', help="envía los avisos del día")
+    p_enviar.add_argument('--db', default='biblioteca.db')
+    p_enviar.add_argument('--host', default='localhost')
+    p_enviar.add_argument('--puerto', type=int, default=1025)
+    p_enviar.add_argument('--starttls', action='store_true')
+    p_enviar.add_argument('--usuario')
+    p_enviar.add_argument('--clave')
+    p_enviar.add_argument('--remitente', default='biblioteca@uft.cl')
+    p_enviar.add_argument('--conexiones', type=int, default=8, help="trabajadores (conexiones SMTP)")
+    p_enviar.add_argument('--por-segundo', type=float, default=50, help="límite de correos por segundo")
+    p_enviar.add_argument('--reintentos', type=int, default=3)
+    p_enviar.add_argument('--dias-aviso', type=int, default=2, help="avisar préstamos que vencen en N días")
+    p_enviar.add_argument('--simular', action='store_true', help="solo cuenta destinatarios, no envía")
+    p_enviar.add_argument('--reintentar-interrumpidos', action='store_true',
+                          help="reenvía avisos que quedaron 'enviando' por una ejecución cortada")
+
+    p_prueba = sub.add_parser('servidor-prueba', help="SMTP local que muestra los correos recibidos")
+    p_prueba.add_argument('--host', default='localhost')
+    p_prueba.add_argument('--puerto', type=int, default=1025)
+    p_prueba.add_argument('--rechazos', type=int, default=0,
+                          help="responde 451 a los primeros N mensajes (prueba de reintentos)")
+
+    args = parser.parse_args()
+
+    if args.comando == 'servidor-prueba':
+        try:
+            asyncio.run(_servir_para_siempre(args.host, args.puerto, args.rechazos))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    config = {
+        'host': args.host, 'puerto': args.puerto, 'starttls': args.starttls,
+        'usuario': args.usuario, 'clave': args.clave, 'remitente': args.remitente,
+        'conexiones': args.conexiones, 'por_segundo': args.por_segundo,
+        'reintentos': args.reintentos, 'espera_base': 1.0
+    }
+    resumen = enviar_avisos(args.db, config, args.dias_aviso, args.simular, args.reintentar_interrumpidos)
+    print(f"Destinatarios: {resumen['destinatarios']}  Enviados: {resumen['enviados']}  "
+          f"Fallidos: {resumen['fallidos']}  Omitidos (ya avisados): {resumen['omitidos']}  "
+          f"({resumen['segundos']:.1f} s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""
+Respaldos en Línea de la Base de Datos
+Sistema de Gestión de Biblioteca UFT
+
+Copia biblioteca.db mientras la app está funcionando, con la API de backup de
+SQLite: se copian pocas páginas por paso y se hace una pausa entre pasos, así
+los préstamos y devoluciones nunca quedan esperando a que termine la copia.
+(Copiar el archivo con el sistema operativo puede dejar un respaldo corrupto
+si alguien escribe justo en ese momento.)
+
+Cada respaldo:
+  1. se copia en línea a un archivo temporal,
+  2. se comprime con gzip (respaldos/<base>-AAAAMMDD-HHMMSS.db.gz),
+  3. se verifica descomprimiéndolo y ejecutando PRAGMA quick_check,
+  4. se anota con sus métricas en respaldos/respaldos.jsonl,
+  5. y se borran los más antiguos (se conservan los últimos --conservar).
+
+Si otra conexión escribe durante la copia, SQLite la reinicia desde el
+principio. Los pasos nunca se agrandan (cada paso tiene bloqueado el origen
+mientras copia sus páginas): antes de cada reintento se espera un rato más
+largo (ESPERA_REINICIO, el doble en cada reinicio) a que pase la racha de
+escrituras. Tras MAX_REINICIOS reinicios el respaldo se da por fallido, se
+anota en respaldos.jsonl y los respaldos anteriores quedan como estaban.
+
+Uso:
+    python respaldo.py respaldar [--paginas 64] [--pausa 0.01] [--conservar 7]
+    python respaldo.py listar
+    python respaldo.py verificar respaldos/biblioteca-20250301-020000.db.gz
+    python respaldo.py restaurar respaldos/biblioteca-20250301-020000.db.gz
+    python respaldo.py medir [--segundos 5]
+"""
+
+import os
+import gzip
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import threading
+import statistics
+from pathlib import Path
+from datetime import datetime
+
+import sedes
+import datos_biblioteca
+
+CARPETA_RESPALDOS = 'respaldos'
+ARCHIVO_METRICAS = 'respaldos.jsonl'
+PAGINAS_POR_PASO = 64
+PAUSA_ENTRE_PASOS = 0.01
+CONSERVAR = 7
+MAX_REINICIOS = 5
+ESPERA_REINICIO = 1.0    # segundos antes del primer reintento; se duplica en cada reinicio
+
+class _CopiaReiniciada(Exception):
+    """La copia volvió a empezar porque otra conexión escribió en el origen"""
+
+# ---------------------------------------------------------
+# 1. COPIA EN LÍNEA Y VERIFICACIÓN
+# ---------------------------------------------------------
+
+def copiar_en_linea(origen, destino, paginas=PAGINAS_POR_PASO, pausa=PAUSA_ENTRE_PASOS,
+                    max_reinicios=MAX_REINICIOS, espera=ESPERA_REINICIO):
+    """
+    Copia la BD `origen` (ruta) en `destino` (ruta) por pasos de `paginas`
+    páginas, durmiendo `pausa` segundos entre pasos. Devuelve las métricas
+    de la copia (pasos, páginas, reinicios, segundos y 'completa', que es
+    False si se agotaron los reinicios y `destino` no sirve).
+    """
+    metricas = {'pasos': 0, 'paginas': 0, 'reinicios': 0, 'completa': False}
+    inicio = time.perf_counter()
+
+    conn_origen = sqlite3.connect(origen)
+    conn_destino = sqlite3.connect(destino)
+    try:
+        while True:
+            restantes_antes = [None]
+
+            def progreso(estado, restantes, total):
+                metricas['pasos'] += 1
+                metricas['paginas'] = total
+                if restantes_antes[0] is not None and restantes > restantes_antes[0]:
+                    raise _CopiaReiniciada()
+                restantes_antes[0] = restantes
+                if restantes:
+                    # La pausa libera el bloqueo de lectura y deja pasar a los escritores
+                    time.sleep(pausa)
+
+            try:
+                conn_origen.backup(conn_destino, pages=paginas, progress=progreso)
+                metricas['completa'] = True
+                break
+            except _CopiaReiniciada:
+                # Nunca se copia de una vez: eso bloquearía a los escritores
+                # durante toda la copia. Se espera más y se reintenta igual.
+                if metricas['reinicios'] >= max_reinicios:
+                    break
+                time.sleep(espera * 2 ** metricas['reinicios'])
+                metricas['reinicios'] += 1
+    finally:
+        conn_origen.close()
+        conn_destino.close()
+
+    metricas['segundos'] = round(time.perf_counter() - inicio, 3)
+    return metricas
+
+def quick_check(ruta):
+    """Resultado de PRAGMA quick_check sobre un archivo SQLite ('ok' si está sano)"""
+    conn = sqlite3.connect(Path(ruta).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        return "; ".join(fila[0] for fila in conn.execute("PRAGMA quick_check"))
+    finally:
+        conn.close()
+
+def descomprimir(ruta_gz, destino):
+    with gzip.open(ruta_gz, 'rb') as entrada, open(destino, 'wb') as salida:
+        shutil.copyfileobj(entrada, salida, 1024 * 1024)
+
+def verificar(ruta_gz):
+    """Descomprime un respaldo en un archivo temporal y le ejecuta quick_check"""
+    with tempfile.TemporaryDirectory() as carpeta:
+        copia = os.path.join(carpeta, "verificacion.db")
+        descomprimir(ruta_gz, copia)
+        return quick_check(copia)
+
+# ---------------------------------------------------------
+# 2. RESPALDOS ROTATIVOS
+# ---------------------------------------------------------
+
+def respaldos_existentes(carpeta, base):
+    """Respaldos de una BD, del más nuevo al más antiguo"""
+    return sorted(Path(carpeta).glob(f"{base}-*.db.gz"), reverse=True)
+
+def rotar(carpeta, base, conservar=CONSERVAR):
+    """Borra los respaldos que sobran y devuelve sus nombres"""
+    sobrantes = respaldos_existentes(carpeta, base)[conservar:]
+    for archivo in sobrantes:
+        archivo.unlink()
+    return [archivo.name for archivo in sobrantes]
+
+def registrar_metricas(carpeta, metricas):
+    with open(os.path.join(carpeta, ARCHIVO_METRICAS), 'a', encoding='utf-8') as archivo:
+        archivo.write(json.dumps(metricas, ensure_ascii=False) + "\n")
+
+def leer_metricas(carpeta=CARPETA_RESPALDOS):
+    ruta = os.path.join(carpeta, ARCHIVO_METRICAS)
+    if not os.path.exists(ruta):
+        return []
+    with open(ruta, 'r', encoding='utf-8') as archivo:
+        return [json.loads(linea) for linea in archivo if linea.strip()]
+
+def respaldar(ruta_db=None, carpeta=CARPETA_RESPALDOS, paginas=PAGINAS_POR_PASO,
+              pausa=PAUSA_ENTRE_PASOS, conservar=CONSERVAR):
+    """
+    Hace un respaldo comprimido y verificado de la BD (por defecto, la de la
+    sede local). Si la copia no se completa o la verificación falla, el
+    respaldo no se conserva (ni se rota ninguno anterior), el fallo se anota
+    en las métricas y se lanza RuntimeError. Devuelve las métricas registradas.
+    """
+    ruta_db = ruta_db or sedes.ruta_sede()
+    base = Path(ruta_db).stem
+    os.makedirs(carpeta, exist_ok=True)
+    inicio = time.perf_counter()
+    marca = datetime.now()
+    final = os.path.join(carpeta, f"{base}-{marca.strftime('%Y%m%d-%H%M%S')}.db.gz")
+
+    with tempfile.TemporaryDirectory(dir=carpeta) as temporal:
+        copia = os.path.join(temporal, f"{base}.db")
+        metricas = copiar_en_linea(ruta_db, copia, paginas, pausa)
+        if not metricas['completa']:
+            metricas.update({'archivo': None, 'fecha': marca.isoformat(timespec='seconds'), 'origen': ruta_db,
+                             'error': f"copia reiniciada {metricas['reinicios']} veces por escrituras concurrentes"})
+            registrar_metricas(carpeta, metricas)
+            raise RuntimeError(f"No se pudo respaldar {ruta_db}: {metricas['error']}; "
+                               f"se mantienen los respaldos anteriores")
+
+        inicio_compresion = time.perf_counter()
+        comprimido = os.path.join(temporal, "respaldo.db.gz")
+        with open(copia, 'rb') as entrada, gzip.open(comprimido, 'wb', compresslevel=6) as salida:
+            shutil.copyfileobj(entrada, salida, 1024 * 1024)
+        segundos_compresion = time.perf_counter() - inicio_compresion
+
+        resultado = verificar(comprimido)
+        if resultado != 'ok':
+            raise RuntimeError(f"El respaldo de {ruta_db} no pasó quick_check: {resultado}")
+
+        bytes_originales = os.path.getsize(copia)
+        os.replace(comprimido, final)
+
+    metricas.update({
+        'archivo': os.path.basename(final),
+        'fecha': marca.isoformat(timespec='seconds'),
+        'origen': ruta_db,
+        'bytes': bytes_originales,
+        'bytes_comprimidos': os.path.getsize(final),
+        'segundos_compresion': round(segundos_compresion, 3),
+        'segundos_total': round(time.perf_counter() - inicio, 3),
+        'quick_check': resultado,
+    })
+    metricas['borrados'] = rotar(carpeta, base, conservar)
+    registrar_metricas(carpeta, metricas)
+    return metricas
+
+# ---------------------------------------------------------
+# 3. RESTAURACIÓN
+# ---------------------------------------------------------
+
+def restaurar(ruta_gz, ruta_db=None, respaldo_previo=True, carpeta=CARPETA_RESPALDOS):
+    """
+    Reemplaza el contenido de la BD por el de un respaldo verificado. Se usa
+    la API de backup hacia la BD en uso (no se sobrescribe el archivo), así
+    las conexiones abiertas de la app ven los datos restaurados. Antes se
+    respalda el estado actual, salvo respaldo_previo=False.
+    Devuelve los tiempos de cada etapa.
+    """
+    ruta_db = ruta_db or sedes.ruta_sede()
+    tiempos = {}
+    inicio = time.perf_counter()
+
+    if respaldo_previo and os.path.exists(ruta_db):
+        tiempos['respaldo_previo'] = respaldar(ruta_db, carpeta)['archivo']
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(ruta_db))) as temporal:
+        copia = os.path.join(temporal, "restauracion.db")
+        paso = time.perf_counter()
+        descomprimir(ruta_gz, copia)
+        tiempos['segundos_descompresion'] = round(time.perf_counter() - paso, 3)
+
+        paso = time.perf_counter()
+        resultado = quick_check(copia)
+        tiempos['segundos_verificacion'] = round(time.perf_counter() - paso, 3)
+        if resultado != 'ok':
+            raise RuntimeError(f"{ruta_gz} no pasó quick_check: {resultado}")
+
+        paso = time.perf_counter()
+        conn_respaldo = sqlite3.connect(copia)
+        conn_destino = sqlite3.connect(ruta_db, timeout=30)
+        try:
+            conn_respaldo.backup(conn_destino)
+        finally:
+            conn_respaldo.close()
+            conn_destino.close()
+        tiempos['segundos_copia'] = round(time.perf_counter() - paso, 3)
+
+    tiempos['segundos_total'] = round(time.perf_counter() - inicio, 3)
+    tiempos['quick_check'] = quick_check(ruta_db)
+    return tiempos
+
+# ---------------------------------------------------------
+# 4. IMPACTO EN LA APP
+# ---------------------------------------------------------
+
+# Consultas cortas que la app hace a cada rato en el mesón de préstamos
+# (todas pasan por datos_biblioteca.ejecutar_sql)
+CONSULTAS_PRIMER_PLANO = [
+    ("SELECT COUNT(*) FROM PRESTAMO WHERE estado IN ('activo', 'vencido')", None),
+    ("SELECT SUM(monto) FROM MULTA WHERE estado='pendiente'", None),
+    ("SELECT * FROM v_prestamos_activos", None),
+    ("SELECT e.id_ejemplar, e.estado, l.titulo FROM EJEMPLAR e JOIN LIBRO l ON e.isbn = l.isbn "
+     "WHERE e.codigo_barras = ?", ('UFT000001',)),
+]
+
+def _latencias(hasta, resultado):
+    """Ejecuta consultas de la app en bucle hasta que se active `hasta` (milisegundos)"""
+    i = 0
+    while not hasta.is_set():
+        inicio = time.perf_counter()
+        consulta, parametros = CONSULTAS_PRIMER_PLANO[i % len(CONSULTAS_PRIMER_PLANO)]
+        datos_biblioteca.ejecutar_sql(consulta, parametros)
+        resultado.append((time.perf_counter() - inicio) * 1000)
+        i += 1
+        time.sleep(0.005)
+
+def _resumen(latencias):
+    ordenadas = sorted(latencias)
+    if not ordenadas:
+        return {'consultas': 0}
+    return {'consultas': len(ordenadas),
+            'p50_ms': round(statistics.median(ordenadas), 2),
+            'p95_ms': round(ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.95))], 2),
+            'max_ms': round(ordenadas[-1], 2)}
+
+def medir_impacto(segundos=5, paginas=PAGINAS_POR_PASO, pausa=PAUSA_ENTRE_PASOS):
+    """
+    Mide la latencia de ejecutar_sql sin respaldo (durante `segundos`) y
+    mientras se hace una copia en línea, y devuelve ambas junto con las
+    métricas de la copia.
+    """
+    ruta_db = sedes.ruta_sede()
+
+    sin_respaldo = []
+    detener = threading.Event()
+    hilo = threading.Thread(target=_latencias, args=(detener, sin_respaldo))
+    hilo.start()
+    time.sleep(segundos)
+    detener.set()
+    hilo.join()
+
+    con_respaldo = []
+    detener = threading.Event()
+    hilo = threading.Thread(target=_latencias, args=(detener, con_respaldo))
+    with tempfile.TemporaryDirectory() as carpeta:
+        hilo.start()
+        metricas = copiar_en_linea(ruta_db, os.path.join(carpeta, "medicion.db"), paginas, pausa)
+        detener.set()
+        hilo.join()
+
+    return {'copia': metricas,
+            'sin_respaldo': _resumen(sin_respaldo),
+            'durante_respaldo': _resumen(con_respaldo)}
+
+# ---------------------------------------------------------
+# 5. LÍNEA DE COMANDOS
+# ---------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Respaldos en línea de la Biblioteca UFT")
+    parser.add_argument('--carpeta', default=CARPETA_RESPALDOS)
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_resp = sub.add_parser('respaldar', help="respaldo comprimido y verificado de la BD en uso")
+    p_resp.add_argument('--db', help="archivo a respaldar (por defecto, el de la sede local)")
+    p_resp.add_argument('--paginas', type=int, default=PAGINAS_POR_PASO, help="páginas copiadas por paso")
+    p_resp.add_argument('--pausa', type=float, default=PAUSA_ENTRE_PASOS, help="segundos entre pasos")
+    p_resp.add_argument('--conservar', type=int, default=CONSERVAR, help="respaldos que se mantienen")
+
+    sub.add_parser('listar', help="respaldos guardados y sus métricas")
+
+    p_ver = sub.add_parser('verificar', help="descomprime un respaldo y ejecuta quick_check")
+    p_ver.add_argument('respaldo')
+
+    p_rest = sub.add_parser('restaurar', help="reemplaza la BD por un respaldo (midiendo el tiempo)")
+    p_rest.add_argument('respaldo')
+    p_rest.add_argument('--db', help="BD a restaurar (por defecto, la de la sede local)")
+    p_rest.add_argument('--sin-respaldo-previo', action='store_true',
+                        help="no respalda el estado actual antes de restaurar")
+
+    p_medir = sub.add_parser('medir', help="latencia de ejecutar_sql con y sin respaldo en curso")
+    p_medir.add_argument('--segundos', type=float, default=5)
+    p_medir.add_argument('--paginas', type=int, default=PAGINAS_POR_PASO)
+    p_medir.add_argument('--pausa', type=float, default=PAUSA_ENTRE_PASOS)
+
+    args = parser.parse_args()
+
+    try:
+        if args.comando == 'respaldar':
+            m = respaldar(args.db, args.carpeta, args.paginas, args.pausa, args.conservar)
+            print(f"{m['archivo']}: {m['bytes']:,} -> {m['bytes_comprimidos']:,} bytes, "
+                  f"copia {m['segundos']} s ({m['pasos']} pasos, {m['reinicios']} reinicios), "
+                  f"total {m['segundos_total']} s, quick_check {m['quick_check']}")
+            for borrado in m['borrados']:
+                print(f"   rotado: {borrado}")
+
+        elif args.comando == 'listar':
+            for m in leer_metricas(args.carpeta):
+                if m.get('error'):
+                    print(f"{'(fallido ' + m['fecha'] + ')':40} {m['error']}")
+                    continue
+                existe = "" if os.path.exists(os.path.join(args.carpeta, m['archivo'])) else "  (rotado)"
+                print(f"{m['archivo']:40} {m['bytes_comprimidos']:>12,} bytes  copia {m['segundos']:>7} s  "
+                      f"total {m['segundos_total']:>7} s{existe}")
+
+        elif args.comando == 'verificar':
+            resultado = verificar(args.respaldo)
+            print(f"quick_check: {resultado}")
+            if resultado != 'ok':
+                raise SystemExit(1)
+
+        elif args.comando == 'restaurar':
+            tiempos = restaurar(args.respaldo, args.db, not args.sin_respaldo_previo, args.carpeta)
+            if 'respaldo_previo' in tiempos:
+                print(f"Estado anterior respaldado en {tiempos['respaldo_previo']}")
+            print(f"Restaurado en {tiempos['segundos_total']} s (descompresión {tiempos['segundos_descompresion']} s, "
+                  f"verificación {tiempos['segundos_verificacion']} s, copia {tiempos['segundos_copia']} s), "
+                  f"quick_check {tiempos['quick_check']}")
+
+        elif args.comando == 'medir':
+            m = medir_impacto(args.segundos, args.paginas, args.pausa)
+            print(f"Copia en línea: {m['copia']['segundos']} s, {m['copia']['pasos']} pasos, "
+                  f"{m['copia']['reinicios']} reinicios{'' if m['copia']['completa'] else ' (no terminó)'}")
+            for nombre in ('sin_respaldo', 'durante_respaldo'):
+                r = m[nombre]
+                if r['consultas']:
+                    print(f"  {nombre:18} {r['consultas']:6} consultas  p50 {r['p50_ms']:7} ms  "
+                          f"p95 {r['p95_ms']:7} ms  máx {r['max_ms']:7} ms")
+    except (OSError, RuntimeError, sqlite3.Error) as e:
+        print(f"Error: {e}")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
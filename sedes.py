@@ -0,0 +1,385 @@
+"""
+Multi-Sede: una base de datos por campus y consultas federadas
+Sistema de Gestión de Biblioteca UFT
+
+Cada sede tiene su propio archivo SQLite y registra ahí su circulación
+(préstamos, devoluciones, inventario). La búsqueda de catálogo se reparte en
+paralelo entre todas las sedes (una conexión de solo lectura por sede) y los
+resultados se fusionan por ISBN. La disponibilidad de un libro se consulta
+con ATTACH en una sola consulta. El traslado de una copia entre sedes se hace
+en dos pasos: la sede de origen lo envía y la de destino lo recibe.
+
+Las sedes se definen en sedes.json:
+
+    {
+        "central": {"nombre": "Casa Central", "archivo": "biblioteca.db"},
+        "vina":    {"nombre": "Sede Viña del Mar", "archivo": "biblioteca_vina.db"}
+    }
+
+La sede local de la app se elige con la variable de entorno BIBLIOTECA_SEDE
+(por defecto, la primera del archivo). Sin sedes.json hay una sola sede que
+usa biblioteca.db, igual que antes.
+
+Uso:
+    python sedes.py buscar "garcia marquez"
+    python sedes.py disponibilidad 9788437604947
+    python sedes.py enviar central vina UFT000006
+    python sedes.py recibir vina UFT000006 --ubicacion "Estantería 3B"
+"""
+
+import os
+import json
+import sqlite3
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+ARCHIVO_SEDES = 'sedes.json'
+SEDES_POR_DEFECTO = {
+    'central': {'nombre': 'Casa Central', 'archivo': 'biblioteca.db'}
+}
+
+# ---------------------------------------------------------
+# 1. CONFIGURACIÓN DE SEDES
+# ---------------------------------------------------------
+
+def cargar_sedes():
+    """Lee sedes.json (o la sede única por defecto)"""
+    if os.path.exists(ARCHIVO_SEDES):
+        with open(ARCHIVO_SEDES, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return dict(SEDES_POR_DEFECTO)
+
+def sede_actual():
+    """Código de la sede local (variable BIBLIOTECA_SEDE o la primera configurada)"""
+    sedes = cargar_sedes()
+    codigo = os.environ.get('BIBLIOTECA_SEDE')
+    if codigo:
+        if codigo not in sedes:
+            raise ValueError(f"La sede '{codigo}' no está definida en {ARCHIVO_SEDES}")
+        return codigo
+    return next(iter(sedes))
+
+def ruta_sede(codigo=None):
+    """Archivo SQLite de una sede (por defecto, la local)"""
+    sedes = cargar_sedes()
+    codigo = codigo or sede_actual()
+    if codigo not in sedes:
+        raise ValueError(f"La sede '{codigo}' no está definida en {ARCHIVO_SEDES}")
+    return sedes[codigo]['archivo']
+
+def _uri_solo_lectura(ruta):
+    """URI de solo lectura: las consultas federadas nunca bloquean escrituras remotas"""
+    return Path(ruta).resolve().as_uri() + "?mode=ro"
+
+def _uri_escritura(ruta):
+    """URI de lectura y escritura que no crea el archivo si no existe"""
+    return Path(ruta).resolve().as_uri() + "?mode=rw"
+
+# ---------------------------------------------------------
+# 2. CONSULTAS FEDERADAS
+# ---------------------------------------------------------
+
+def _consultar_sede(ruta, sql, parametros):
+    conn = sqlite3.connect(_uri_solo_lectura(ruta), uri=True)
+    try:
+        return conn.execute(sql, parametros).fetchall()
+    finally:
+        conn.close()
+
+def consultar_sedes(sql, parametros=(), sedes=None):
+    """
+    Ejecuta la misma consulta en todas las sedes a la vez (un hilo y una
+    conexión por sede). Devuelve ({sede: filas}, {sede: error}); una sede
+    caída no impide responder con las demás.
+    """
+    sedes = sedes or cargar_sedes()
+    resultados, errores = {}, {}
+
+    with ThreadPoolExecutor(max_workers=len(sedes)) as pool:
+        futuros = {codigo: pool.submit(_consultar_sede, datos['archivo'], sql, parametros)
+                   for codigo, datos in sedes.items()}
+        for codigo, futuro in futuros.items():
+            try:
+                resultados[codigo] = futuro.result()
+            except sqlite3.Error as e:
+                errores[codigo] = str(e)
+
+    return resultados, errores
+
+def buscar_catalogo(texto, limite=20):
+    """
+    Busca por título, autor o ISBN en todas las sedes y fusiona por ISBN.
+    Orden: coincidencia al inicio del título, luego en el título, luego en
+    autor/ISBN; a igualdad, más copias disponibles en la red primero. Cada
+    sede ya ordena así antes de su LIMIT, para no descartar las mejores
+    coincidencias antes de fusionar.
+    """
+    sql = """SELECT l.isbn, l.titulo, l.autor, l.categoria,
+                    COUNT(e.id_ejemplar) AS total,
+                    COUNT(CASE WHEN e.estado = 'disponible' THEN 1 END) AS disponibles
+             FROM LIBRO l
+             LEFT JOIN EJEMPLAR e ON e.isbn = l.isbn AND e.estado != 'trasladado'
+             WHERE l.titulo LIKE ? OR l.autor LIKE ? OR l.isbn = ?
+             GROUP BY l.isbn, l.titulo, l.autor, l.categoria
+             ORDER BY CASE WHEN l.titulo LIKE ? || '%' THEN 0
+                           WHEN l.titulo LIKE ? THEN 1
+                           ELSE 2 END,
+                      disponibles DESC, l.titulo
+             LIMIT ?"""
+    patron = f"%{texto}%"
+    por_sede, errores = consultar_sedes(sql, (patron, patron, texto, texto, patron, limite))
+
+    libros = {}
+    for codigo, filas in por_sede.items():
+        for isbn, titulo, autor, categoria, total, disponibles in filas:
+            libro = libros.setdefault(isbn, {
+                'isbn': isbn, 'titulo': titulo, 'autor': autor, 'categoria': categoria,
+                'total': 0, 'disponibles': 0, 'sedes': {}
+            })
+            libro['total'] += total
+            libro['disponibles'] += disponibles
+            libro['sedes'][codigo] = disponibles
+
+    buscado = texto.casefold()
+    def relevancia(libro):
+        titulo = (libro['titulo'] or "").casefold()
+        if titulo.startswith(buscado):
+            nivel = 0
+        elif buscado in titulo:
+            nivel = 1
+        else:
+            nivel = 2
+        return (nivel, -libro['disponibles'], titulo)
+
+    return sorted(libros.values(), key=relevancia)[:limite], errores
+
+def disponibilidad_federada(isbn):
+    """Copias de un ISBN en cada sede, con ATTACH de todas las sedes en una sola consulta"""
+    # Las copias 'trasladado' ya están físicamente en otra sede y no se cuentan
+    sedes = cargar_sedes()
+    conn = sqlite3.connect(":memory:", uri=True)
+    try:
+        partes, parametros, errores = [], [], {}
+        for i, (codigo, datos) in enumerate(sedes.items()):
+            alias = f"sede{i}"
+            try:
+                conn.execute(f"ATTACH DATABASE ? AS {alias}", (_uri_solo_lectura(datos['archivo']),))
+            except sqlite3.Error as e:
+                errores[codigo] = str(e)
+                continue
+            partes.append(f"""SELECT ? AS sede,
+                                     COUNT(*) AS total,
+                                     COUNT(CASE WHEN estado = 'disponible' THEN 1 END) AS disponibles,
+                                     GROUP_CONCAT(DISTINCT ubicacion) AS ubicaciones
+                              FROM {alias}.EJEMPLAR
+                              WHERE isbn = ? AND estado != 'trasladado'""")
+            parametros += [codigo, isbn]
+
+        if not partes:
+            return [], errores
+        filas = conn.execute(" UNION ALL ".join(partes), parametros).fetchall()
+        return filas, errores
+    finally:
+        conn.close()
+
+# ---------------------------------------------------------
+# 3. TRASLADO DE COPIAS ENTRE SEDES (dos pasos)
+# ---------------------------------------------------------
+
+def _conectar_con_sede(codigo_local, codigo_remoto):
+    """Conexión de escritura a una sede con la otra adjunta como 'remota'"""
+    # Con la ruta simple, ATTACH crearía un archivo vacío si falta la otra sede
+    # y el traslado fallaría después con "no such table"
+    for codigo in (codigo_local, codigo_remoto):
+        if not os.path.exists(ruta_sede(codigo)):
+            raise ValueError(f"No se encuentra la base de datos de la sede {codigo} ({ruta_sede(codigo)})")
+    conn = sqlite3.connect(_uri_escritura(ruta_sede(codigo_local)), uri=True, isolation_level=None)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("ATTACH DATABASE ? AS remota", (_uri_escritura(ruta_sede(codigo_remoto)),))
+    return conn
+
+def enviar_traslado(origen, destino, codigo_barras):
+    """
+    Paso 1: la sede de origen despacha la copia. En una sola transacción
+    (sobre los dos archivos) la copia queda 'en_traslado' y el traslado se
+    anota como 'enviado' en ambas sedes.
+    """
+    conn = _conectar_con_sede(origen, destino)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        fila = conn.execute("SELECT isbn, estado FROM main.EJEMPLAR WHERE codigo_barras=?",
+                            (codigo_barras,)).fetchone()
+        if fila is None:
+            raise ValueError(f"La copia {codigo_barras} no existe en la sede {origen}")
+        isbn, estado = fila
+        if estado != 'disponible':
+            raise ValueError(f"La copia {codigo_barras} está '{estado}', solo se trasladan copias disponibles")
+
+        conn.execute("UPDATE main.EJEMPLAR SET estado='en_traslado' WHERE codigo_barras=?", (codigo_barras,))
+        for esquema in ('main', 'remota'):
+            conn.execute(f"""INSERT INTO {esquema}.TRASLADO (codigo_barras, isbn, sede_origen, sede_destino)
+                             VALUES (?, ?, ?, ?)""", (codigo_barras, isbn, origen, destino))
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def recibir_traslado(destino, codigo_barras, ubicacion=None):
+    """
+    Paso 2: la sede de destino recibe la copia. Copia la ficha del libro si
+    no la tenía, da de alta (o reactiva) el ejemplar como 'disponible', deja
+    la copia de origen como 'trasladado' y cierra el traslado en ambas sedes.
+    Si el destino ya tiene una copia en uso con ese código no cambia nada.
+    """
+    conn = sqlite3.connect(ruta_sede(destino))
+    try:
+        # El traslado está anotado en ambas sedes: solo vale el que viene hacia esta
+        fila = conn.execute("""SELECT sede_origen FROM TRASLADO
+                               WHERE codigo_barras=? AND sede_destino=? AND estado='enviado'""",
+                            (codigo_barras, destino)).fetchone()
+    finally:
+        conn.close()
+    if fila is None:
+        raise ValueError(f"No hay un traslado pendiente de {codigo_barras} hacia {destino}")
+    origen = fila[0]
+
+    conn = _conectar_con_sede(destino, origen)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("""INSERT OR IGNORE INTO main.LIBRO
+                        SELECT l.* FROM remota.LIBRO l
+                        JOIN remota.EJEMPLAR e ON e.isbn = l.isbn
+                        WHERE e.codigo_barras = ?""", (codigo_barras,))
+        # Si la copia ya estuvo en esta sede (ida y vuelta), se reactiva la misma
+        # fila, pero solo si quedó 'trasladado': una fila viva con ese código
+        # (prestada, disponible...) no se pisa
+        cursor = conn.execute("""INSERT INTO main.EJEMPLAR (isbn, codigo_barras, estado, ubicacion, condicion)
+                                 SELECT isbn, codigo_barras, 'disponible', COALESCE(?, ubicacion), condicion
+                                 FROM remota.EJEMPLAR WHERE codigo_barras = ?
+                                 ON CONFLICT(codigo_barras) DO UPDATE SET
+                                     isbn = excluded.isbn,
+                                     estado = 'disponible',
+                                     ubicacion = excluded.ubicacion,
+                                     condicion = excluded.condicion
+                                 WHERE EJEMPLAR.estado = 'trasladado'""", (ubicacion, codigo_barras))
+        if cursor.rowcount != 1:
+            actual = conn.execute("SELECT estado FROM main.EJEMPLAR WHERE codigo_barras=?",
+                                  (codigo_barras,)).fetchone()
+            if actual is None:
+                raise ValueError(f"La copia {codigo_barras} no existe en la sede {origen}")
+            raise ValueError(f"La copia {codigo_barras} ya existe en {destino} como '{actual[0]}'; "
+                             f"no se puede recibir encima de ella")
+        conn.execute("UPDATE remota.EJEMPLAR SET estado='trasladado' WHERE codigo_barras=?", (codigo_barras,))
+        for esquema in ('main', 'remota'):
+            conn.execute(f"""UPDATE {esquema}.TRASLADO SET estado='recibido', fecha_recepcion=DATETIME('now')
+                             WHERE codigo_barras=? AND estado='enviado'""", (codigo_barras,))
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def cancelar_traslado(origen, codigo_barras):
+    """Anula un traslado enviado y no recibido: la copia vuelve a estar disponible en origen"""
+    conn = sqlite3.connect(ruta_sede(origen))
+    try:
+        fila = conn.execute("""SELECT sede_destino FROM TRASLADO
+                               WHERE codigo_barras=? AND sede_origen=? AND estado='enviado'""",
+                            (codigo_barras, origen)).fetchone()
+    finally:
+        conn.close()
+    if fila is None:
+        raise ValueError(f"No hay un traslado pendiente de {codigo_barras} desde {origen}")
+
+    conn = _conectar_con_sede(origen, fila[0])
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("UPDATE main.EJEMPLAR SET estado='disponible' WHERE codigo_barras=?", (codigo_barras,))
+        for esquema in ('main', 'remota'):
+            conn.execute(f"""UPDATE {esquema}.TRASLADO SET estado='cancelado'
+                             WHERE codigo_barras=? AND estado='enviado'""", (codigo_barras,))
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def traslados_pendientes(codigo=None):
+    """Traslados enviados y aún no recibidos que involucran a una sede"""
+    conn = sqlite3.connect(ruta_sede(codigo))
+    try:
+        return conn.execute(
+            """SELECT id_traslado, codigo_barras, isbn, sede_origen, sede_destino, fecha_envio
+               FROM TRASLADO WHERE estado='enviado' ORDER BY fecha_envio""").fetchall()
+    finally:
+        conn.close()
+
+# ---------------------------------------------------------
+# 4. LÍNEA DE COMANDOS
+# ---------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultas y traslados entre sedes de la Biblioteca UFT")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_buscar = sub.add_parser('buscar', help="busca en el catálogo de todas las sedes")
+    p_buscar.add_argument('texto')
+    p_buscar.add_argument('--limite', type=int, default=20)
+
+    p_disp = sub.add_parser('disponibilidad', help="copias de un ISBN en cada sede")
+    p_disp.add_argument('isbn')
+
+    p_enviar = sub.add_parser('enviar', help="paso 1 del traslado (sede de origen)")
+    p_enviar.add_argument('origen')
+    p_enviar.add_argument('destino')
+    p_enviar.add_argument('codigo_barras')
+
+    p_recibir = sub.add_parser('recibir', help="paso 2 del traslado (sede de destino)")
+    p_recibir.add_argument('destino')
+    p_recibir.add_argument('codigo_barras')
+    p_recibir.add_argument('--ubicacion')
+
+    p_cancelar = sub.add_parser('cancelar', help="anula un traslado no recibido")
+    p_cancelar.add_argument('origen')
+    p_cancelar.add_argument('codigo_barras')
+
+    args = parser.parse_args()
+
+    try:
+        if args.comando == 'buscar':
+            libros, errores = buscar_catalogo(args.texto, args.limite)
+            for libro in libros:
+                detalle = ", ".join(f"{sede}: {n}" for sede, n in libro['sedes'].items())
+                print(f"{libro['isbn']:15} {libro['titulo'][:40]:40} {libro['disponibles']:3} disp. ({detalle})")
+        elif args.comando == 'disponibilidad':
+            filas, errores = disponibilidad_federada(args.isbn)
+            for sede, total, disponibles, ubicaciones in filas:
+                print(f"{sede:15} {disponibles}/{total} disponibles  {ubicaciones or ''}")
+        else:
+            errores = {}
+            if args.comando == 'enviar':
+                enviar_traslado(args.origen, args.destino, args.codigo_barras)
+                print(f"Copia {args.codigo_barras} enviada de {args.origen} a {args.destino}")
+            elif args.comando == 'recibir':
+                recibir_traslado(args.destino, args.codigo_barras, args.ubicacion)
+                print(f"Copia {args.codigo_barras} recibida en {args.destino}")
+            elif args.comando == 'cancelar':
+                cancelar_traslado(args.origen, args.codigo_barras)
+                print(f"Traslado de {args.codigo_barras} cancelado")
+
+        for sede, error in errores.items():
+            print(f"Sede {sede} no disponible: {error}")
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Feed de Cambios (CDC) para Sincronización Incremental
+Sistema de Gestión de Biblioteca UFT
+
+Los triggers trg_cdc_* de biblioteca.db.sql anotan en REGISTRO_CAMBIO cada
+INSERT/UPDATE/DELETE de USUARIO, LIBRO, EJEMPLAR, PRESTAMO, MULTA y RESERVA.
+Este módulo entrega esos cambios por lotes a partir de un cursor (seq), de modo
+que el data warehouse o el servicio de notificaciones solo procesan lo que
+cambió desde su última sincronización, en vez de re-exportar todo cada noche.
+
+Uso:
+    python sincronizacion.py leer --consumidor almacen --lote 500 --confirmar
+    python sincronizacion.py leer --desde 120 --con-datos
+    python sincronizacion.py estado
+    python sincronizacion.py podar
+"""
+
+import sys
+import json
+import sqlite3
+import argparse
+
+# Clave primaria de cada tabla con captura de cambios
+CLAVES_PRIMARIAS = {
+    'USUARIO': 'rut',
+    'LIBRO': 'isbn',
+    'EJEMPLAR': 'id_ejemplar',
+    'PRESTAMO': 'id_prestamo',
+    'MULTA': 'id_multa',
+    'RESERVA': 'id_reserva'
+}
+
+def conectar(ruta_db='biblioteca.db'):
+    """Abre la base de datos con filas accesibles por nombre de columna"""
+    conn = sqlite3.connect(ruta_db)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def cursor_consumidor(conn, consumidor):
+    """Último seq confirmado por un consumidor (0 si es nuevo)"""
+    fila = conn.execute("SELECT ultimo_seq FROM CONSUMIDOR_CAMBIO WHERE nombre=?",
+                        (consumidor,)).fetchone()
+    return fila[0] if fila else 0
+
+def _adjuntar_datos(conn, cambios):
+    """Agrega el estado actual de cada fila modificada (una consulta por tabla y lote)"""
+    por_tabla = {}
+    for cambio in cambios:
+        if cambio['operacion'] != 'DELETE':
+            por_tabla.setdefault(cambio['tabla'], set()).add(cambio['clave'])
+
+    filas = {}
+    for tabla, claves in por_tabla.items():
+        pk = CLAVES_PRIMARIAS[tabla]
+        marcadores = ", ".join("?" * len(claves))
+        for fila in conn.execute(f"SELECT * FROM {tabla} WHERE {pk} IN ({marcadores})", list(claves)):
+            filas[(tabla, str(fila[pk]))] = dict(fila)
+
+    for cambio in cambios:
+        # Si la fila ya no existe (se borró después), datos queda en None
+        cambio['datos'] = filas.get((cambio['tabla'], cambio['clave']))
+    return cambios
+
+def leer_cambios(conn, desde=0, lote=500, con_datos=False):
+    """
+    Genera lotes de cambios con seq > desde, en orden de seq.
+
+    Cada lote es una lista de dicts (seq, tabla, operacion, clave, fecha). Con
+    con_datos=True se incluye además la fila actual, leída una vez por tabla.
+    El costo es proporcional a la cantidad de cambios, no al tamaño de la BD.
+    """
+    while True:
+        filas = conn.execute(
+            """SELECT seq, tabla, operacion, clave, fecha FROM REGISTRO_CAMBIO
+               WHERE seq > ? ORDER BY seq LIMIT ?""", (desde, lote)).fetchall()
+        if not filas:
+            return
+
+        cambios = [dict(fila) for fila in filas]
+        if con_datos:
+            _adjuntar_datos(conn, cambios)
+        yield cambios
+
+        desde = cambios[-1]['seq']
+        if len(cambios) < lote:
+            return
+
+def confirmar(conn, consumidor, seq):
+    """Registra que el consumidor ya procesó todo hasta seq (el cursor nunca retrocede)"""
+    conn.execute(
+        """INSERT INTO CONSUMIDOR_CAMBIO (nombre, ultimo_seq, fecha_confirmacion)
+           VALUES (?, ?, DATETIME('now'))
+           ON CONFLICT(nombre) DO UPDATE SET
+               ultimo_seq = MAX(ultimo_seq, excluded.ultimo_seq),
+               fecha_confirmacion = excluded.fecha_confirmacion""", (consumidor, seq))
+    conn.commit()
+
+def podar(conn):
+    """Borra los cambios que todos los consumidores registrados ya confirmaron"""
+    limite = conn.execute("SELECT MIN(ultimo_seq) FROM CONSUMIDOR_CAMBIO").fetchone()[0]
+    if limite is None:
+        # Sin consumidores registrados no se sabe qué se procesó: no se borra nada
+        return 0
+    borradas = conn.execute("DELETE FROM REGISTRO_CAMBIO WHERE seq <= ?", (limite,)).rowcount
+    conn.commit()
+    return borradas
+
+def estado(conn):
+    """Resumen del registro: rango de seq pendiente y cursor de cada consumidor"""
+    rango = conn.execute("SELECT MIN(seq), MAX(seq), COUNT(*) FROM REGISTRO_CAMBIO").fetchone()
+    consumidores = conn.execute(
+        "SELECT nombre, ultimo_seq, fecha_confirmacion FROM CONSUMIDOR_CAMBIO ORDER BY nombre").fetchall()
+    return {
+        'seq_minimo': rango[0],
+        'seq_maximo': rango[1],
+        'cambios_guardados': rango[2],
+        'consumidores': [dict(fila) for fila in consumidores]
+    }
+
+def main():
+    """CLI: escribe los cambios como JSON por línea en la salida estándar"""
+    parser = argparse.ArgumentParser(description="Feed de cambios de la Biblioteca UFT")
+    parser.add_argument('--db', default='biblioteca.db', help="archivo SQLite (por defecto biblioteca.db)")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_leer = sub.add_parser('leer', help="emite los cambios posteriores a un cursor")
+    p_leer.add_argument('--consumidor', help="toma el cursor guardado de este consumidor")
+    p_leer.add_argument('--desde', type=int, help="seq de partida (tiene prioridad sobre --consumidor)")
+    p_leer.add_argument('--lote', type=int, default=500, help="cambios por lote")
+    p_leer.add_argument('--con-datos', action='store_true', help="incluye la fila actual de cada cambio")
+    p_leer.add_argument('--confirmar', action='store_true',
+                        help="guarda el cursor del consumidor después de emitir cada lote")
+
+    sub.add_parser('estado', help="muestra el rango pendiente y los cursores")
+    sub.add_parser('podar', help="borra los cambios confirmados por todos los consumidores")
+
+    args = parser.parse_args()
+    conn = conectar(args.db)
+
+    try:
+        if args.comando == 'leer':
+            if args.confirmar and not args.consumidor:
+                parser.error("--confirmar requiere --consumidor")
+
+            desde = args.desde
+            if desde is None:
+                desde = cursor_consumidor(conn, args.consumidor) if args.consumidor else 0
+
+            total = 0
+            for cambios in leer_cambios(conn, desde, args.lote, args.con_datos):
+                for cambio in cambios:
+                    sys.stdout.write(json.dumps(cambio, ensure_ascii=False) + "\n")
+                sys.stdout.flush()
+                total += len(cambios)
+                if args.confirmar:
+                    confirmar(conn, args.consumidor, cambios[-1]['seq'])
+            print(f"{total} cambios emitidos desde seq {desde}", file=sys.stderr)
+
+        elif args.comando == 'estado':
+            print(json.dumps(estado(conn), ensure_ascii=False, indent=2))
+
+        elif args.comando == 'podar':
+            print(f"{podar(conn)} cambios podados", file=sys.stderr)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -4,211 +4,161 @@ Asignatura: Base de Datos
 Integrantes: [Tu equipo]
 """
 
+import io
 import streamlit as st
 import sqlite3
 import pandas as pd
 from datetime import datetime, timedelta
-import plotly.express as px
-
-# Configuración de la página
-st.set_page_config(
-    page_title="Biblioteca UFT",
-    layout="wide",
-    initial_sidebar_state="expanded"
+import sedes
+import toma_inventario
+import datos_biblioteca as datos_bd
+from datos_biblioteca import (
+    conectar_bd,
+    insertar_usuario, modificar_usuario, borrar_usuario,
+    insertar_libro, modificar_libro, borrar_libro,
+    insertar_ejemplar, modificar_ejemplar, borrar_ejemplar,
+    registrar_prestamo, registrar_devolucion, borrar_prestamo,
+    cargar_stats_generales
 )
-
-# CSS para que se vea ordenado (Títulos y tarjetas)
-st.markdown("""
-    <style>
-    .titulo-principal {
-        font-size: 2rem;
-        color: #1e3a8a;
-        font-weight: bold;
-        text-align: center;
-        margin-bottom: 20px;
-        border-bottom: 2px solid #1e3a8a;
-    }
-    .tarjeta {
-        background-color: #f8fafc;
-        padding: 15px;
-        border-radius: 8px;
-        border-left: 5px solid #2563eb;
-    }
-    </style>
-""", unsafe_allow_html=True)
+# plotly.express se importa dentro de las vistas que grafican (Dashboard y
+# Reportes): es el módulo más pesado y el resto de las vistas no lo necesita.
+
+def configurar_pagina():
+    """Configuración de la página y estilos (solo al ejecutar la app, no al importarla)"""
+    st.set_page_config(
+        page_title="Biblioteca UFT",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    
+    # CSS para que se vea ordenado (Títulos y tarjetas)
+    st.markdown("""
+        <style>
+        .titulo-principal {
+            font-size: 2rem;
+            color: #1e3a8a;
+            font-weight: bold;
+            text-align: center;
+            margin-bottom: 20px;
+            border-bottom: 2px solid #1e3a8a;
+        }
+        .tarjeta {
+            background-color: #f8fafc;
+            padding: 15px;
+            border-radius: 8px;
+            border-left: 5px solid #2563eb;
+        }
+        </style>
+    """, unsafe_allow_html=True)
 
 # ---------------------------------------------------------
 # 1. CONEXIÓN A BASE DE DATOS
 # ---------------------------------------------------------
 
-@st.cache_resource
-def conectar_bd():
-    """Abre la conexión con el archivo SQLite"""
-    try:
-        # check_same_thread=False es necesario para que no falle con Streamlit
-        return sqlite3.connect('biblioteca.db', check_same_thread=False)
-    except Exception as error:
-        st.error(f"No se pudo conectar a la base de datos: {error}")
-        return None
-
-def ejecutar_sql(consulta, parametros=None, obtener_datos=True):
-    """Función para ejecutar cualquier query SQL"""
-    conexion = conectar_bd()
-    if conexion is None:
-        return None
-    
-    try:
-        cursor = conexion.cursor()
-        if parametros:
-            cursor.execute(consulta, parametros)
-        else:
-            cursor.execute(consulta)
-        
-        if obtener_datos:
-            return cursor.fetchall()
-        else:
-            conexion.commit()
-            return True
-    except Exception as e:
-        st.error(f"Error en la consulta SQL: {e}")
-        return None
-
-def cargar_dataframe(consulta, columnas=None):
-    """Trae datos de la BD y los convierte en una tabla de Pandas"""
-    resultados = ejecutar_sql(consulta)
-    if resultados:
-        return pd.DataFrame(resultados, columns=columnas)
+# Las consultas viven en datos_biblioteca.py; aquí solo se convierten en tablas
+def cargar_dataframe(filas, columnas=None):
+    """Convierte las filas que devuelve la capa de datos en una tabla de Pandas"""
+    if filas:
+        return pd.DataFrame(filas, columns=columnas)
     return pd.DataFrame()
 
 # ---------------------------------------------------------
 # 2. FUNCIONES CRUD (Lógica del sistema)
 # ---------------------------------------------------------
 
-# --- USUARIOS ---
-def insertar_usuario(rut, nombre, correo, direccion, telefono, tipo):
-    sql = """INSERT INTO USUARIO (rut, nombre, correo, direccion, telefono, tipo_usuario)
-             VALUES (?, ?, ?, ?, ?, ?)"""
-    return ejecutar_sql(sql, (rut, nombre, correo, direccion, telefono, tipo), fetch=False)
+# Las altas, cambios y bajas se usan tal cual desde datos_biblioteca
 
+# --- USUARIOS ---
 def obtener_usuarios():
-    sql = "SELECT rut, nombre, correo, direccion, telefono, tipo_usuario FROM USUARIO"
     cols = ['RUT', 'Nombre', 'Correo', 'Dirección', 'Teléfono', 'Tipo']
-    return cargar_dataframe(sql, cols)
-
-def modificar_usuario(rut, nombre, correo, direccion, telefono, tipo):
-    sql = """UPDATE USUARIO SET nombre=?, correo=?, direccion=?, telefono=?, tipo_usuario=?
-             WHERE rut=?"""
-    return ejecutar_sql(sql, (nombre, correo, direccion, telefono, tipo, rut), fetch=False)
+    return cargar_dataframe(datos_bd.obtener_usuarios(), cols)
 
-def borrar_usuario(rut):
-    sql = "DELETE FROM USUARIO WHERE rut=?"
-    return ejecutar_sql(sql, (rut,), fetch=False)
+# Catálogo e inventario salen de la instantánea en memoria que comparten
+# todas las sesiones; las tablas muestran a lo más LIMITE_TABLA filas
+LIMITE_TABLA = 1000
 
 # --- LIBROS ---
-def insertar_libro(isbn, titulo, editorial, anio, cat, autor, idioma, pags):
-    sql = """INSERT INTO LIBRO (isbn, titulo, editorial, anio, categoria, autor, idioma, num_paginas)
-             VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
-    return ejecutar_sql(sql, (isbn, titulo, editorial, anio, cat, autor, idioma, pags), fetch=False)
-
-def obtener_catalogo():
-    sql = "SELECT isbn, titulo, autor, editorial, anio, categoria, idioma, num_paginas FROM LIBRO"
+def obtener_catalogo(filtro=None, limite=LIMITE_TABLA):
     cols = ['ISBN', 'Título', 'Autor', 'Editorial', 'Año', 'Categoría', 'Idioma', 'Páginas']
-    return cargar_dataframe(sql, cols)
-
-def modificar_libro(isbn, titulo, editorial, anio, cat, autor, idioma, pags):
-    sql = """UPDATE LIBRO SET titulo=?, editorial=?, anio=?, categoria=?, autor=?, idioma=?, num_paginas=?
-             WHERE isbn=?"""
-    return ejecutar_sql(sql, (titulo, editorial, anio, cat, autor, idioma, pags, isbn), fetch=False)
-
-def borrar_libro(isbn):
-    sql = "DELETE FROM LIBRO WHERE isbn=?"
-    return ejecutar_sql(sql, (isbn,), fetch=False)
+    libros = datos_bd.catalogo_en_memoria().buscar_libros(filtro, limite)
+    return cargar_dataframe([libro.fila() for libro in libros], cols)
 
 # --- EJEMPLARES ---
-def insertar_ejemplar(isbn, codigo, estado, ubicacion, condicion):
-    sql = """INSERT INTO EJEMPLAR (isbn, codigo_barras, estado, ubicacion, condicion)
-             VALUES (?, ?, ?, ?, ?)"""
-    return ejecutar_sql(sql, (isbn, codigo, estado, ubicacion, condicion), fetch=False)
-
-def obtener_inventario():
-    sql = """SELECT e.id_ejemplar, e.isbn, l.titulo, e.codigo_barras, e.estado, e.ubicacion, e.condicion
-             FROM EJEMPLAR e JOIN LIBRO l ON e.isbn = l.isbn"""
+def obtener_inventario(texto=None, estado=None, limite=LIMITE_TABLA):
     cols = ['ID', 'ISBN', 'Título', 'Código', 'Estado', 'Ubicación', 'Condición']
-    return cargar_dataframe(sql, cols)
-
-def modificar_ejemplar(id_ej, estado, ubicacion, condicion):
-    sql = "UPDATE EJEMPLAR SET estado=?, ubicacion=?, condicion=? WHERE id_ejemplar=?"
-    return ejecutar_sql(sql, (estado, ubicacion, condicion, id_ej), fetch=False)
-
-def borrar_ejemplar(id_ej):
-    sql = "DELETE FROM EJEMPLAR WHERE id_ejemplar=?"
-    return ejecutar_sql(sql, (id_ej,), fetch=False)
+    catalogo = datos_bd.catalogo_en_memoria()
+    return cargar_dataframe(catalogo.filas_inventario(catalogo.buscar_ejemplares(texto, estado, limite)), cols)
 
 # --- PRÉSTAMOS ---
-def registrar_prestamo(rut, id_ejemplar, vencimiento):
-    fecha_hoy = datetime.now().strftime('%Y-%m-%d')
-    sql = """INSERT INTO PRESTAMO (rut_usuario, id_ejemplar, fecha_prestamo, fecha_vencimiento, estado)
-             VALUES (?, ?, ?, ?, 'activo')"""
-    return ejecutar_sql(sql, (rut, id_ejemplar, fecha_hoy, vencimiento), fetch=False)
-
-def obtener_historial_prestamos():
-    sql = """SELECT p.id_prestamo, u.nombre, l.titulo, e.codigo_barras, 
-             p.fecha_prestamo, p.fecha_vencimiento, p.fecha_devolucion, p.estado
-             FROM PRESTAMO p
-             JOIN USUARIO u ON p.rut_usuario = u.rut
-             JOIN EJEMPLAR e ON p.id_ejemplar = e.id_ejemplar
-             JOIN LIBRO l ON e.isbn = l.isbn
-             ORDER BY p.fecha_prestamo DESC"""
+def obtener_historial_prestamos(desde=None, hasta=None):
     cols = ['ID', 'Usuario', 'Libro', 'Código', 'Inicio', 'Vencimiento', 'Devolución', 'Estado']
-    return cargar_dataframe(sql, cols)
-
-def registrar_devolucion(id_prestamo):
-    fecha_hoy = datetime.now().strftime('%Y-%m-%d')
-    sql = "UPDATE PRESTAMO SET fecha_devolucion=?, estado='devuelto' WHERE id_prestamo=?"
-    return ejecutar_sql(sql, (fecha_hoy, id_prestamo), fetch=False)
-
-def borrar_prestamo(id_prestamo):
-    sql = "DELETE FROM PRESTAMO WHERE id_prestamo=?"
-    return ejecutar_sql(sql, (id_prestamo,), fetch=False)
+    return cargar_dataframe(datos_bd.obtener_historial_prestamos(desde, hasta), cols)
 
 # --- ESTADÍSTICAS Y REPORTES ---
-def cargar_stats_generales():
-    datos = {}
-    datos['usuarios'] = ejecutar_sql("SELECT COUNT(*) FROM USUARIO")[0][0]
-    datos['libros'] = ejecutar_sql("SELECT COUNT(*) FROM LIBRO")[0][0]
-    datos['prestamos'] = ejecutar_sql("SELECT COUNT(*) FROM PRESTAMO WHERE estado IN ('activo', 'vencido')")[0][0]
-    
-    # Manejo de nulos en la suma
-    total_multas = ejecutar_sql("SELECT SUM(monto) FROM MULTA WHERE estado='pendiente'")[0][0]
-    datos['deuda'] = total_multas if total_multas else 0
-    
-    return datos
-
-def cargar_prestamos_activos_vista():
-    return cargar_dataframe("SELECT * FROM v_prestamos_activos", 
+# Con `filas` se arma el DataFrame de un resultado ya cargado (datos_bd.cargar_tablero)
+def cargar_prestamos_activos_vista(filas=None):
+    if filas is None:
+        filas = datos_bd.cargar_prestamos_activos_vista()
+    return cargar_dataframe(filas, 
         ['ID', 'Usuario', 'RUT', 'Correo', 'Tipo', 'Título', 'Autor', 'Código', 
          'Ubicación', 'Inicio', 'Vencimiento', 'Estado', 'Días Atraso'])
 
 def cargar_multas_vista():
-    return cargar_dataframe("SELECT * FROM v_multas_pendientes",
+    return cargar_dataframe(datos_bd.cargar_multas_vista(),
         ['ID', 'Usuario', 'RUT', 'Correo', 'Libro', 'Autor', 'Monto', 'Fecha', 'Días'])
 
-def cargar_ranking_libros():
-    return cargar_dataframe("SELECT * FROM v_kpi_ranking_libros LIMIT 10",
+def cargar_ranking_libros(filas=None):
+    if filas is None:
+        filas = datos_bd.cargar_ranking_libros()
+    return cargar_dataframe(filas,
         ['Ranking', 'ISBN', 'Título', 'Autor', 'Categoría', 'Préstamos', 'Ejemplares', 'Rotación'])
 
 def cargar_disponibilidad():
-    return cargar_dataframe("SELECT * FROM v_disponibilidad_ejemplares",
+    return cargar_dataframe(datos_bd.cargar_disponibilidad(),
         ['ISBN', 'Título', 'Autor', 'Categoría', 'Total', 'Disponibles', 'Prestados', 'Reparación', 'Bajas'])
 
+# --- TOMA DE INVENTARIO ---
+# Cada sesión de Streamlit tiene su propia conexión: la tabla temporal de
+# lecturas y las transacciones de la conciliación no pueden ir por la
+# conexión compartida de datos_bd.conectar_bd(), o dos tomas simultáneas se
+# borrarían y mezclarían las lecturas
+def abrir_toma_inventario(archivo, desde, hasta):
+    """SesionInventario del archivo y rango dados; se reutiliza entre recargas de la página"""
+    clave = (archivo.file_id, desde, hasta)
+    toma = st.session_state.get('toma_inventario')
+    if toma is not None and toma['clave'] == clave:
+        return toma['sesion'], toma['aceptadas'], toma['ignoradas']
+    cerrar_toma_inventario()
+
+    # Los reruns de una misma sesión pueden ir en hilos distintos, nunca a la vez
+    conn = sqlite3.connect(sedes.ruta_sede(), check_same_thread=False)
+    conn.execute("PRAGMA foreign_keys = ON")
+    try:
+        sesion = toma_inventario.SesionInventario(conn, desde, hasta)
+        aceptadas, ignoradas = sesion.cargar(
+            toma_inventario.leer_lecturas(io.StringIO(archivo.getvalue().decode('utf-8'))))
+    except Exception:
+        conn.close()
+        raise
+    st.session_state['toma_inventario'] = {'clave': clave, 'conn': conn, 'sesion': sesion,
+                                           'aceptadas': aceptadas, 'ignoradas': ignoradas}
+    return sesion, aceptadas, ignoradas
+
+def cerrar_toma_inventario():
+    """Cierra la conexión de la toma en curso de esta sesión, si la hay"""
+    toma = st.session_state.pop('toma_inventario', None)
+    if toma is not None:
+        toma['conn'].close()
+
 # ---------------------------------------------------------
 # 3. VISTAS DE LA INTERFAZ (Front-end)
 # ---------------------------------------------------------
 
-def vista_dashboard():
+def vista_dashboard(datos):
+    """`datos`: resultados de datos_bd.cargar_tablero()"""
     st.markdown("<div class='titulo-principal'>Resumen General</div>", unsafe_allow_html=True)
     
-    stats = cargar_stats_generales()
+    stats = datos['stats']
     
     c1, c2, c3, c4 = st.columns(4)
     c1.metric("Total Usuarios", stats['usuarios'])
@@ -218,11 +168,14 @@ def vista_dashboard():
     
     st.divider()
     
+    # Los KPI ya se enviaron al navegador; recién ahora se paga la carga de plotly
+    import plotly.express as px
+    
     c_izq, c_der = st.columns(2)
     
     with c_izq:
         st.subheader("Lo más solicitado")
-        df_top = cargar_ranking_libros().head(5)
+        df_top = cargar_ranking_libros(datos['ranking_libros']).head(5)
         if not df_top.empty:
             grafico = px.bar(df_top, x='Título', y='Préstamos', color='Préstamos')
             st.plotly_chart(grafico, use_container_width=True)
@@ -231,15 +184,14 @@ def vista_dashboard():
             
     with c_der:
         st.subheader("Categorías")
-        sql = "SELECT categoria, COUNT(*) as num FROM LIBRO GROUP BY categoria"
-        df_cats = cargar_dataframe(sql, ['Categoría', 'Cantidad'])
+        df_cats = cargar_dataframe(datos['categorias'], ['Categoría', 'Cantidad'])
         if not df_cats.empty:
             grafico = px.pie(df_cats, values='Cantidad', names='Categoría')
             st.plotly_chart(grafico, use_container_width=True)
 
     st.divider()
     st.subheader("Estado de Préstamos Actuales")
-    df_activos = cargar_prestamos_activos_vista()
+    df_activos = cargar_prestamos_activos_vista(datos['prestamos_activos'])
     
     if not df_activos.empty:
         # Función para colorear filas con atraso (Sin emojis)
@@ -320,14 +272,44 @@ def vista_usuarios():
 def vista_libros():
     st.markdown("<div class='titulo-principal'>Catálogo de Libros</div>", unsafe_allow_html=True)
     
-    tab_cat, tab_new, tab_mod = st.tabs(["Catálogo", "Registrar Libro", "Modificar"])
+    tab_cat, tab_sedes, tab_new, tab_mod = st.tabs(["Catálogo", "Todas las Sedes", "Registrar Libro", "Modificar"])
     
     with tab_cat:
-        df = obtener_catalogo()
         filtro = st.text_input("Buscar libro:")
-        if filtro:
-            df = df[df['Título'].str.contains(filtro, case=False) | df['ISBN'].str.contains(filtro)]
+        df = obtener_catalogo(filtro)
         st.dataframe(df, use_container_width=True, hide_index=True)
+        if len(df) == LIMITE_TABLA:
+            st.caption(f"Se muestran los primeros {LIMITE_TABLA} libros; usa el buscador para acotar.")
+        
+        if filtro and df.empty:
+            sugerencias = datos_bd.sugerir_libros(filtro)
+            if sugerencias:
+                st.info("¿Quisiste decir?")
+                st.dataframe(pd.DataFrame([
+                    {'ISBN': s['isbn'], 'Título': s['titulo'], 'Autor': s['autor'],
+                     'Similitud': f"{s['similitud']:.0%}"} for s in sugerencias]),
+                    use_container_width=True, hide_index=True)
+
+    with tab_sedes:
+        texto = st.text_input("Buscar en el catálogo de todas las sedes (Título, Autor o ISBN):")
+        if texto:
+            libros, errores = sedes.buscar_catalogo(texto)
+            for sede, error in errores.items():
+                st.warning(f"Sede {sede} no disponible: {error}")
+            if libros:
+                df_red = pd.DataFrame([
+                    {'ISBN': l['isbn'], 'Título': l['titulo'], 'Autor': l['autor'],
+                     'Disponibles': l['disponibles'], 'Total': l['total'],
+                     'Sedes': ", ".join(f"{sede}: {n}" for sede, n in l["sedes"].items())}
+                    for l in libros])
+                st.dataframe(df_red, use_container_width=True, hide_index=True)
+                
+                isbn_red = st.selectbox("Ver disponibilidad por sede", df_red['ISBN'].tolist())
+                filas, _ = sedes.disponibilidad_federada(isbn_red)
+                st.dataframe(pd.DataFrame(filas, columns=['Sede', 'Copias', 'Disponibles', 'Ubicaciones']),
+                             use_container_width=True, hide_index=True)
+            else:
+                st.info("Ninguna sede tiene libros que coincidan.")
 
     with tab_new:
         with st.form("frm_libro"):
@@ -348,20 +330,21 @@ def vista_libros():
                     st.error("Error: Verifique que el ISBN no esté duplicado.")
 
     with tab_mod:
-        df_l = obtener_catalogo()
-        if not df_l.empty:
-            sel_isbn = st.selectbox("Seleccionar Libro", df_l['ISBN'].tolist())
-            datos = df_l[df_l['ISBN'] == sel_isbn].iloc[0]
+        catalogo = datos_bd.catalogo_en_memoria()
+        isbns = catalogo.isbns()
+        if isbns:
+            sel_isbn = st.selectbox("Seleccionar Libro", isbns)
+            datos = catalogo.libro(sel_isbn)
             
             with st.form("frm_edit_libro"):
-                tit = st.text_input("Título", value=datos['Título'])
-                aut = st.text_input("Autor", value=datos['Autor'])
-                edi = st.text_input("Editorial", value=datos['Editorial'])
-                ano = st.number_input("Año", value=int(datos['Año']))
+                tit = st.text_input("Título", value=datos.titulo)
+                aut = st.text_input("Autor", value=datos.autor or "")
+                edi = st.text_input("Editorial", value=datos.editorial or "")
+                ano = st.number_input("Año", value=int(datos.anio or 0))
                 cate = st.selectbox("Categoría", ['Ficción', 'No Ficción', 'Referencia', 'Tesis'], 
-                                  index=['Ficción', 'No Ficción', 'Referencia', 'Tesis'].index(datos['Categoría']))
-                idi = st.text_input("Idioma", value=datos['Idioma'])
-                pg = st.number_input("Páginas", value=int(datos['Páginas']))
+                                  index=['Ficción', 'No Ficción', 'Referencia', 'Tesis'].index(datos.categoria))
+                idi = st.text_input("Idioma", value=datos.idioma or "")
+                pg = st.number_input("Páginas", value=int(datos.num_paginas or 0))
                 
                 if st.form_submit_button("Actualizar"):
                     if modificar_libro(sel_isbn, tit, edi, ano, cate, aut, idi, pg):
@@ -378,20 +361,18 @@ def vista_libros():
 def vista_ejemplares():
     st.markdown("<div class='titulo-principal'>Inventario Físico</div>", unsafe_allow_html=True)
     
-    tab_inv, tab_add, tab_edit = st.tabs(["Inventario", "Agregar Copia", "Modificar Copia"])
+    tab_inv, tab_add, tab_edit, tab_tras, tab_toma = st.tabs(
+        ["Inventario", "Agregar Copia", "Modificar Copia", "Traslados", "Toma de Inventario"])
     
     with tab_inv:
-        df = obtener_inventario()
-        
         # Filtros
         c1, c2 = st.columns(2)
-        estado_f = c1.selectbox("Filtrar por Estado", ['Todos', 'disponible', 'prestado', 'en_reparacion', 'perdido'])
+        estado_f = c1.selectbox("Filtrar por Estado", ['Todos', 'disponible', 'prestado', 'en_reparacion', 'perdido', 'en_traslado'])
         texto_f = c2.text_input("Buscar por código o título")
         
-        if estado_f != 'Todos':
-            df = df[df['Estado'] == estado_f]
-        if texto_f:
-            df = df[df['Título'].str.contains(texto_f, case=False) | df['Código'].str.contains(texto_f)]
+        df = obtener_inventario(texto_f, None if estado_f == 'Todos' else estado_f)
+        if len(df) == LIMITE_TABLA:
+            st.caption(f"Se muestran las primeras {LIMITE_TABLA} copias; usa los filtros para acotar.")
             
         # Colores simples para el estado
         def color_inventario(row):
@@ -404,11 +385,11 @@ def vista_ejemplares():
         st.dataframe(df.style.apply(color_inventario, axis=1), use_container_width=True, hide_index=True)
 
     with tab_add:
-        libros = obtener_catalogo()
-        if not libros.empty:
+        isbns = datos_bd.catalogo_en_memoria().isbns()
+        if isbns:
             with st.form("frm_ejemplar"):
                 c1, c2 = st.columns(2)
-                isbn_sel = c1.selectbox("Libro", libros['ISBN'].tolist())
+                isbn_sel = c1.selectbox("Libro", isbns)
                 codigo = c1.text_input("Código de Barras (Único)")
                 estado = c1.selectbox("Estado Inicial", ['disponible', 'en_reparacion'])
                 ubic = c2.text_input("Ubicación (Estantería)")
@@ -426,18 +407,19 @@ def vista_ejemplares():
             st.warning("Primero debes registrar libros en el catálogo.")
 
     with tab_edit:
-        df_e = obtener_inventario()
-        if not df_e.empty:
-            id_sel = st.selectbox("Seleccionar Copia", df_e['ID'].tolist(), format_func=lambda x: f"ID: {x}")
-            datos = df_e[df_e['ID'] == id_sel].iloc[0]
+        catalogo = datos_bd.catalogo_en_memoria()
+        ids = catalogo.ids_ejemplares()
+        if ids:
+            id_sel = st.selectbox("Seleccionar Copia", ids, format_func=lambda x: f"ID: {x}")
+            datos = catalogo.ejemplar(id_sel)
             
             with st.form("frm_edit_ej"):
-                st.write(f"Editando: {datos['Título']} ({datos['Código']})")
-                n_est = st.selectbox("Estado", ['disponible', 'prestado', 'en_reparacion', 'perdido', 'baja'], 
-                                   index=['disponible', 'prestado', 'en_reparacion', 'perdido', 'baja'].index(datos['Estado']))
-                n_ubi = st.text_input("Ubicación", value=datos['Ubicación'] if pd.notna(datos['Ubicación']) else "")
+                st.write(f"Editando: {catalogo.titulo(datos)} ({datos.codigo_barras})")
+                estados = ['disponible', 'prestado', 'en_reparacion', 'perdido', 'baja', 'en_traslado', 'trasladado']
+                n_est = st.selectbox("Estado", estados, index=estados.index(datos.estado))
+                n_ubi = st.text_input("Ubicación", value=datos.ubicacion or "")
                 n_con = st.selectbox("Condición", ['excelente', 'bueno', 'regular', 'malo'],
-                                   index=['excelente', 'bueno', 'regular', 'malo'].index(datos['Condición']))
+                                   index=['excelente', 'bueno', 'regular', 'malo'].index(datos.condicion))
                 
                 if st.form_submit_button("Guardar Cambios"):
                     if modificar_ejemplar(id_sel, n_est, n_ubi, n_con):
@@ -451,13 +433,94 @@ def vista_ejemplares():
                 else:
                     st.error("No se puede eliminar (está prestado o tiene historial).")
 
+    with tab_tras:
+        local = sedes.sede_actual()
+        otras = [codigo for codigo in sedes.cargar_sedes() if codigo != local]
+        
+        if otras:
+            c1, c2 = st.columns(2)
+            with c1:
+                st.write("#### Enviar copia a otra sede")
+                with st.form("frm_enviar"):
+                    cod_env = st.text_input("Código de Barras")
+                    destino = st.selectbox("Sede de destino", otras)
+                    if st.form_submit_button("Enviar"):
+                        try:
+                            sedes.enviar_traslado(local, destino, cod_env)
+                            st.success(f"Copia enviada a {destino}. Queda 'en_traslado' hasta que la reciban.")
+                        except (ValueError, sqlite3.Error) as e:
+                            st.error(f"No se pudo enviar: {e}")
+            
+            with c2:
+                st.write("#### Traslados en curso")
+                pendientes = pd.DataFrame(sedes.traslados_pendientes(local),
+                                          columns=['ID', 'Código', 'ISBN', 'Origen', 'Destino', 'Enviado'])
+                st.dataframe(pendientes, use_container_width=True, hide_index=True)
+                
+                por_recibir = pendientes[pendientes['Destino'] == local]
+                if not por_recibir.empty:
+                    cod_rec = st.selectbox("Copia que llegó", por_recibir['Código'].tolist())
+                    ubic_rec = st.text_input("Ubicación en esta sede")
+                    if st.button("Registrar Recepción"):
+                        try:
+                            sedes.recibir_traslado(local, cod_rec, ubic_rec or None)
+                            st.success("Copia recibida y disponible en esta sede.")
+                            st.rerun()
+                        except (ValueError, sqlite3.Error) as e:
+                            st.error(f"No se pudo recibir: {e}")
+        else:
+            st.info("Solo hay una sede configurada (ver sedes.json).")
+
+    with tab_toma:
+        st.write("Sube el archivo del lector (CSV: ubicación,código de barras por línea) de un rango de estanterías.")
+        c1, c2 = st.columns(2)
+        desde = c1.text_input("Desde estantería", value="Estantería 1")
+        hasta = c2.text_input("Hasta estantería", value="Estantería 9Z")
+        archivo = st.file_uploader("Lecturas", type=['csv', 'txt'])
+        
+        if archivo is None or not (desde and hasta):
+            cerrar_toma_inventario()
+        else:
+            sesion, aceptadas, ignoradas = abrir_toma_inventario(archivo, desde, hasta)
+            st.caption(f"{aceptadas:,} lecturas cargadas ({ignoradas:,} fuera del rango o vacías)")
+            
+            resumen = []
+            detalle = []
+            for ubicacion in sesion.estantes():
+                diferencias = sesion.diferencias(ubicacion)
+                resumen.append({'Estantería': ubicacion,
+                                **{tipo.replace('_', ' ').capitalize(): len(filas) for tipo, filas in diferencias.items()}})
+                for tipo, filas in diferencias.items():
+                    detalle += [{'Estantería': ubicacion, 'Diferencia': tipo, 'Código': codigo, 'Título': titulo,
+                                 'Ubicación registrada': registrada, 'Estado': estado}
+                                for _, codigo, titulo, registrada, estado in filas]
+            
+            st.dataframe(pd.DataFrame(resumen), use_container_width=True, hide_index=True)
+            with st.expander(f"Detalle ({len(detalle):,} copias con diferencias)"):
+                st.dataframe(pd.DataFrame(detalle), use_container_width=True, hide_index=True)
+            
+            marcar = st.checkbox("Marcar como 'perdido' las copias faltantes")
+            if st.button("Aplicar Correcciones"):
+                try:
+                    cambios = sesion.aplicar_todo(marcar)
+                    total = sum(sum(por_tipo.values()) for por_tipo in cambios.values())
+                    st.success(f"{total:,} copias corregidas en {len(cambios)} estanterías.")
+                    # Toma terminada: la próxima recarga vuelve a comparar con los datos corregidos
+                    cerrar_toma_inventario()
+                except sqlite3.Error as e:
+                    st.error(f"No se pudieron aplicar las correcciones: {e}")
+
 def vista_prestamos():
     st.markdown("<div class='titulo-principal'>Control de Préstamos</div>", unsafe_allow_html=True)
     
     tab_hist, tab_prestar, tab_devolver = st.tabs(["Historial", "Realizar Préstamo", "Devoluciones"])
     
     with tab_hist:
-        df = obtener_historial_prestamos()
+        # El rango de fechas se filtra en la BD (índice por día de préstamo)
+        rango = st.date_input("Fecha de préstamo (desde - hasta)", value=())
+        desde = rango[0] if len(rango) > 0 else None
+        hasta = rango[1] if len(rango) > 1 else None
+        df = obtener_historial_prestamos(desde, hasta)
         
         f_estado = st.selectbox("Filtrar Estado", ['Todos', 'activo', 'vencido', 'devuelto'])
         if f_estado != 'Todos':
@@ -475,14 +538,15 @@ def vista_prestamos():
     with tab_prestar:
         usuarios = obtener_usuarios()
         # Buscar solo copias disponibles
-        copias_disp = cargar_dataframe("SELECT e.id_ejemplar, e.codigo_barras, l.titulo FROM EJEMPLAR e JOIN LIBRO l ON e.isbn = l.isbn WHERE e.estado='disponible'", ['ID', 'Código', 'Título'])
+        catalogo = datos_bd.catalogo_en_memoria()
+        copias_disp = [e.id_ejemplar for e in catalogo.buscar_ejemplares(estado='disponible')]
         
-        if not usuarios.empty and not copias_disp.empty:
+        if not usuarios.empty and copias_disp:
             with st.form("frm_prestamo"):
                 c1, c2 = st.columns(2)
                 usr = c1.selectbox("Usuario", usuarios['RUT'].tolist())
-                copia = c2.selectbox("Libro Disponible", copias_disp['ID'].tolist(), 
-                                   format_func=lambda x: f"{copias_disp[copias_disp['ID']==x]['Título'].values[0]}")
+                copia = c2.selectbox("Libro Disponible", copias_disp, 
+                                   format_func=lambda x: catalogo.titulo(catalogo.ejemplar(x)))
                 
                 dias = st.number_input("Días de préstamo", 1, 30, 7)
                 
@@ -498,7 +562,7 @@ def vista_prestamos():
 
     with tab_devolver:
         # Buscar préstamos activos
-        activos = cargar_dataframe("SELECT p.id_prestamo, u.nombre, l.titulo FROM PRESTAMO p JOIN USUARIO u ON p.rut_usuario=u.rut JOIN EJEMPLAR e ON p.id_ejemplar=e.id_ejemplar JOIN LIBRO l ON e.isbn=l.isbn WHERE p.estado IN ('activo','vencido')", ['ID', 'Usuario', 'Libro'])
+        activos = cargar_dataframe(datos_bd.obtener_prestamos_por_devolver(), ['ID', 'Usuario', 'Libro'])
         
         if not activos.empty:
             prestamo_sel = st.selectbox("Seleccione el préstamo a devolver", activos['ID'].tolist(),
@@ -518,12 +582,10 @@ def vista_reportes():
     
     with t1:
         st.subheader("Usuarios con más actividad")
-        sql = """SELECT u.nombre, u.tipo_usuario, COUNT(p.id_prestamo) as total
-                 FROM USUARIO u JOIN PRESTAMO p ON u.rut = p.rut_usuario
-                 GROUP BY u.rut ORDER BY total DESC LIMIT 10"""
-        df = cargar_dataframe(sql, ['Nombre', 'Perfil', 'Préstamos'])
+        df = cargar_dataframe(datos_bd.cargar_ranking_usuarios(), ['Nombre', 'Perfil', 'Préstamos'])
         if not df.empty:
             st.dataframe(df, use_container_width=True)
+            import plotly.express as px
             graf = px.bar(df, x='Nombre', y='Préstamos', color='Perfil')
             st.plotly_chart(graf, use_container_width=True)
             
@@ -547,17 +609,27 @@ def vista_reportes():
 def app_principal():
     with st.sidebar:
         st.title("📚 Biblioteca")
+        st.caption(f"Sede: {sedes.cargar_sedes()[sedes.sede_actual()]['nombre']}")
         opcion = st.radio("Menú", ["Inicio", "Usuarios", "Libros", "Inventario", "Préstamos", "Reportes"])
         
         st.divider()
-        # KPI Rápido en el sidebar
+
+    # En Inicio todas las consultas del tablero corren a la vez y el sidebar
+    # reutiliza sus estadísticas en vez de volver a calcularlas
+    if opcion == "Inicio":
+        datos_tablero, _ = datos_bd.cargar_tablero()
+        stats = datos_tablero['stats']
+    else:
         stats = cargar_stats_generales()
+
+    with st.sidebar:
+        # KPI Rápido en el sidebar
         st.caption(f"Usuarios: {stats['usuarios']}")
         st.caption(f"Libros: {stats['libros']}")
         st.caption("v1.0 - Semestre II")
 
     if opcion == "Inicio":
-        vista_dashboard()
+        vista_dashboard(datos_tablero)
     elif opcion == "Usuarios":
         vista_usuarios()
     elif opcion == "Libros":
@@ -571,6 +643,8 @@ def app_principal():
 
 # Punto de entrada
 if __name__ == "__main__":
+    configurar_pagina()
+    datos_bd.registrar_notificador(st.error)
     conn_check = conectar_bd()
     if conn_check:
         app_principal()
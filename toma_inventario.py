@@ -0,0 +1,236 @@
+"""
+Toma de Inventario (conciliación de estanterías)
+Sistema de Gestión de Biblioteca UFT
+
+Para el inventario anual se escanean todas las copias de un rango de
+estanterías. Las lecturas (ubicación, código de barras) se cargan por lotes
+en una tabla temporal de la conexión, sin una consulta por escaneo, y luego
+se comparan contra EJEMPLAR con consultas de conjunto, estante por estante:
+
+  - faltantes:    disponibles en ese estante según el sistema y no escaneadas
+                  en ninguna parte de la sesión
+  - mal_ubicados: escaneadas en el estante pero registradas en otro
+  - prestados:    escaneadas en el estante con un préstamo abierto
+  - recuperados:  escaneadas en el estante pero marcadas como 'perdido'
+  - desconocidos: códigos escaneados que no existen en EJEMPLAR
+
+Las correcciones de cada estante se aplican en una sola transacción: se
+actualiza la ubicación, se registra la devolución de los préstamos abiertos
+(el trigger deja la copia 'disponible'), los perdidos vuelven a 'disponible'
+y, si se pide, los faltantes pasan a 'perdido'.
+
+El rango compara las ubicaciones como texto ("Estantería 10A" < "Estantería 2A").
+El archivo de lecturas es un CSV con una lectura por línea:
+
+    Estantería 2A,UFT000001
+    Estantería 2A,UFT000002
+
+Uso:
+    python toma_inventario.py lecturas.csv --desde "Estantería 2A" --hasta "Estantería 2Z"
+    python toma_inventario.py lecturas.csv --desde "Estantería 2A" --hasta "Estantería 2Z" --aplicar
+"""
+
+import csv
+import sqlite3
+import argparse
+from itertools import islice
+
+# Copias en manos de otra sede o dadas de baja: el inventario no las corrige
+ESTADOS_EXCLUIDOS = "('en_traslado', 'trasladado', 'baja')"
+
+# Cada diferencia es una consulta de conjunto sobre un estante (parámetro: ubicación)
+DIFERENCIAS = {
+    'faltantes': """
+        SELECT e.id_ejemplar, e.codigo_barras, l.titulo, e.ubicacion, e.estado
+        FROM main.EJEMPLAR e JOIN main.LIBRO l ON l.isbn = e.isbn
+        WHERE e.ubicacion = :ubicacion AND e.estado = 'disponible'
+          AND NOT EXISTS (SELECT 1 FROM temp.LECTURA_INVENTARIO r
+                          WHERE r.codigo_barras = e.codigo_barras)""",
+    'mal_ubicados': f"""
+        SELECT e.id_ejemplar, e.codigo_barras, l.titulo, e.ubicacion, e.estado
+        FROM temp.LECTURA_INVENTARIO r
+        JOIN main.EJEMPLAR e ON e.codigo_barras = r.codigo_barras
+        JOIN main.LIBRO l ON l.isbn = e.isbn
+        WHERE r.ubicacion = :ubicacion AND e.ubicacion IS NOT r.ubicacion
+          AND e.estado NOT IN {ESTADOS_EXCLUIDOS}""",
+    'prestados': """
+        SELECT e.id_ejemplar, e.codigo_barras, l.titulo, e.ubicacion, e.estado
+        FROM temp.LECTURA_INVENTARIO r
+        JOIN main.EJEMPLAR e ON e.codigo_barras = r.codigo_barras
+        JOIN main.LIBRO l ON l.isbn = e.isbn
+        WHERE r.ubicacion = :ubicacion AND e.estado = 'prestado'""",
+    'recuperados': """
+        SELECT e.id_ejemplar, e.codigo_barras, l.titulo, e.ubicacion, e.estado
+        FROM temp.LECTURA_INVENTARIO r
+        JOIN main.EJEMPLAR e ON e.codigo_barras = r.codigo_barras
+        JOIN main.LIBRO l ON l.isbn = e.isbn
+        WHERE r.ubicacion = :ubicacion AND e.estado = 'perdido'""",
+    'desconocidos': """
+        SELECT NULL, r.codigo_barras, NULL, r.ubicacion, NULL
+        FROM temp.LECTURA_INVENTARIO r
+        WHERE r.ubicacion = :ubicacion
+          AND NOT EXISTS (SELECT 1 FROM main.EJEMPLAR e WHERE e.codigo_barras = r.codigo_barras)""",
+}
+
+# Correcciones en orden: primero se cierran préstamos (el trigger deja la copia
+# 'disponible'), después se recuperan perdidos y se corrige la ubicación.
+# El "+estado" evita que SQLite recorra el índice por estado (todos los
+# préstamos abiertos o todas las copias perdidas) en vez de las lecturas del estante.
+CORRECCIONES = [
+    ('prestados', """
+        UPDATE main.PRESTAMO SET estado = 'devuelto', fecha_devolucion = DATE('now')
+        WHERE +estado IN ('activo', 'vencido')
+          AND id_ejemplar IN (SELECT e.id_ejemplar
+                              FROM temp.LECTURA_INVENTARIO r
+                              JOIN main.EJEMPLAR e ON e.codigo_barras = r.codigo_barras
+                              WHERE r.ubicacion = :ubicacion)"""),
+    ('recuperados', """
+        UPDATE main.EJEMPLAR SET estado = 'disponible'
+        WHERE +estado = 'perdido'
+          AND codigo_barras IN (SELECT codigo_barras FROM temp.LECTURA_INVENTARIO
+                                WHERE ubicacion = :ubicacion)"""),
+    ('mal_ubicados', f"""
+        UPDATE main.EJEMPLAR SET ubicacion = :ubicacion
+        WHERE ubicacion IS NOT :ubicacion AND estado NOT IN {ESTADOS_EXCLUIDOS}
+          AND codigo_barras IN (SELECT codigo_barras FROM temp.LECTURA_INVENTARIO
+                                WHERE ubicacion = :ubicacion)"""),
+]
+
+MARCAR_FALTANTES = """
+    UPDATE main.EJEMPLAR SET estado = 'perdido'
+    WHERE ubicacion = :ubicacion AND estado = 'disponible'
+      AND NOT EXISTS (SELECT 1 FROM temp.LECTURA_INVENTARIO r
+                      WHERE r.codigo_barras = EJEMPLAR.codigo_barras)"""
+
+class SesionInventario:
+    """
+    Lecturas de una toma de inventario sobre las estanterías [desde, hasta].
+    La tabla de lecturas es temporal: solo existe en la conexión `conn` y se
+    vacía al abrir una sesión nueva.
+    """
+
+    def __init__(self, conn, desde, hasta):
+        self.conn = conn
+        self.desde = desde
+        self.hasta = hasta
+        conn.execute("""CREATE TABLE IF NOT EXISTS temp.LECTURA_INVENTARIO (
+                            codigo_barras TEXT NOT NULL,
+                            ubicacion TEXT NOT NULL,
+                            PRIMARY KEY (codigo_barras, ubicacion)
+                        ) WITHOUT ROWID""")
+        conn.execute("CREATE INDEX IF NOT EXISTS temp.idx_lectura_ubicacion ON LECTURA_INVENTARIO (ubicacion)")
+        conn.execute("DELETE FROM temp.LECTURA_INVENTARIO")
+        conn.commit()
+
+    def cargar(self, lecturas, lote=10000):
+        """
+        Carga un iterable de (ubicacion, codigo_barras) con un executemany por
+        cada `lote` lecturas. Las lecturas fuera del rango de la sesión se
+        ignoran y un código escaneado dos veces en el mismo estante cuenta una
+        sola vez. Devuelve (aceptadas, ignoradas).
+        """
+        aceptadas = ignoradas = 0
+        lecturas = iter(lecturas)
+        while True:
+            crudas = list(islice(lecturas, lote))
+            if not crudas:
+                return aceptadas, ignoradas
+
+            bloque = []
+            for ubicacion, codigo in crudas:
+                ubicacion, codigo = ubicacion.strip(), codigo.strip()
+                if codigo and self.desde <= ubicacion <= self.hasta:
+                    bloque.append((codigo, ubicacion))
+            ignoradas += len(crudas) - len(bloque)
+            aceptadas += len(bloque)
+
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO temp.LECTURA_INVENTARIO (codigo_barras, ubicacion) VALUES (?, ?)",
+                    bloque)
+
+    def estantes(self):
+        """Estanterías del rango que aparecen en EJEMPLAR o en las lecturas"""
+        filas = self.conn.execute(
+            """SELECT ubicacion FROM main.EJEMPLAR WHERE ubicacion BETWEEN ? AND ?
+               UNION
+               SELECT ubicacion FROM temp.LECTURA_INVENTARIO
+               ORDER BY ubicacion""", (self.desde, self.hasta)).fetchall()
+        return [fila[0] for fila in filas]
+
+    def diferencias(self, ubicacion):
+        """
+        Dict con las filas de cada tipo de diferencia del estante, como tuplas
+        (id_ejemplar, codigo_barras, titulo, ubicacion_registrada, estado)
+        """
+        return {tipo: self.conn.execute(sql, {'ubicacion': ubicacion}).fetchall()
+                for tipo, sql in DIFERENCIAS.items()}
+
+    def aplicar(self, ubicacion, marcar_faltantes=False):
+        """
+        Aplica las correcciones de un estante en una sola transacción.
+        Devuelve cuántas filas cambió cada corrección.
+        """
+        cambios = {}
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            for tipo, sql in CORRECCIONES:
+                cambios[tipo] = self.conn.execute(sql, {'ubicacion': ubicacion}).rowcount
+            if marcar_faltantes:
+                cambios['faltantes'] = self.conn.execute(MARCAR_FALTANTES, {'ubicacion': ubicacion}).rowcount
+            self.conn.execute("COMMIT")
+        except Exception:
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK")
+            raise
+        return cambios
+
+    def aplicar_todo(self, marcar_faltantes=False):
+        """Aplica las correcciones de todos los estantes (una transacción por estante)"""
+        return {ubicacion: self.aplicar(ubicacion, marcar_faltantes) for ubicacion in self.estantes()}
+
+def leer_lecturas(archivo):
+    """Genera (ubicacion, codigo_barras) desde un archivo CSV de texto abierto, sin cargarlo entero"""
+    for fila in csv.reader(archivo):
+        if len(fila) >= 2:
+            yield fila[0], fila[1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Toma de inventario por estanterías")
+    parser.add_argument('lecturas', help="CSV con ubicacion,codigo_barras por línea")
+    parser.add_argument('--desde', required=True, help="primera estantería del rango")
+    parser.add_argument('--hasta', required=True, help="última estantería del rango")
+    parser.add_argument('--db', default='biblioteca.db', help="archivo SQLite (por defecto biblioteca.db)")
+    parser.add_argument('--aplicar', action='store_true', help="aplica las correcciones de cada estante")
+    parser.add_argument('--marcar-faltantes', action='store_true',
+                        help="con --aplicar, deja como 'perdido' las copias faltantes")
+    parser.add_argument('--detalle', action='store_true', help="lista cada copia con diferencias")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    conn.execute("PRAGMA foreign_keys = ON")
+    try:
+        sesion = SesionInventario(conn, args.desde, args.hasta)
+        with open(args.lecturas, 'r', encoding='utf-8', newline='') as archivo:
+            aceptadas, ignoradas = sesion.cargar(leer_lecturas(archivo))
+        print(f"{aceptadas} lecturas cargadas ({ignoradas} fuera del rango o vacías)")
+
+        for ubicacion in sesion.estantes():
+            diferencias = sesion.diferencias(ubicacion)
+            resumen = ", ".join(f"{tipo}: {len(filas)}" for tipo, filas in diferencias.items())
+            print(f"\n{ubicacion}: {resumen}")
+            if args.detalle:
+                for tipo, filas in diferencias.items():
+                    for _, codigo, titulo, registrada, estado in filas:
+                        print(f"   {tipo:13} {codigo:12} {(titulo or '')[:35]:35} {registrada or '-'} ({estado or '-'})")
+            if args.aplicar:
+                cambios = sesion.aplicar(ubicacion, args.marcar_faltantes)
+                print("   corregido: " + ", ".join(f"{tipo}: {n}" for tipo, n in cambios.items()))
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error: {e}")
+        raise SystemExit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,16 @@ estén instalados y configurados correctamente.
 
 import os
 import sys
+import ast
+import time
 import sqlite3
+import argparse
+import statistics
+
+# Umbrales del diagnóstico de rendimiento
+UMBRAL_FRAGMENTACION = 0.10    # fracción de páginas libres que justifica compactar
+UMBRAL_ESTADISTICAS = 0.20     # desviación tolerada entre sqlite_stat1 y COUNT(*)
+UMBRAL_CONSULTA_MS = 100.0     # consultas más lentas que esto se marcan
 
 def print_header(text):
     """Imprime un encabezado formateado"""
@@ -54,6 +63,12 @@ def verificar_archivos():
         'biblioteca.db.sql': 'Script SQL de creación de base de datos',
         'crear_db.py': 'Script de creación de BD',
         'streamlit_semana6.py': 'Aplicación principal Streamlit',
+        'datos_biblioteca.py': 'Capa de datos (consultas SQL)',
+        'sedes.py': 'Configuración de sedes',
+        'busqueda.py': 'Búsqueda tolerante a errores',
+        'catalogo_compartido.py': 'Catálogo compartido en memoria',
+        'toma_inventario.py': 'Conciliación de inventario',
+        'respaldo.py': 'Respaldos en línea',
         'requirements.txt': 'Lista de dependencias',
         'README.md': 'Documentación del proyecto'
     }
@@ -92,7 +107,12 @@ def verificar_base_datos():
             'RESERVA': 'Reservas de libros',
             'MULTA': 'Multas por atrasos',
             'DEPARTAMENTO': 'Departamentos',
-            'PERSONAL': 'Personal de biblioteca'
+            'PERSONAL': 'Personal de biblioteca',
+            'TRASLADO': 'Traslados entre sedes',
+            'NOTIFICACION': 'Avisos por correo enviados',
+            'REGISTRO_CAMBIO': 'Registro de cambios (CDC)',
+            'CONSUMIDOR_CAMBIO': 'Cursores de sincronización',
+            'LIBRO_TRIGRAMA_ID': 'Índice de búsqueda aproximada'
         }
         
         print("\n  📊 Tablas y registros:")
@@ -190,12 +210,14 @@ def verificar_codigo():
     print_header("🐍 Verificando Código Python")
     
     try:
-        # Intentar importar el módulo principal
+        # La capa de datos no depende de Streamlit; la app ya no tiene efectos al importarse
+        import datos_biblioteca
+        print_success("datos_biblioteca.py se puede importar sin errores")
         import streamlit_semana6
         print_success("streamlit_semana6.py se puede importar sin errores")
         return True
     except ImportError as e:
-        print_error(f"Error al importar streamlit_semana6.py:")
+        print_error(f"Error al importar el código de la app:")
         print(f"       {str(e)}")
         return False
     except Exception as e:
@@ -241,6 +263,266 @@ def test_conexion_bd():
         print_error(f"Error en consultas: {e}")
         return False
 
+# ---------------------------------------------------------
+# DIAGNÓSTICO DE RENDIMIENTO (--rendimiento / --fix)
+# ---------------------------------------------------------
+
+def extraer_consultas_app(archivos=('datos_biblioteca.py', 'streamlit_semana6.py'), todas=False):
+    """
+    Lee las consultas SELECT escritas en la app sin importarla. Con todas=True
+    incluye también las que llevan parámetros y los UPDATE/DELETE.
+    """
+    consultas = []
+    vistos = set()
+    for orden, archivo in enumerate(archivos):
+        with open(archivo, 'r', encoding='utf-8') as f:
+            arbol = ast.parse(f.read())
+        
+        for funcion in arbol.body:
+            if not isinstance(funcion, ast.FunctionDef):
+                continue
+            for nodo in ast.walk(funcion):
+                if isinstance(nodo, ast.Constant) and isinstance(nodo.value, str):
+                    sql = " ".join(nodo.value.split())
+                    if todas:
+                        valida = sql.upper().startswith(("SELECT ", "UPDATE ", "DELETE "))
+                    else:
+                        # Solo la ruta de lectura y sin parámetros (se pueden ejecutar tal cual)
+                        valida = sql.upper().startswith("SELECT ") and '?' not in sql
+                    if valida and sql not in vistos:
+                        vistos.add(sql)
+                        consultas.append((orden, nodo.lineno, funcion.name, sql))
+    
+    consultas.sort()
+    return [(nombre, sql) for _, _, nombre, sql in consultas]
+
+def scans_completos(plan):
+    """Pasos 'SCAN tabla' sin índice del plan (recorren la tabla entera)"""
+    # Las subconsultas y co-rutinas son resultados intermedios, no tablas
+    intermedios = {detalle.split(" ", 1)[1] for _, _, _, detalle in plan
+                   if detalle.startswith(("CO-ROUTINE ", "MATERIALIZE "))}
+    completos = []
+    for _, _, _, detalle in plan:
+        if not detalle.startswith("SCAN ") or "USING" in detalle:
+            continue
+        objeto = detalle[len("SCAN "):]
+        if objeto in intermedios or objeto.startswith("(subquery"):
+            continue
+        completos.append(detalle)
+    return completos
+
+def diagnosticar_integridad(conn):
+    """Ejecuta quick_check e integrity_check"""
+    print("\n  🩺 Integridad:")
+    sano = True
+    for pragma in ('quick_check', 'integrity_check'):
+        filas = [fila[0] for fila in conn.execute(f"PRAGMA {pragma}").fetchall()]
+        if filas == ['ok']:
+            print_success(f"PRAGMA {pragma}: ok")
+        else:
+            print_error(f"PRAGMA {pragma}: {len(filas)} problemas")
+            for problema in filas[:5]:
+                print(f"       {problema}")
+            sano = False
+    return sano
+
+def diagnosticar_almacenamiento(conn):
+    """Informa tamaño de página, páginas totales y páginas libres (fragmentación)"""
+    print("\n  💾 Almacenamiento:")
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    
+    fragmentacion = freelist / page_count if page_count else 0.0
+    print_success(f"{page_count:,} páginas de {page_size:,} bytes ({page_count * page_size / 1024:,.0f} KB)")
+    
+    mensaje = f"{freelist:,} páginas libres ({fragmentacion:.1%} del archivo)"
+    if fragmentacion > UMBRAL_FRAGMENTACION:
+        print_warning(f"{mensaje} - conviene compactar (--fix)")
+        return False, fragmentacion
+    print_success(mensaje)
+    return True, fragmentacion
+
+def diagnosticar_estadisticas(conn):
+    """Revisa que sqlite_stat1 exista y que sus conteos se parezcan a los reales"""
+    print("\n  📈 Estadísticas del planificador (sqlite_stat1):")
+    existe = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='sqlite_stat1'").fetchone()
+    if not existe:
+        print_warning("sqlite_stat1 no existe - nunca se ha ejecutado ANALYZE (--fix)")
+        return False
+    
+    # El primer número de 'stat' es la cantidad de filas que vio ANALYZE
+    filas_analizadas = {}
+    for tabla, stat in conn.execute("SELECT tbl, stat FROM sqlite_stat1").fetchall():
+        filas_analizadas[tabla] = int(stat.split()[0])
+    
+    # Las tablas virtuales (FTS5) no tienen estadísticas propias; sus tablas internas sí
+    tablas = [fila[0] for fila in conn.execute(
+        """SELECT name FROM sqlite_master
+           WHERE type='table' AND name NOT LIKE 'sqlite_%' AND sql NOT LIKE 'CREATE VIRTUAL TABLE%'
+           ORDER BY name""")]
+    
+    frescas = True
+    for tabla in tablas:
+        reales = conn.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+        if tabla not in filas_analizadas:
+            if reales > 0:
+                print_warning(f"{tabla:15} sin estadísticas ({reales:,} filas)")
+                frescas = False
+            continue
+        
+        analizadas = filas_analizadas[tabla]
+        desviacion = abs(reales - analizadas) / max(reales, analizadas, 1)
+        if desviacion > UMBRAL_ESTADISTICAS:
+            print_warning(f"{tabla:15} desactualizada: stat1={analizadas:,} vs real={reales:,}")
+            frescas = False
+        else:
+            print_success(f"{tabla:15} al día ({reales:,} filas)")
+    return frescas
+
+def diagnosticar_planes(conn):
+    """Muestra el EXPLAIN QUERY PLAN de cada vista y marca los recorridos completos"""
+    print("\n  🧭 Planes de consulta de las vistas:")
+    vistas = [fila[0] for fila in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='view' ORDER BY name")]
+    
+    scans = 0
+    for vista in vistas:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN SELECT * FROM {vista}").fetchall()
+        completos = scans_completos(plan)
+        if completos:
+            print_warning(f"{vista}: {len(completos)} recorrido(s) completo(s)")
+            scans += len(completos)
+        else:
+            print_success(f"{vista}")
+        for _, _, _, detalle in plan:
+            marca = "  <- SCAN COMPLETO" if detalle in completos else ""
+            print(f"       {detalle}{marca}")
+    
+    # Los recorridos completos sobre tablas de catálogo pequeñas son normales: solo se informan
+    if scans:
+        print(f"\n  💡 {scans} recorridos completos: revisar si crecen con los datos")
+    return True
+
+def medir_consultas(conn, repeticiones=3):
+    """Cronometra cada consulta de lectura de la app (mejor tiempo y mediana)"""
+    print_header("⏱️  Tiempos de las Consultas de la App")
+    
+    try:
+        consultas = extraer_consultas_app()
+    except (OSError, SyntaxError) as e:
+        print_error(f"No se pudieron leer las consultas de la app: {e}")
+        return False
+    
+    lentas = 0
+    for funcion, sql in consultas:
+        tiempos = []
+        try:
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                filas = conn.execute(sql).fetchall()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+        except sqlite3.Error as e:
+            print_error(f"{funcion}: {e}")
+            continue
+        
+        mejor = min(tiempos)
+        mediana = statistics.median(tiempos)
+        texto = f"{funcion:32} {mejor:8.2f} ms (mediana {mediana:.2f} ms, {len(filas):,} filas)"
+        if mediana > UMBRAL_CONSULTA_MS:
+            print_warning(texto)
+            lentas += 1
+        else:
+            print_success(texto)
+        print(f"       {sql[:90]}{'...' if len(sql) > 90 else ''}")
+    
+    if lentas:
+        print(f"\n  💡 {lentas} consultas sobre {UMBRAL_CONSULTA_MS:.0f} ms")
+    return True
+
+def aplicar_correcciones(conn, fragmentacion):
+    """ANALYZE, PRAGMA optimize y compactación si hay demasiadas páginas libres"""
+    print_header("🔧 Aplicando Correcciones (--fix)")
+    
+    inicio = time.perf_counter()
+    conn.execute("ANALYZE")
+    print_success(f"ANALYZE ({(time.perf_counter() - inicio) * 1000:.0f} ms)")
+    
+    conn.execute("PRAGMA optimize")
+    print_success("PRAGMA optimize")
+    conn.commit()
+    
+    if fragmentacion > UMBRAL_FRAGMENTACION:
+        inicio = time.perf_counter()
+        # auto_vacuum = 2 (INCREMENTAL) permite liberar páginas sin reescribir el archivo
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            conn.execute("PRAGMA incremental_vacuum")
+            conn.commit()
+            print_success(f"PRAGMA incremental_vacuum ({(time.perf_counter() - inicio) * 1000:.0f} ms)")
+        else:
+            conn.execute("VACUUM")
+            print_success(f"VACUUM ({(time.perf_counter() - inicio) * 1000:.0f} ms)")
+    else:
+        print_success("Fragmentación baja, no se compacta")
+
+def diagnosticar_rendimiento(corregir=False):
+    """Modo --rendimiento: salud de la base de datos y velocidad de las consultas"""
+    print_header("🚀 Diagnóstico de Rendimiento")
+    
+    if not os.path.exists('biblioteca.db'):
+        print_error("biblioteca.db NO EXISTE")
+        print("  Ejecuta: python crear_db.py")
+        return {'base_datos': False}
+    
+    resultados = {}
+    conn = sqlite3.connect('biblioteca.db')
+    try:
+        resultados['integridad'] = diagnosticar_integridad(conn)
+        resultados['almacenamiento'], fragmentacion = diagnosticar_almacenamiento(conn)
+        resultados['estadisticas'] = diagnosticar_estadisticas(conn)
+        resultados['planes'] = diagnosticar_planes(conn)
+        resultados['tiempos'] = medir_consultas(conn)
+        
+        if corregir:
+            aplicar_correcciones(conn, fragmentacion)
+            print_header("🔁 Estado Después de las Correcciones")
+            resultados['almacenamiento'], _ = diagnosticar_almacenamiento(conn)
+            resultados['estadisticas'] = diagnosticar_estadisticas(conn)
+            medir_consultas(conn)
+    except sqlite3.Error as e:
+        print_error(f"Error durante el diagnóstico: {e}")
+        resultados['diagnostico'] = False
+    finally:
+        conn.close()
+    
+    return resultados
+
+def mostrar_resumen_rendimiento(resultados):
+    """Resumen del modo --rendimiento"""
+    print_header("📊 RESUMEN DE RENDIMIENTO")
+    
+    for nombre, ok in resultados.items():
+        if ok:
+            print_success(nombre)
+        else:
+            print_warning(nombre)
+    
+    # Sin base o sin diagnóstico no hay nada que --fix pueda corregir: termina con error
+    if not resultados.get('base_datos', True):
+        print("\n  ❌ No existe biblioteca.db: ejecutar python crear_db.py")
+        return False
+    if not resultados.get('diagnostico', True):
+        print("\n  ❌ No se pudo completar el diagnóstico de la base de datos")
+        return False
+    if not resultados.get('integridad', True):
+        print("\n  ❌ La base de datos está dañada: restaurar un respaldo o ejecutar python crear_db.py")
+        return False
+    if not all(resultados.values()):
+        print("\n  💡 Para corregir estadísticas y fragmentación ejecuta:")
+        print("     python verificar_instalacion.py --rendimiento --fix")
+    return True
+
 def mostrar_resumen(resultados):
     """Muestra un resumen final de la verificación"""
     print_header("📊 RESUMEN DE VERIFICACIÓN")
@@ -280,6 +562,19 @@ def mostrar_resumen(resultados):
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description="Verificación de instalación de la Biblioteca UFT")
+    parser.add_argument('--rendimiento', action='store_true',
+                        help="diagnóstico de salud y rendimiento de biblioteca.db")
+    parser.add_argument('--fix', action='store_true',
+                        help="con --rendimiento: ANALYZE, PRAGMA optimize y VACUUM si hace falta")
+    args = parser.parse_args()
+    
+    if args.rendimiento or args.fix:
+        exito = mostrar_resumen_rendimiento(diagnosticar_rendimiento(corregir=args.fix))
+        print("\n" + "=" * 60)
+        print()
+        sys.exit(0 if exito else 1)
+    
     print("\n" + "🔍 " * 20)
     print("  VERIFICACIÓN DE INSTALACIÓN")
     print("  Sistema de Gestión de Biblioteca UFT")
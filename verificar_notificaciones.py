@@ -0,0 +1,231 @@
+"""
+Verificación de los Avisos por Correo
+Sistema de Gestión de Biblioteca UFT
+
+Ejecuta notificaciones.enviar_avisos() de punta a punta contra el SMTP de
+prueba (notificaciones.iniciar_servidor_prueba, en un puerto libre) sobre una
+base temporal con el esquema de biblioteca.db.sql y unos miles de usuarios
+sintéticos con préstamos atrasados, por vencer y multas pendientes. Comprueba:
+
+  - un solo correo por usuario con avisos, con todos sus avisos dentro,
+    y ninguno para quien no tiene nada pendiente,
+  - que volver a ejecutar el envío el mismo día no manda nada,
+  - que un 451 del servidor (reintentar más tarde) se reintenta y el correo
+    termina enviado,
+
+e informa cuántos correos por segundo se enviaron. Termina con código 1 si
+algo falla.
+
+Uso:
+    python verificar_notificaciones.py [--usuarios 3000] [--conexiones 8] [--rechazos 5]
+"""
+
+import os
+import sys
+import time
+import email
+import asyncio
+import sqlite3
+import argparse
+import tempfile
+import threading
+from email import policy
+from datetime import datetime, timedelta, timezone
+
+import notificaciones
+from verificar_instalacion import print_header, print_success, print_error
+
+ARCHIVO_SQL = os.path.abspath("biblioteca.db.sql")
+
+# ---------------------------------------------------------
+# DATOS SINTÉTICOS
+# ---------------------------------------------------------
+
+def crear_base(ruta, usuarios):
+    """
+    Base con el esquema del proyecto y `usuarios` usuarios, repartidos en:
+      i % 4 == 0: un préstamo atrasado
+      i % 4 == 1: un préstamo atrasado y otro que vence mañana
+      i % 4 == 2: una multa pendiente y otra pagada
+      i % 4 == 3: un préstamo que vence en 10 días (no recibe aviso)
+    y además una multa pendiente extra uno de cada 10.
+    """
+    # Las vistas calculan "hoy" con DATE('now'), que es UTC
+    hoy = datetime.now(timezone.utc).date()
+    conn = sqlite3.connect(ruta)
+    with open(ARCHIVO_SQL, "r", encoding="utf-8") as archivo:
+        conn.executescript(archivo.read())
+
+    prestamos, multas = [], []
+    def prestar(rut, dias_desde_vencimiento, devuelto=False):
+        vence = hoy + timedelta(days=dias_desde_vencimiento)
+        if devuelto:
+            estado = 'devuelto'
+        else:
+            estado = 'vencido' if vence < hoy else 'activo'
+        prestamos.append((rut, (vence - timedelta(days=14)).isoformat(), vence.isoformat(),
+                          vence.isoformat() if devuelto else None, estado))
+        return len(prestamos)
+
+    for i in range(usuarios):
+        rut = f"{i + 40000000}-{i % 10}"
+        if i % 4 == 0:
+            prestar(rut, -5)
+        elif i % 4 == 1:
+            prestar(rut, -3)
+            prestar(rut, 1)
+        elif i % 4 == 2:
+            multas.append((prestar(rut, -30, devuelto=True), 'pendiente'))
+            multas.append((prestar(rut, -60, devuelto=True), 'pagado'))
+        else:
+            prestar(rut, 10)
+        if i % 10 == 0:
+            multas.append((prestar(rut, -20, devuelto=True), 'pendiente'))
+
+    with conn:
+        conn.executemany(
+            "INSERT INTO USUARIO (rut, nombre, correo, tipo_usuario) VALUES (?, ?, ?, 'estudiante')",
+            ((f"{i + 40000000}-{i % 10}", f"Usuario {i}", f"aviso{i}@uft.cl") for i in range(usuarios)))
+        conn.execute("""INSERT INTO LIBRO (isbn, titulo, autor, categoria)
+                        VALUES ('9790000000017', 'Libro de prueba de avisos', 'Autor de prueba', 'Referencia')""")
+        # Una copia por préstamo, con id explícito después de los de ejemplo
+        primero = conn.execute("SELECT COALESCE(MAX(id_ejemplar), 0) + 1 FROM EJEMPLAR").fetchone()[0]
+        conn.executemany(
+            """INSERT INTO EJEMPLAR (id_ejemplar, isbn, codigo_barras, estado)
+               VALUES (?, '9790000000017', ?, 'disponible')""",
+            ((primero + n, f"AVI{n:09d}") for n in range(len(prestamos))))
+        primer_prestamo = conn.execute("SELECT COALESCE(MAX(id_prestamo), 0) + 1 FROM PRESTAMO").fetchone()[0]
+        conn.executemany(
+            """INSERT INTO PRESTAMO (id_prestamo, rut_usuario, id_ejemplar, fecha_prestamo,
+                                     fecha_vencimiento, fecha_devolucion, estado)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            ((primer_prestamo + n, rut, primero + n, prestado, vence, devuelto, estado)
+             for n, (rut, prestado, vence, devuelto, estado) in enumerate(prestamos)))
+        conn.executemany(
+            """INSERT INTO MULTA (id_prestamo, monto, fecha_generacion, estado)
+               VALUES (?, 3000, DATE('now', '-10 days'), ?)""",
+            ((primer_prestamo + n - 1, estado) for n, estado in multas))
+    return conn
+
+def avisos_esperados(conn, dias_aviso):
+    """{correo: número de avisos}, calculado sobre las tablas (sin las vistas)"""
+    return dict(conn.execute(
+        """SELECT u.correo, COUNT(*)
+           FROM (SELECT rut_usuario AS rut FROM PRESTAMO
+                 WHERE estado IN ('activo', 'vencido')
+                   AND fecha_vencimiento <= DATE('now', ?)
+                 UNION ALL
+                 SELECT p.rut_usuario FROM MULTA m JOIN PRESTAMO p ON p.id_prestamo = m.id_prestamo
+                 WHERE m.estado = 'pendiente') avisos
+           JOIN USUARIO u ON u.rut = avisos.rut
+           GROUP BY u.correo""", (f"+{dias_aviso} days",)).fetchall())
+
+# ---------------------------------------------------------
+# SERVIDOR SMTP DE PRUEBA EN SEGUNDO PLANO
+# ---------------------------------------------------------
+
+class ServidorPrueba:
+    """El SMTP de prueba en su propio hilo y bucle asyncio (enviar_avisos usa asyncio.run)"""
+
+    def __init__(self, rechazos=0):
+        self.bucle = asyncio.new_event_loop()
+        self.hilo = threading.Thread(target=self.bucle.run_forever, daemon=True)
+        self.hilo.start()
+        self.servidor, self.recibidos = asyncio.run_coroutine_threadsafe(
+            notificaciones.iniciar_servidor_prueba('localhost', 0, mostrar=False, rechazos=rechazos),
+            self.bucle).result()
+        self.puerto = self.servidor.sockets[0].getsockname()[1]
+
+    def cerrar(self):
+        self.bucle.call_soon_threadsafe(self.servidor.close)
+        self.bucle.call_soon_threadsafe(self.bucle.stop)
+        self.hilo.join()
+        self.bucle.close()
+
+def avisos_por_correo(mensajes):
+    """{destinatario: [avisos del cuerpo]} de los mensajes recibidos por el SMTP de prueba"""
+    por_correo = {}
+    for texto in mensajes:
+        mensaje = email.message_from_string(texto, policy=policy.default)
+        avisos = [linea for linea in mensaje.get_content().splitlines() if linea.startswith("- ")]
+        por_correo.setdefault(mensaje['To'], []).append(avisos)
+    return por_correo
+
+# ---------------------------------------------------------
+# VERIFICACIONES
+# ---------------------------------------------------------
+
+def verificar(condicion, texto):
+    if condicion:
+        print_success(texto)
+    else:
+        print_error(texto)
+    return 0 if condicion else 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Verificación de los avisos por correo con un SMTP local")
+    parser.add_argument('--usuarios', type=int, default=3000, help="usuarios sintéticos")
+    parser.add_argument('--conexiones', type=int, default=8, help="trabajadores (conexiones SMTP)")
+    parser.add_argument('--por-segundo', type=float, default=0,
+                        help="límite de correos por segundo (0 = sin límite, para medir)")
+    parser.add_argument('--rechazos', type=int, default=5, help="mensajes que el SMTP responde con 451")
+    parser.add_argument('--dias-aviso', type=int, default=2)
+    args = parser.parse_args()
+
+    fallas = 0
+    servidor = ServidorPrueba(args.rechazos)
+    config = {
+        'host': 'localhost', 'puerto': servidor.puerto, 'starttls': False,
+        'usuario': None, 'clave': None, 'remitente': 'biblioteca@uft.cl',
+        'conexiones': args.conexiones, 'por_segundo': args.por_segundo,
+        'reintentos': 3, 'espera_base': 0.05
+    }
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "avisos.db")
+        print_header(f"🧪 Base con {args.usuarios:,} usuarios sintéticos")
+        conn = crear_base(ruta, args.usuarios)
+        esperados = avisos_esperados(conn, args.dias_aviso)
+        print_success(f"{len(esperados):,} usuarios deben recibir aviso "
+                      f"({sum(esperados.values()):,} avisos); SMTP de prueba en el puerto {servidor.puerto}")
+
+        try:
+            print_header("📨 Primer envío")
+            resumen = notificaciones.enviar_avisos(ruta, config, args.dias_aviso)
+            por_segundo = resumen['enviados'] / resumen['segundos'] if resumen['segundos'] else 0
+            print(f"       {resumen['enviados']:,} enviados, {resumen['fallidos']} fallidos en "
+                  f"{resumen['segundos']:.2f} s ({por_segundo:,.0f} correos/s)")
+            recibidos = avisos_por_correo(servidor.recibidos)
+
+            fallas += verificar(resumen['enviados'] == len(esperados) and resumen['fallidos'] == 0,
+                                f"enviados {resumen['enviados']:,} de {len(esperados):,}, sin fallidos")
+            fallas += verificar(all(len(mensajes) == 1 for mensajes in recibidos.values())
+                                and set(recibidos) == set(esperados),
+                                "un solo correo por usuario con avisos, ninguno para los demás")
+            fallas += verificar(all(len(recibidos.get(correo, [[]])[0]) == cantidad
+                                    for correo, cantidad in esperados.items()),
+                                "cada correo trae todos los avisos de su usuario")
+
+            reintentados = conn.execute("SELECT COUNT(*) FROM NOTIFICACION WHERE intentos > 1").fetchone()[0]
+            fallas += verificar(reintentados == args.rechazos,
+                                f"los {args.rechazos} rechazos 451 se reintentaron "
+                                f"({reintentados} avisos con más de un intento)")
+
+            print_header("🔁 Segundo envío el mismo día")
+            antes = len(servidor.recibidos)
+            resumen = notificaciones.enviar_avisos(ruta, config, args.dias_aviso)
+            fallas += verificar(resumen['enviados'] == 0 and len(servidor.recibidos) == antes,
+                                f"ningún correo repetido ({resumen['omitidos']:,} omitidos por ya avisados)")
+        finally:
+            conn.close()
+            servidor.cerrar()
+
+    print_header("📋 Resumen")
+    if fallas:
+        print_error(f"{fallas} verificaciones fallaron")
+        sys.exit(1)
+    print_success(f"Avisos correctos; {por_segundo:,.0f} correos/s con {args.conexiones} conexiones "
+                  f"(10.000 usuarios en ~{10000 / por_segundo:.0f} s)")
+
+if __name__ == "__main__":
+    main()
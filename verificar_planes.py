@@ -0,0 +1,383 @@
+"""
+Pruebas de Regresión de Planes de Consulta
+Sistema de Gestión de Biblioteca UFT
+
+Los índices de biblioteca.db.sql solo sirven si las consultas los usan: un
+cambio pequeño en una vista o en una consulta de la app puede convertir una
+búsqueda por índice en un recorrido completo sin que nada falle. Este script:
+
+  - crea una base temporal con el esquema de biblioteca.db.sql y un volumen
+    grande de datos sintéticos (20.000 usuarios, 50.000 libros, 200.000
+    ejemplares y 500.000 préstamos con --escala 1),
+  - obtiene el EXPLAIN QUERY PLAN de cada vista y de cada consulta SQL escrita
+    en datos_biblioteca.py y streamlit_semana6.py, antes y después de ANALYZE,
+  - comprueba que cada una use los índices de INDICES_ESPERADOS y que las
+    rutas frecuentes no recorran PRESTAMO ni EJEMPLAR completas,
+  - cronometra las consultas de lectura y compara con los tiempos guardados
+    en planes_referencia.json, con una tolerancia.
+
+Una consulta nueva que no esté en INDICES_ESPERADOS cuenta como falla: hay
+que declarar qué índices debe usar. Los tiempos de referencia dependen de la
+máquina; se regeneran con --guardar. Termina con código 1 si algo falla.
+
+Uso:
+    python verificar_planes.py [--escala 1] [--tolerancia 0.5] [--detalle]
+    python verificar_planes.py --guardar
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import statistics
+from datetime import date, timedelta
+
+from verificar_instalacion import (print_header, print_success, print_error, print_warning,
+                                   extraer_consultas_app)
+
+ARCHIVO_SQL = os.path.abspath("biblioteca.db.sql")
+ARCHIVO_REFERENCIA = os.path.abspath("planes_referencia.json")
+
+# Filas generadas con --escala 1
+USUARIOS = 20000
+LIBROS = 50000
+EJEMPLARES = 200000
+PRESTAMOS = 500000
+
+MARGEN_MS = 5.0    # holgura absoluta, para que el ruido no haga fallar consultas de pocos ms
+
+# Tablas que crecen con el uso: una ruta frecuente no puede recorrerlas enteras
+TABLAS_VIGILADAS = {'PRESTAMO', 'EJEMPLAR'}
+
+# Índices que debe usar cada consulta. Las vistas van con su nombre y las
+# consultas de la app con el nombre de la función (#2, #3... si tiene varias).
+# "INTEGER PRIMARY KEY" es la búsqueda por rowid (id_prestamo, id_ejemplar).
+INDICES_ESPERADOS = {
+    # Vistas
+    'v_prestamos_activos': ('idx_prestamo_estado', 'INTEGER PRIMARY KEY'),
+    'v_multas_pendientes': ('idx_multa_estado', 'INTEGER PRIMARY KEY'),
+    'v_kpi_ranking_libros': ('idx_ejemplar_isbn', 'idx_prestamo_ejemplar'),
+    'v_kpi_ranking_usuarios': ('idx_prestamo_usuario', 'sqlite_autoindex_MULTA_1'),
+    'v_disponibilidad_ejemplares': ('idx_ejemplar_isbn',),
+    'v_libro_normalizado': (),
+    # datos_biblioteca.py
+    'obtener_usuarios': (),
+    'modificar_usuario': ('sqlite_autoindex_USUARIO_1',),
+    'borrar_usuario': ('sqlite_autoindex_USUARIO_1',),
+    'obtener_catalogo': (),
+    'modificar_libro': ('sqlite_autoindex_LIBRO_1',),
+    'borrar_libro': ('sqlite_autoindex_LIBRO_1',),
+    'obtener_inventario': (),
+    'obtener_copias_disponibles': ('idx_ejemplar_estado', 'sqlite_autoindex_LIBRO_1'),
+    'modificar_ejemplar': ('INTEGER PRIMARY KEY',),
+    'borrar_ejemplar': ('INTEGER PRIMARY KEY',),
+    'obtener_historial_prestamos': (),
+    'obtener_historial_prestamos#2': ('idx_prestamo_dia_prestamo', 'INTEGER PRIMARY KEY'),
+    'obtener_prestamos_por_devolver': ('idx_prestamo_estado', 'INTEGER PRIMARY KEY'),
+    'registrar_devolucion': ('INTEGER PRIMARY KEY',),
+    'borrar_prestamo': ('INTEGER PRIMARY KEY',),
+    'cargar_stats_generales': (),
+    'cargar_stats_generales#2': (),
+    'cargar_stats_generales#3': ('idx_prestamo_estado',),
+    'cargar_stats_generales#4': ('idx_multa_estado',),
+    'cargar_prestamos_activos_vista': ('idx_prestamo_estado', 'INTEGER PRIMARY KEY'),
+    'cargar_multas_vista': ('idx_multa_estado', 'INTEGER PRIMARY KEY'),
+    'cargar_ranking_libros': ('idx_ejemplar_isbn', 'idx_prestamo_ejemplar'),
+    'cargar_disponibilidad': ('idx_ejemplar_isbn',),
+    'cargar_categorias': ('idx_libro_categoria',),
+    'cargar_ranking_usuarios': ('idx_prestamo_usuario',),
+}
+
+# Listados completos: leen toda la tabla por diseño, no son rutas frecuentes
+# (el orden de los JOIN depende de las estadísticas, por eso no exigen índices)
+RECORRIDOS_PERMITIDOS = {'obtener_inventario', 'obtener_historial_prestamos'}
+
+# Parámetros para cronometrar las lecturas que los llevan (sin ellos solo se
+# revisa el plan). Historial por fechas: un mes de hace un año, en número de día.
+_HOY = (date.today() - date(1970, 1, 1)).days
+PARAMETROS_MEDICION = {
+    'obtener_historial_prestamos#2': (_HOY - 395, _HOY - 365),
+}
+
+# ---------------------------------------------------------
+# DATOS SINTÉTICOS
+# ---------------------------------------------------------
+
+def crear_base(ruta, escala=1.0, semilla=42):
+    """Base con el esquema del proyecto y datos sintéticos; devuelve la conexión"""
+    azar = random.Random(semilla)
+    usuarios, libros = int(USUARIOS * escala), int(LIBROS * escala)
+    ejemplares, prestamos = int(EJEMPLARES * escala), int(PRESTAMOS * escala)
+
+    conn = sqlite3.connect(ruta)
+    with open(ARCHIVO_SQL, "r", encoding="utf-8") as archivo:
+        conn.executescript(archivo.read())
+    # Para cargar rápido: sin índice de trigramas ni registro de cambios
+    for (nombre,) in conn.execute("""SELECT name FROM sqlite_master WHERE type='trigger'
+                                     AND (name LIKE 'trg_cdc_%' OR name LIKE 'trg_libro_trigrama_%')""").fetchall():
+        conn.execute(f"DROP TRIGGER {nombre}")
+
+    tipos = ['estudiante', 'docente', 'investigador', 'administrativo']
+    categorias = ['Ficción', 'No Ficción', 'Referencia', 'Tesis']
+    estados = ['disponible'] * 48 + ['en_reparacion']
+    hoy = date.today()
+    inicio = hoy - timedelta(days=3650)
+
+    def rut(i):
+        return f"{i + 30000000}-{i % 10}"
+
+    # id_ejemplar explícito (después de los de ejemplo): los préstamos se
+    # generan sin consultar la tabla
+    primero = conn.execute("SELECT COALESCE(MAX(id_ejemplar), 0) + 1 FROM EJEMPLAR").fetchone()[0]
+    ids = range(primero, primero + ejemplares)
+
+    def historicos():
+        # Préstamos ya devueltos de los últimos 10 años, en el orden en que se registran
+        for dias in sorted(azar.randrange(3600) for _ in range(prestamos)):
+            prestado = inicio + timedelta(days=dias)
+            devuelto = prestado + timedelta(days=azar.randrange(1, 25))
+            yield (rut(azar.randrange(usuarios)), azar.choice(ids), prestado.isoformat(),
+                   (prestado + timedelta(days=14)).isoformat(), devuelto.isoformat(), 'devuelto')
+
+    def abiertos():
+        # Uno de cada 20 ejemplares está prestado; los de más de 14 días, vencidos
+        for id_ej in azar.sample(ids, ejemplares // 20):
+            dias = azar.randrange(40)
+            prestado = hoy - timedelta(days=dias)
+            yield (rut(azar.randrange(usuarios)), id_ej, prestado.isoformat(),
+                   (prestado + timedelta(days=14)).isoformat(), None, 'vencido' if dias > 14 else 'activo')
+
+    with conn:
+        conn.executemany(
+            "INSERT INTO USUARIO (rut, nombre, correo, tipo_usuario) VALUES (?, ?, ?, ?)",
+            ((rut(i), f"Usuario {i}", f"usuario{i}@uft.cl", tipos[i % 4]) for i in range(usuarios)))
+        conn.executemany(
+            """INSERT INTO LIBRO (isbn, titulo, editorial, anio, categoria, autor, idioma, num_paginas)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            ((f"979{i:010d}", f"Título de prueba número {i}", f"Editorial {i % 300}", 1950 + i % 75,
+              categorias[i % 4], f"Autor {i % 9000}", 'Español', 100 + i % 700) for i in range(libros)))
+        conn.executemany(
+            """INSERT INTO EJEMPLAR (id_ejemplar, isbn, codigo_barras, estado, ubicacion, condicion)
+               VALUES (?, ?, ?, ?, ?, 'bueno')""",
+            ((i, f"979{i % libros:010d}", f"GEN{i:09d}", estados[i % len(estados)], f"Estantería {i % 2000}")
+             for i in ids))
+        sql_prestamo = """INSERT INTO PRESTAMO (rut_usuario, id_ejemplar, fecha_prestamo, fecha_vencimiento,
+                                                fecha_devolucion, estado) VALUES (?, ?, ?, ?, ?, ?)"""
+        conn.executemany(sql_prestamo, historicos())
+        conn.executemany(sql_prestamo, abiertos())
+        # Multa en uno de cada 10 préstamos; una de cada 5 sigue pendiente
+        conn.execute("""INSERT INTO MULTA (id_prestamo, monto, fecha_generacion, fecha_pago, estado)
+                        SELECT id_prestamo, 500 * (1 + id_prestamo % 20), fecha_vencimiento,
+                               CASE WHEN id_prestamo % 50 = 0 THEN NULL ELSE fecha_devolucion END,
+                               CASE WHEN id_prestamo % 50 = 0 THEN 'pendiente' ELSE 'pagado' END
+                        FROM PRESTAMO WHERE id_prestamo % 10 = 0
+                          AND id_prestamo NOT IN (SELECT id_prestamo FROM MULTA)""")
+    return conn
+
+# ---------------------------------------------------------
+# PLANES
+# ---------------------------------------------------------
+
+def consultas_a_verificar(conn):
+    """(nombre, sql) de cada vista y de cada consulta de la app, con nombres únicos"""
+    consultas = [(vista, f"SELECT * FROM {vista}") for (vista,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='view' ORDER BY name")]
+
+    repetidas = {}
+    for funcion, sql in extraer_consultas_app(todas=True):
+        repetidas[funcion] = repetidas.get(funcion, 0) + 1
+        nombre = funcion if repetidas[funcion] == 1 else f"{funcion}#{repetidas[funcion]}"
+        consultas.append((nombre, sql))
+    return consultas
+
+_TABLA_Y_ALIAS = re.compile(r'\b(?:FROM|JOIN)\s+(?:main\.)?(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_NO_ALIAS = {'JOIN', 'LEFT', 'INNER', 'CROSS', 'WHERE', 'ON', 'GROUP', 'ORDER', 'LIMIT', 'USING'}
+
+def tablas_por_alias(sqls):
+    """{ALIAS o TABLA: {TABLAS}} de los FROM/JOIN de las consultas (en mayúsculas)"""
+    alias = {}
+    for sql in sqls:
+        for tabla, nombre in _TABLA_Y_ALIAS.findall(sql):
+            tabla = tabla.upper()
+            alias.setdefault(tabla, set()).add(tabla)
+            if nombre and nombre.upper() not in _NO_ALIAS:
+                alias.setdefault(nombre.upper(), set()).add(tabla)
+    return alias
+
+def recorridos_vigilados(plan, alias):
+    """Pasos SCAN (con o sin índice: igual leen todo) sobre PRESTAMO o EJEMPLAR"""
+    recorridos = []
+    for detalle in plan:
+        if not detalle.startswith("SCAN "):
+            continue
+        objeto = detalle[len("SCAN "):].split(" ", 1)[0].upper()
+        if alias.get(objeto, {objeto}) & TABLAS_VIGILADAS:
+            recorridos.append(detalle)
+    return recorridos
+
+def obtener_plan(conn, sql):
+    # Los parámetros van en NULL: el plan no depende de sus valores
+    parametros = [None] * sql.count('?')
+    return [fila[3] for fila in conn.execute(f"EXPLAIN QUERY PLAN {sql}", parametros)]
+
+def revisar_plan(nombre, sql, plan, alias):
+    """Lista de problemas del plan frente a lo esperado (vacía si está bien)"""
+    if nombre not in INDICES_ESPERADOS:
+        return ["consulta sin entrada en INDICES_ESPERADOS"]
+
+    problemas = []
+    for indice in INDICES_ESPERADOS[nombre]:
+        if not any(re.search(rf'\b{indice}\b', detalle) for detalle in plan):
+            problemas.append(f"no usa {indice}")
+    if nombre not in RECORRIDOS_PERMITIDOS:
+        problemas.extend(f"recorrido completo: {detalle}" for detalle in recorridos_vigilados(plan, alias))
+    return problemas
+
+def verificar_planes(conn, consultas, etapa, detalle=False):
+    """Revisa el plan de todas las consultas; devuelve ({nombre: plan}, fallas)"""
+    print_header(f"🧭 Planes de Consulta ({etapa})")
+    vistas = [fila[0] for fila in conn.execute("SELECT sql FROM sqlite_master WHERE type='view'")]
+
+    planes, fallas = {}, 0
+    for nombre, sql in consultas:
+        try:
+            plan = obtener_plan(conn, sql)
+        except sqlite3.Error as e:
+            print_error(f"{nombre}: {e}")
+            fallas += 1
+            continue
+        planes[nombre] = plan
+
+        problemas = revisar_plan(nombre, sql, plan, tablas_por_alias([sql] + vistas))
+        if problemas:
+            print_error(f"{nombre}: " + "; ".join(problemas))
+            fallas += 1
+        else:
+            print_success(nombre)
+        if problemas or detalle:
+            for paso in plan:
+                print(f"       {paso}")
+    return planes, fallas
+
+# ---------------------------------------------------------
+# TIEMPOS
+# ---------------------------------------------------------
+
+def medir(conn, sql, repeticiones, parametros=()):
+    """Mediana en ms de ejecutar la consulta y leer todas sus filas"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        conn.execute(sql, parametros).fetchall()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+def leer_referencia(ruta):
+    try:
+        with open(ruta, 'r', encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except FileNotFoundError:
+        return None
+
+def verificar_tiempos(conn, consultas, referencia, escala, tolerancia, repeticiones):
+    """Cronometra las lecturas (sin parámetros o con PARAMETROS_MEDICION); devuelve ({nombre: ms}, fallas)"""
+    print_header("⏱️  Tiempos frente a la Referencia")
+    comparar = referencia is not None and referencia.get('escala') == escala
+    if referencia is None:
+        print_warning("No hay tiempos de referencia (se crean con --guardar)")
+    elif not comparar:
+        print_warning(f"La referencia es de --escala {referencia.get('escala')}: solo se informan los tiempos")
+    anteriores = referencia.get('consultas', {}) if comparar else {}
+
+    tiempos, fallas = {}, 0
+    for nombre, sql in consultas:
+        parametros = PARAMETROS_MEDICION.get(nombre, ())
+        if not sql.upper().startswith("SELECT ") or sql.count('?') != len(parametros):
+            continue
+        ms = tiempos[nombre] = medir(conn, sql, repeticiones, parametros)
+        anterior = anteriores.get(nombre, {}).get('ms')
+        if anterior is None:
+            print_success(f"{nombre:32} {ms:9.1f} ms (sin referencia)")
+            continue
+        limite = anterior * (1 + tolerancia) + MARGEN_MS
+        texto = f"{nombre:32} {ms:9.1f} ms (referencia {anterior:.1f} ms, límite {limite:.1f} ms)"
+        if ms > limite:
+            print_error(texto)
+            fallas += 1
+        else:
+            print_success(texto)
+    return tiempos, fallas
+
+def comparar_planes(planes, referencia):
+    """Informa los planes que cambiaron respecto de la referencia (no es falla por sí solo)"""
+    anteriores = referencia.get('consultas', {}) if referencia else {}
+    for nombre, plan in planes.items():
+        anterior = anteriores.get(nombre, {}).get('plan')
+        if anterior is not None and anterior != plan:
+            print_warning(f"{nombre}: el plan cambió respecto de la referencia")
+            for paso in plan:
+                print(f"       {paso}")
+
+def guardar_referencia(ruta, escala, consultas, planes, tiempos):
+    datos = {
+        'escala': escala,
+        'sqlite': sqlite3.sqlite_version,
+        'consultas': {nombre: {'sql': sql, 'plan': planes.get(nombre), 'ms': round(tiempos[nombre], 2)
+                                                                          if nombre in tiempos else None}
+                      for nombre, sql in consultas},
+    }
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(datos, archivo, ensure_ascii=False, indent=2)
+        archivo.write("\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Regresión de planes de consulta sobre datos sintéticos")
+    parser.add_argument('--escala', type=float, default=1.0, help="multiplica el volumen de datos generado")
+    parser.add_argument('--tolerancia', type=float, default=0.5,
+                        help="aumento relativo de tiempo permitido frente a la referencia (0.5 = 50%%)")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--referencia', default=ARCHIVO_REFERENCIA, help="archivo JSON con los tiempos de referencia")
+    parser.add_argument('--guardar', action='store_true', help="guarda los planes y tiempos medidos como referencia")
+    parser.add_argument('--detalle', action='store_true', help="muestra el plan de todas las consultas")
+    args = parser.parse_args()
+
+    print_header(f"🧪 Generando datos sintéticos (escala {args.escala:g})")
+    with tempfile.TemporaryDirectory() as carpeta:
+        inicio = time.perf_counter()
+        conn = crear_base(os.path.join(carpeta, "planes.db"), args.escala)
+        print_success(f"Base creada en {time.perf_counter() - inicio:.1f} s")
+        for tabla in ('USUARIO', 'LIBRO', 'EJEMPLAR', 'PRESTAMO', 'MULTA'):
+            print(f"       {tabla:10} {conn.execute(f'SELECT COUNT(*) FROM {tabla}').fetchone()[0]:>10,} filas")
+
+        consultas = consultas_a_verificar(conn)
+        referencia = leer_referencia(args.referencia)
+
+        # Una base recién creada no tiene estadísticas: los planes deben servir igual
+        _, fallas = verificar_planes(conn, consultas, "sin estadísticas", args.detalle)
+        conn.execute("ANALYZE")
+        planes, fallas_analyze = verificar_planes(conn, consultas, "con ANALYZE", args.detalle)
+        fallas += fallas_analyze
+        comparar_planes(planes, referencia)
+
+        tiempos, fallas_tiempo = verificar_tiempos(conn, consultas, referencia, args.escala,
+                                                   args.tolerancia, args.repeticiones)
+        fallas += fallas_tiempo
+        conn.close()
+
+    if args.guardar:
+        guardar_referencia(args.referencia, args.escala, consultas, planes, tiempos)
+        print(f"\n  💾 Referencia guardada en {args.referencia}")
+
+    print_header("📋 Resumen")
+    if fallas:
+        print_error(f"{fallas} verificaciones fallaron")
+        sys.exit(1)
+    print_success(f"{len(consultas)} consultas con los planes y tiempos esperados")
+
+if __name__ == "__main__":
+    main()